@@ -14,9 +14,11 @@ import os
 # eventlet monkey-patching (can interfere with platform runtime) and keep cold
 # start work minimal.
 _IS_SERVERLESS = bool(os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+# The ASGI entrypoint (asgi.py) runs on an asyncio loop, which monkey-patching would break.
+_IS_ASGI = os.environ.get('ECHOE_ASGI') == '1'
 
 _EVENTLET_AVAILABLE = False
-if not _IS_SERVERLESS:
+if not _IS_SERVERLESS and not _IS_ASGI:
     # eventlet is optional in local/server environments. On newer Python versions
     # it may not import cleanly depending on dependency shims; don't crash the app.
     try:
@@ -25,15 +27,16 @@ if not _IS_SERVERLESS:
         _EVENTLET_AVAILABLE = True
     except Exception:
         _EVENTLET_AVAILABLE = False
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, abort, send_from_directory, session, make_response
-from sqlalchemy import inspect, text, func
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, abort, send_from_directory, session, make_response, stream_with_context
+from sqlalchemy import bindparam, inspect, text, func, update
 from flask_login import LoginManager, login_user, logout_user, current_user, login_required
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
 import json
 import uuid
-import requests
 import httpx
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from flask_cors import CORS
 import sqlite3
 import logging
@@ -47,21 +50,29 @@ import re
 import xml.etree.ElementTree as ET
 
 from config import Config
-from models import db, User, Letter, Response, UserReply, PhysicalMailbox, Post, Event, UserRole
+from models import db, User, Letter, LetterCounter, Response, UserReply, PhysicalMailbox, Post, Event, UserRole
 from forms import LetterForm, ResponseForm, LoginForm, RegistrationForm, PhysicalLetterForm, UserReplyForm
 from middlewares import LanguageMiddleware
 from init_db import init_db
 from cli_commands import register_commands
 from admin_decorators import admin_required, ultimate_admin_required, volunteer_required
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from gemini_client import gemini, GeminiError, candidate_text
+import prompts
+from moderation_queue import ModerationQueue
+from caching import LRUTTLCache, content_hash
+from moderation import moderator
+from rule_packs import RulePackWatcher
+from rate_limit import rate_limiter
+import near_duplicates as near_dup
+from logging_setup import configure_logging
+from mailbox_cache import mailbox_cache
+from sender_window import sender_window
+from submit_fanout import gather_submit_calls
+from volunteer_queue import unprocessed_page, letters_with_unread_replies, reconcile_reply_counters
+
+# Configure logging ('dev' or 'production' profile, see logging_setup.py)
+configure_logging(Config.LOG_PROFILE, level=Config.LOG_LEVEL, levels=Config.LOG_LEVELS,
+                  sampling=Config.LOG_SAMPLING)
 logger = logging.getLogger(__name__)
 
 try:
@@ -110,28 +121,9 @@ try:
             pass
         return response
 
-    # In-memory, short-lived IP buckets for basic rate limiting (per process)
-    LETTER_IP_BUCKETS = {}
-    IP_WINDOW_SECONDS = 60
-    IP_MAX_REQUESTS = 30  # per minute per IP for /submit
-
-    def _ip_limited(ip: str) -> bool:
-        """Return True if IP exceeded short-term limit; keep only recent timestamps."""
-        if not ip:
-            return False
-        now = time.time()
-        bucket = LETTER_IP_BUCKETS.get(ip, [])
-        # keep only events within window
-        bucket = [t for t in bucket if now - t < IP_WINDOW_SECONDS]
-        if len(bucket) >= IP_MAX_REQUESTS:
-            LETTER_IP_BUCKETS[ip] = bucket
-            return True
-        bucket.append(now)
-        # cap stored history to avoid unbounded growth
-        if len(bucket) > IP_MAX_REQUESTS * 2:
-            bucket = bucket[-IP_MAX_REQUESTS * 2:]
-        LETTER_IP_BUCKETS[ip] = bucket
-        return False
+    def _client_ip() -> str:
+        """The client address added by our proxy (TRUSTED_PROXY_HOPS), else the socket peer."""
+        return rate_limiter.client_ip(request.headers.get('X-Forwarded-For'), request.remote_addr)
 
     # Define anonymous names for chat
     ANONYMOUS_NAMES = ["QuietFox", "CalmRiver", "SilentWolf", "GentleBear", "PeacefulEagle"]
@@ -140,31 +132,47 @@ try:
     logger.info("Initializing database...")
     db.init_app(app)
     migrate = Migrate(app, db)
-    
+
+    # Shared, pooled Gemini client used by every AI call site
+    gemini.init_app(app)
+    moderator.init_app(app)
+    # Published rule packs are hot-swapped into the moderator (see rule_packs.py)
+    rule_pack_watcher = RulePackWatcher(moderator)
+    rule_pack_watcher.init_app(app)
+    near_dup.near_duplicates.init_app(app)
+    # Token-bucket limits for /submit, /api/chat, /api/coach and chat messages
+    rate_limiter.init_app(app)
+    # Active mailboxes + the submit page's offline-option fragment, dropped on mailbox writes
+    mailbox_cache.init_app(app)
+    # Letters per anon ID over the last day, in hourly buckets (admin suspicious senders)
+    sender_window.init_app(app)
+
+
     @app.context_processor
     def inject_nav_counts():
+        # Only staff see the badges; public renders skip this entirely
+        if not (current_user.is_authenticated
+                and (current_user.has_admin_access() or current_user.is_volunteer)):
+            return {}
         try:
-            flagged_cnt = Letter.query.filter_by(is_flagged=True).count()
-            unprocessed_cnt = Letter.query.filter(
-                (Letter.is_processed == False) & ((Letter.is_flagged == False) | (Letter.is_flagged.is_(None)))
-            ).count()
-            # Suspicious anon IDs: many letters in last 24h (for admin dashboard)
-            day_ago = datetime.utcnow() - timedelta(days=1)
-            suspicious_raw = (db.session.query(Letter.anon_user_id, func.count(Letter.id).label('cnt'))
-                              .filter(Letter.created_at >= day_ago)
-                              .filter(Letter.anon_user_id.isnot(None))
-                              .group_by(Letter.anon_user_id)
-                              .having(func.count(Letter.id) >= 10)
-                              .order_by(func.count(Letter.id).desc())
-                              .limit(20)
-                              .all())
-            suspicious_anon = [{'anon_id': row[0], 'count': row[1]} for row in suspicious_raw]
-        except Exception:
-            flagged_cnt = 0
-            unprocessed_cnt = 0
-            suspicious_anon = []
-        return dict(flagged_count=flagged_cnt, unprocessed_count=unprocessed_cnt,
-                    suspicious_anon=suspicious_anon)
+            counts = LetterCounter.values()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Nav counters unavailable: {e}")
+            counts = {}
+        return dict(flagged_count=counts.get('flagged', 0), unprocessed_count=counts.get('unprocessed', 0))
+
+    def _suspicious_anon_senders():
+        """High-volume anon IDs in the sliding window, plus senders of near-duplicates (admin dashboard)."""
+        suspicious_anon = _sender_window().top(k=20)
+        # Senders repeating (near-)identical letters, even below the volume threshold
+        listed = {s['anon_id']: s for s in suspicious_anon}
+        for sender in _near_duplicate_index().near_duplicate_senders(min_near=2):
+            if sender['anon_id'] in listed:
+                listed[sender['anon_id']]['near_duplicates'] = sender['near_duplicates']
+            else:
+                suspicious_anon.append(sender)
+        return suspicious_anon
     
     # Ensure instance folder exists and create database tables
     def _ensure_anon_inbox_schema():
@@ -187,11 +195,92 @@ try:
                 db.session.execute(text("ALTER TABLE letter ADD COLUMN moderation_reason TEXT"))
             if 'moderation_checked' not in cols:
                 db.session.execute(text("ALTER TABLE letter ADD COLUMN moderation_checked BOOLEAN DEFAULT 0"))
+            if 'moderation_status' not in cols:
+                db.session.execute(text("ALTER TABLE letter ADD COLUMN moderation_status VARCHAR(20)"))
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_letter_moderation_status ON letter(moderation_status)"))
+            # Existing rows get 0 (never scanned by a rule pack), so the rule rescan picks them up
+            if 'moderation_rule_version' not in cols:
+                db.session.execute(text("ALTER TABLE letter ADD COLUMN moderation_rule_version INTEGER DEFAULT 0"))
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_letter_moderation_rule_version ON letter(moderation_rule_version)"))
+            if 'simhash' not in cols:
+                db.session.execute(text("ALTER TABLE letter ADD COLUMN simhash BIGINT"))
+            # Fingerprints are only read back in bulk by created_at (_near_duplicate_index)
+            db.session.execute(text("DROP INDEX IF EXISTS ix_letter_simhash"))
+            if 'content_sha256' not in cols:
+                db.session.execute(text("ALTER TABLE letter ADD COLUMN content_sha256 VARCHAR(64)"))
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_letter_anon_content_created "
+                                    "ON letter(anon_user_id, content_sha256, created_at)"))
+            # Join keys for the volunteer dashboard's unread-replies aggregate
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_response_letter_id ON response(letter_id)"))
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_user_reply_response_id ON user_reply(response_id)"))
+            reply_counters_added = 'unread_reply_count' not in cols
+            if reply_counters_added:
+                db.session.execute(text("ALTER TABLE letter ADD COLUMN unread_reply_count INTEGER DEFAULT 0"))
+            if 'last_reply_at' not in cols:
+                db.session.execute(text("ALTER TABLE letter ADD COLUMN last_reply_at TIMESTAMP"))
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_letter_unread_replies "
+                                    "ON letter(last_reply_at) WHERE unread_reply_count > 0"))
+            if reply_counters_added:
+                reconcile_reply_counters()
             db.session.commit()
+            _backfill_letter_content_hashes()
+            _backfill_letter_simhashes()
+            # Nav-badge counters: seeded from `letter` only when their rows are missing;
+            # full rebuilds are `flask recount-letters`
+            LetterCounter.values()
             logger.info("Anonymous inbox schema ensured")
         except Exception as mig_e:
             logger.warning(f"Anonymous inbox schema check/apply failed or already applied: {mig_e}")
 
+    def _backfill_letter_content_hashes(batch_size=500):
+        """Hash letters stored before content_sha256 existed, one bulk UPDATE per committed batch."""
+        letter = Letter.__table__
+        stmt = (update(letter)
+                .where(letter.c.id == bindparam('b_id'))
+                # Bookkeeping, not an edit: keep updated_at as it was
+                .values(content_sha256=bindparam('b_hash'), updated_at=letter.c.updated_at))
+        filled = 0
+        while True:
+            rows = (db.session.query(Letter.id, Letter.content)
+                    .filter(Letter.content_sha256.is_(None))
+                    .limit(batch_size)
+                    .all())
+            if not rows:
+                break
+            db.session.execute(stmt, [{'b_id': letter_id, 'b_hash': Letter.hash_content(content)}
+                                      for letter_id, content in rows])
+            db.session.commit()
+            filled += len(rows)
+        if filled:
+            logger.info(f"Backfilled content_sha256 for {filled} letters")
+
+    def _backfill_letter_simhashes(batch_size=500):
+        """Fingerprint recent letters stored before simhash existed, one bulk UPDATE per batch.
+
+        Only letters inside the near-duplicate window are ever loaded into the
+        index, so older ones are left alone.
+        """
+        since = datetime.utcnow() - timedelta(seconds=near_dup.near_duplicates.window)
+        letter = Letter.__table__
+        stmt = (update(letter)
+                .where(letter.c.id == bindparam('b_id'))
+                # Bookkeeping, not an edit: keep updated_at as it was
+                .values(simhash=bindparam('b_simhash'), updated_at=letter.c.updated_at))
+        filled = 0
+        while True:
+            rows = (db.session.query(Letter.id, Letter.content)
+                    .filter(Letter.simhash.is_(None), Letter.created_at >= since)
+                    .limit(batch_size)
+                    .all())
+            if not rows:
+                break
+            db.session.execute(stmt, [{'b_id': letter_id, 'b_simhash': near_dup.to_db(near_dup.simhash(content or ''))}
+                                      for letter_id, content in rows])
+            db.session.commit()
+            filled += len(rows)
+        if filled:
+            logger.info(f"Backfilled simhash for {filled} recent letters")
+
     def _bootstrap_database():
         """Bootstrap SQLite/schema on classic servers.
 
@@ -237,12 +326,61 @@ try:
     register_commands(app)
 
     # ---------------- Instagram Feed (Basic Display API) -----------------
+    # Fetching is split into url/page/normalize steps shared with the async
+    # routes in asgi.py; both serve from the same 10 minute caches.
     _ig_cache = { 'ts': 0, 'data': [] }
+    IG_MAX_ITEMS = 60  # cap to keep response light
+
+    def _instagram_token():
+        return os.environ.get('INSTAGRAM_ACCESS_TOKEN') or app.config.get('INSTAGRAM_ACCESS_TOKEN')
+
+    def _instagram_first_url(access_token):
+        fields = 'id,caption,media_type,media_url,permalink,thumbnail_url,timestamp'
+        return f'https://graph.instagram.com/me/media?fields={fields}&access_token={access_token}&limit=25'
+
+    def _instagram_collect_page(payload, collected, seen_ids):
+        """Add one page of media to `collected`; return the next page URL (or None)."""
+        page_items = payload.get('data', []) if isinstance(payload, dict) else []
+        for it in page_items:
+            iid = it.get('id')
+            if not iid or iid in seen_ids:
+                continue
+            seen_ids.add(iid)
+            collected.append(it)
+            if len(collected) >= IG_MAX_ITEMS:
+                break
+        # follow paging if available
+        try:
+            paging = payload.get('paging', {}) if isinstance(payload, dict) else {}
+            return paging.get('next') or None
+        except Exception:
+            return None
+
+    def _instagram_store(collected, now):
+        # Sort by timestamp (newest first)
+        collected.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+
+        # Normalize
+        normalized = []
+        for it in collected:
+            normalized.append({
+                'id': it.get('id'),
+                'caption': it.get('caption'),
+                'type': it.get('media_type'),
+                'url': it.get('media_url'),
+                'thumb': it.get('thumbnail_url') or it.get('media_url'),
+                'permalink': it.get('permalink'),
+                'timestamp': it.get('timestamp')
+            })
+
+        _ig_cache['data'] = normalized
+        _ig_cache['ts'] = now
+        return normalized
 
     @app.route('/api/instagram-feed')
     def instagram_feed():
         try:
-            access_token = os.environ.get('INSTAGRAM_ACCESS_TOKEN') or app.config.get('INSTAGRAM_ACCESS_TOKEN')
+            access_token = _instagram_token()
             if not access_token:
                 return jsonify({ 'items': [], 'error': 'INSTAGRAM_ACCESS_TOKEN not set' }), 200
 
@@ -251,55 +389,16 @@ try:
             if _ig_cache['data'] and now - _ig_cache['ts'] < 600:
                 return jsonify({ 'items': _ig_cache['data'] })
 
-            fields = 'id,caption,media_type,media_url,permalink,thumbnail_url,timestamp'
-            url = f'https://graph.instagram.com/me/media?fields={fields}&access_token={access_token}&limit=25'
-
+            url = _instagram_first_url(access_token)
             collected = []
             seen_ids = set()
-            max_items = 60  # cap to keep response light
 
             with httpx.Client(timeout=10) as client:
-                while url and len(collected) < max_items:
+                while url and len(collected) < IG_MAX_ITEMS:
                     r = client.get(url)
-                    payload = r.json()
-                    page_items = payload.get('data', []) if isinstance(payload, dict) else []
-                    for it in page_items:
-                        iid = it.get('id')
-                        if not iid or iid in seen_ids:
-                            continue
-                        seen_ids.add(iid)
-                        collected.append(it)
-                        if len(collected) >= max_items:
-                            break
-                    # follow paging if available
-                    url = None
-                    try:
-                        paging = payload.get('paging', {}) if isinstance(payload, dict) else {}
-                        next_url = paging.get('next')
-                        if next_url:
-                            url = next_url
-                    except Exception:
-                        url = None
-
-            # Sort by timestamp (newest first)
-            collected.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-
-            # Normalize
-            normalized = []
-            for it in collected:
-                normalized.append({
-                    'id': it.get('id'),
-                    'caption': it.get('caption'),
-                    'type': it.get('media_type'),
-                    'url': it.get('media_url'),
-                    'thumb': it.get('thumbnail_url') or it.get('media_url'),
-                    'permalink': it.get('permalink'),
-                    'timestamp': it.get('timestamp')
-                })
-
-            _ig_cache['data'] = normalized
-            _ig_cache['ts'] = now
-            return jsonify({ 'items': normalized })
+                    url = _instagram_collect_page(r.json(), collected, seen_ids)
+
+            return jsonify({ 'items': _instagram_store(collected, now) })
         except Exception as e:
             app.logger.error(f"Instagram feed error: {e}")
             return jsonify({ 'items': [] }), 200
@@ -307,63 +406,68 @@ try:
     # ---------------- YouTube latest via RSS (uploads feed) -----------------
     _yt_cache = { 'ts': 0, 'item': None }
 
+    def _youtube_rss_url():
+        # Allow config via env: YOUTUBE_HANDLE or YOUTUBE_CHANNEL_ID
+        yt_handle = os.environ.get('YOUTUBE_HANDLE') or app.config.get('YOUTUBE_HANDLE') or 'echoe_hosa'
+        yt_channel_id = os.environ.get('YOUTUBE_CHANNEL_ID') or app.config.get('YOUTUBE_CHANNEL_ID')
+        if yt_channel_id:
+            return f'https://www.youtube.com/feeds/videos.xml?channel_id={yt_channel_id}'
+        # Handle uploads feed by user name/handle
+        return f'https://www.youtube.com/feeds/videos.xml?user={yt_handle}'
+
+    def _youtube_parse_latest(rss_text):
+        """Latest video from the uploads feed as a dict; None when the feed has no entries."""
+        # Parse RSS (Atom)
+        # Namespaces for YouTube Atom feeds
+        ns = {
+            'atom': 'http://www.w3.org/2005/Atom',
+            'media': 'http://search.yahoo.com/mrss/'
+        }
+        root = ET.fromstring(rss_text)
+        entry = root.find('atom:entry', ns)
+        if entry is None:
+            return None
+
+        vid_id_el = entry.find('yt:videoId', {
+            'yt': 'http://www.youtube.com/xml/schemas/2015',
+            'atom': ns['atom'],
+            'media': ns['media']
+        })
+        link_el = entry.find('atom:link', ns)
+        title_el = entry.find('atom:title', ns)
+        published_el = entry.find('atom:published', ns)
+        thumb_el = entry.find('media:group/media:thumbnail', ns)
+
+        video_id = vid_id_el.text if vid_id_el is not None else None
+        link = link_el.get('href') if link_el is not None else (f'https://www.youtube.com/watch?v={video_id}' if video_id else None)
+        title = title_el.text if title_el is not None else ''
+        published = published_el.text if published_el is not None else ''
+        thumb = thumb_el.get('url') if thumb_el is not None else None
+
+        return {
+            'video_id': video_id,
+            'url': link,
+            'title': title,
+            'published': published,
+            'thumb': thumb,
+            'embed_url': f'https://www.youtube.com/embed/{video_id}' if video_id else None
+        }
+
     @app.route('/api/youtube-latest')
     def youtube_latest():
         try:
-            # Allow config via env: YOUTUBE_HANDLE or YOUTUBE_CHANNEL_ID
-            yt_handle = os.environ.get('YOUTUBE_HANDLE') or app.config.get('YOUTUBE_HANDLE') or 'echoe_hosa'
-            yt_channel_id = os.environ.get('YOUTUBE_CHANNEL_ID') or app.config.get('YOUTUBE_CHANNEL_ID')
-
             now = time.time()
             if _yt_cache['item'] and now - _yt_cache['ts'] < 600:
                 return jsonify(_yt_cache['item'])
 
-            if yt_channel_id:
-                rss_url = f'https://www.youtube.com/feeds/videos.xml?channel_id={yt_channel_id}'
-            else:
-                # Handle uploads feed by user name/handle
-                rss_url = f'https://www.youtube.com/feeds/videos.xml?user={yt_handle}'
-
             with httpx.Client(timeout=10) as client:
-                r = client.get(rss_url)
+                r = client.get(_youtube_rss_url())
                 rss_text = r.text
 
-            # Parse RSS (Atom)
-            # Namespaces for YouTube Atom feeds
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'media': 'http://search.yahoo.com/mrss/'
-            }
-            root = ET.fromstring(rss_text)
-            entry = root.find('atom:entry', ns)
-            if entry is None:
+            item = _youtube_parse_latest(rss_text)
+            if item is None:
                 return jsonify({'error': 'No entries'}), 200
 
-            vid_id_el = entry.find('yt:videoId', {
-                'yt': 'http://www.youtube.com/xml/schemas/2015',
-                'atom': ns['atom'],
-                'media': ns['media']
-            })
-            link_el = entry.find('atom:link', ns)
-            title_el = entry.find('atom:title', ns)
-            published_el = entry.find('atom:published', ns)
-            thumb_el = entry.find('media:group/media:thumbnail', ns)
-
-            video_id = vid_id_el.text if vid_id_el is not None else None
-            link = link_el.get('href') if link_el is not None else (f'https://www.youtube.com/watch?v={video_id}' if video_id else None)
-            title = title_el.text if title_el is not None else ''
-            published = published_el.text if published_el is not None else ''
-            thumb = thumb_el.get('url') if thumb_el is not None else None
-
-            item = {
-                'video_id': video_id,
-                'url': link,
-                'title': title,
-                'published': published,
-                'thumb': thumb,
-                'embed_url': f'https://www.youtube.com/embed/{video_id}' if video_id else None
-            }
-
             _yt_cache['item'] = item
             _yt_cache['ts'] = now
             return jsonify(item)
@@ -373,21 +477,16 @@ try:
     
     @login_manager.user_loader
     def load_user(user_id):
-        logger.info(f"Loading user with ID: {user_id}")
         try:
             user = User.query.get(int(user_id))
             if user:
-                # Debug info
-                logger.info(f"Loaded user: {user.username}, type: {type(user)}")
-                logger.info(f"Has has_admin_access method: {hasattr(user, 'has_admin_access')}")
-                
                 if not hasattr(user, 'has_admin_access'):
                     # Force refresh and try to recreate the object
                     logger.warning("User object missing methods, attempting to fix...")
                     db.session.refresh(user)
                     db.session.expunge(user)
                     user = User.query.get(int(user_id))
-                    logger.info(f"After refresh - Has has_admin_access method: {hasattr(user, 'has_admin_access')}")
+                    logger.debug(f"After refresh - Has has_admin_access method: {hasattr(user, 'has_admin_access')}")
             return user
         except Exception as e:
             logger.error(f"Error loading user {user_id}: {e}")
@@ -566,82 +665,88 @@ try:
 
         return tips, question
 
+    # submit.html polls /api/coach every few seconds with an unchanged draft;
+    # identical (mode, draft, letter) requests are answered from this cache.
+    coach_cache = LRUTTLCache(maxsize=app.config.get('COACH_CACHE_SIZE', 512),
+                              ttl=app.config.get('COACH_CACHE_TTL', 300))
+
+    def _coach_request(body: dict):
+        """(content, mode, letter_ctx, cache_key) from an /api/coach JSON body."""
+        content = (body.get('content') or '').strip()
+        mode = (body.get('mode') or 'reply').strip()  # 'reply' | 'rephrase' | 'write'
+        letter_ctx = (body.get('letter') or '')[:4000]
+        return content, mode, letter_ctx, (mode, content_hash(content), content_hash(letter_ctx))
+
+    def _coach_payload(mode: str, content: str, letter_ctx: str) -> dict:
+        """Gemini request for coach tips; emphasize most-recent lines but include full context."""
+        recent = content[-600:]
+        if mode == 'rephrase':
+            prompt = (f"Original letter (context for issues):\n'''{letter_ctx}'''\n\n"
+                      f"Reviewer notes / latest typing (focus):\n'''{recent}'''\n")
+        elif mode == 'write':
+            prompt = (f"What they've written so far (full context):\n'''{letter_ctx}'''\n\n"
+                      f"Latest typing (focus first):\n'''{recent}'''\n")
+        else:  # reply
+            prompt = (f"Original letter (reader context):\n'''{letter_ctx}'''\n\n"
+                      f"Volunteer draft / latest typing (focus):\n'''{recent}'''\n")
+        return {
+            "systemInstruction": prompts.coach_instruction(mode),
+            "contents": prompts.user_content(prompt),
+            "generationConfig": {"temperature": 0.6, "topP": 0.9},
+        }
+
+    def _coach_ai_tips(data) -> list:
+        """Bullet tips parsed from a Gemini coach reply."""
+        ai_text = candidate_text(data).strip()
+        ai_tips = []
+        if ai_text:
+            lines = [ln.strip() for ln in ai_text.splitlines() if ln.strip()]
+            for ln in lines:
+                if ln.startswith(('- ', '• ', '* ', '– ')) or re.match(r"^\d+[\).]\s", ln):
+                    cleaned = re.sub(r"^(?:[-•*–]\s|\d+[\).]\s)", '', ln).strip()
+                    if cleaned:
+                        ai_tips.append(cleaned)
+            if not ai_tips and '•' in ai_text:
+                ai_tips = [seg.strip() for seg in ai_text.split('•') if seg.strip()]
+        return ai_tips
+
     # API: Gentle AI coach for writing guidance (does not change user's words)
+    # (asgi.py serves an async twin of this route)
     @app.route('/api/coach', methods=['POST'])
     def api_coach():
+        content, mode = '', 'reply'
         try:
-            payload = request.get_json(silent=True) or {}
-            content = (payload.get('content') or '').strip()
-            mode = (payload.get('mode') or 'reply').strip()  # 'reply' | 'rephrase' | 'write'
+            content, mode, letter_ctx, cache_key = _coach_request(request.get_json(silent=True) or {})
+            cached = coach_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
 
-            app.logger.info(f"Coach API called: content='{content[:50]}...', mode={mode}")
+            app.logger.debug(f"Coach API called: mode={mode}, {len(content)} chars")
 
             # Baseline dynamic tips
             tips, question = _heuristic_coach_suggestions(content, mode)
+            ai_failed = False
 
-            # Prefer Gemini when available; emphasize most-recent lines but include full context
-            _api_key_present = bool(app.config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY'))
-            if _api_key_present and content:
+            # Prefer Gemini when available; past the rate limit the heuristic tips are served
+            if gemini.available and content and rate_limiter.limited('coach', _client_ip()):
+                ai_failed = True
+            elif gemini.available and content:
                 try:
-                    recent = content[-600:]
-                    letter_ctx = (payload.get('letter') or '')[:4000]
-                    if mode == 'rephrase':
-                        prompt = (
-                            "You are a gentle rephrasing guide for the E.C.H.O.E. platform.\n"
-                            "Task: Offer guidance so the WRITER can rephrase their own words respectfully.\n"
-                            "Rules: Never rewrite text; give coaching prompts only.\n"
-                            "Output EXACTLY 3 short, actionable bullet tips (no intro/outro), <= 18 words each.\n"
-                            f"Original letter (context for issues):\n'''{letter_ctx}'''\n\n"
-                            f"Reviewer notes / latest typing (focus):\n'''{recent}'''\n"
-                        )
-                    elif mode == 'write':
-                        prompt = (
-                            "You are a gentle, non-judgmental writing coach for the E.C.H.O.E. platform.\n"
-                            "Task: Kindly guide the WRITER with soft, collaborative suggestions.\n"
-                            "Tone: warm, supportive, never corrective; avoid judgment, avoid teacher-like phrasing.\n"
-                            "Style: use hedging like 'you might', 'perhaps', 'if you'd like', 'could'.\n"
-                            "Rules: Do NOT rewrite their words; give coaching prompts only.\n"
-                            "Output 3-4 short bullet tips (no intro/outro), <= 18 words each.\n"
-                            f"What they've written so far (full context):\n'''{letter_ctx}'''\n\n"
-                            f"Latest typing (focus first):\n'''{recent}'''\n"
-                        )
-                    else:  # reply
-                        prompt = (
-                            "You are a gentle reply coach for E.C.H.O.E. volunteers.\n"
-                            "Task: Offer soft, practical prompts that help craft an empathetic reply.\n"
-                            "Tone: kind, collaborative, not directive; avoid judging or sounding like a teacher.\n"
-                            "Style: use hedging like 'you could', 'perhaps', 'consider', 'one option is'.\n"
-                            "Rules: Do NOT write the reply; give coaching prompts only.\n"
-                            "Output 3-4 short bullet tips (no intro/outro), <= 18 words each.\n"
-                            f"Original letter (reader context):\n'''{letter_ctx}'''\n\n"
-                            f"Volunteer draft / latest typing (focus):\n'''{recent}'''\n"
-                        )
-                    api_key = app.config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY')
-                    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={api_key}"
-                    payload = {"contents": [{"parts": [{"text": prompt}]}], "generationConfig": {"temperature": 0.6, "topP": 0.9}}
-                    with httpx.Client(timeout=15) as client:
-                        resp = client.post(url, json=payload)
-                        data = resp.json()
-                    ai_text = None
-                    if isinstance(data, dict) and data.get('candidates'):
-                        ai_text = " ".join([p.get('text','') for p in data['candidates'][0]['content']['parts']]).strip()
-                    ai_tips = []
-                    if ai_text:
-                        lines = [ln.strip() for ln in ai_text.splitlines() if ln.strip()]
-                        for ln in lines:
-                            if ln.startswith(('- ', '• ', '* ', '– ')) or re.match(r"^\d+[\).]\s", ln):
-                                cleaned = re.sub(r"^(?:[-•*–]\s|\d+[\).]\s)", '', ln).strip()
-                                if cleaned:
-                                    ai_tips.append(cleaned)
-                        if not ai_tips and '•' in ai_text:
-                            ai_tips = [seg.strip() for seg in ai_text.split('•') if seg.strip()]
+                    data = gemini.generate_content(_coach_payload(mode, content, letter_ctx),
+                                                   call_type=f"coach_{mode}")
+                    ai_tips = _coach_ai_tips(data)
                     if ai_tips:
                         tips = ai_tips[:4]
                 except Exception as e:
+                    ai_failed = True
                     app.logger.warning(f"Gemini coach call failed: {e}")
 
             # Return up to 4 bullets to support denser guidance
-            return jsonify({'tips': tips[:4], 'question': question})
+            result = {'tips': tips[:4], 'question': question}
+            # Don't pin heuristic tips for the whole TTL after a transient AI failure (or rate limit)
+            if not ai_failed:
+                coach_cache.set(cache_key, result)
+            return jsonify(result)
         except Exception as e:
             app.logger.error(f"api_coach error: {e}")
             # Fallback even on error
@@ -649,104 +754,204 @@ try:
             return jsonify({'tips': tips[:4], 'question': question}), 200
 
     # --- Moderation helpers ---
-    def _normalize_for_moderation(text: str) -> tuple[str, str]:
-        """Return (simple_norm, ascii_norm) for leetspeak/spacing obfuscation checks."""
-        t = (text or '').lower()
-        # Replace common leetspeak digits
-        t = (t
-             .replace('0', 'o')
-             .replace('1', 'i')
-             .replace('3', 'e')
-             .replace('4', 'a')
-             .replace('5', 's')
-             .replace('7', 't')
-             .replace('8', 'b'))
-        # Remove non-letters/digits to defeat inserted punctuation/spaces
-        simple = re.sub(r"[^\w\u0080-\uffff]+", "", t)
-        # Collapse 3+ repeats to 2
-        simple = re.sub(r"(.)\1{2,}", r"\1\1", simple)
-        try:
-            import unicodedata
-            ascii_norm = unicodedata.normalize('NFKD', simple).encode('ascii', 'ignore').decode('ascii')
-        except Exception:
-            ascii_norm = simple
-        return simple, ascii_norm
-
-    def _deterministic_match(text: str) -> tuple[bool, str]:
-        lower = (text or '').lower()
-        simple, ascii_norm = _normalize_for_moderation(text)
-        # Core categories across languages (stems/keywords)
-        hard_keywords = [
-            # Self-harm / suicide (multi-lang, stems)
-            'suicide','selfharm','endmylife','hangmyself','overdose','kms','killmyself',
-            'tuersoi','seppuku','suicidio','suicidar','suicidarse','suicid', 'самоубий', 'суицид', '죽다', '自杀', '自殺', '自殺',
-            # Threats / violence
-            'killyou','shoot','bomb','terrorist','execute','stab','toten','toten','tuer','matar','убью','殺す','korosu','杀了你','죽여',
-            # Sexual violence
-            'rape','rapist','vergewaltig','viol', 'violar','강간','レイプ','强奸','اغتصاب',
-            # Doxxing / illegal
-            'dox','leakaddress','creditcard','ssn','socialsecurity',
-            # Hate slurs/profanity (representative; not exhaustive)
-            'nigger','faggot','kike','chink','spic','retard','tranny',
-            'puta','pendejo','mierda','cabron','putain','salope','encule','merde','scheisse','arschloch','hurensohn',
-            'blyat','suka','сука','бляд',
-            'fuck','motherfucker','cunt','shit','bitch','asshole',
-            '操','傻逼','妈的','去死','滚','垃圾',
-            '死ね','くそ','畜生',
-            '씨발','좆','병신'
-        ]
-        haystacks = [lower, simple, ascii_norm]
-        for kw in hard_keywords:
-            for h in haystacks:
-                if kw in h:
-                    return True, kw
-        return False, ''
+    # Normalizer, keyword list and the verdict cache live in moderation.py
+    _deterministic_match = moderator.deterministic_match
 
-    def ai_moderate_letter_content(text: str) -> tuple[bool, str]:
-        """Return (flagged, reason). Deterministic scan first, then AI JSON (multi‑lingual)."""
-        flagged_kw, kw = _deterministic_match(text)
-        if flagged_kw:
-            return True, f"keyword: {kw}"
+    def _ai_moderation_verdict(text: str):
+        """AI JSON verdict (multi‑lingual) as (flagged, reason); None if the AI gave no usable answer."""
         try:
-            prompt = (
-                "You are a strict but fair community safety checker. The text may be in ANY language.\n"
-                "Decide if it should be suspended for admin review before volunteers see it.\n"
-                "Reasons: hate/harassment, self-harm intent, explicit sexual content, doxxing, threats, spam/scams, minors sexual content, or severe profanity.\n"
-                "Be robust to obfuscation: leetspeak (e.g., 5u1c1d3), repeated letters, inserted punctuation/spaces, transliteration, and emojis implying violence/sex.\n"
-                "Consider context; support-seeking mentions of self-harm without plan can pass.\n"
-                "Respond ONLY in JSON with keys flagged (true/false) and reason (short).\n"
-                f"Letter: '''{text[:6000]}'''\n"
-            )
+            prompt = f"Letter: '''{text[:6000]}'''\n"
             result = generate_ai_response_with_type(prompt, 'moderation')
             if result:
-                try:
-                    data = json.loads(result)
-                    flagged = bool(data.get('flagged'))
-                    reason = (data.get('reason') or '').strip()
-                    return flagged, reason
-                except Exception:
-                    pass
+                data = json.loads(result)
+                return bool(data.get('flagged')), (data.get('reason') or '').strip()
         except Exception:
             pass
-        return False, ''
+        return None
+
+    # Also used by `flask remoderate` (cli_commands.py)
+    moderator.ai_check = _ai_moderation_verdict
+
+    def ai_moderate_letter_content(text: str) -> tuple[bool, str]:
+        """Return (flagged, reason). Deterministic scan first, then AI; repeats come from the verdict cache."""
+        return moderator.moderate(text)
+
+    def _generate_letter_title(content: str):
+        """Ask Gemini for a concise title; None when nothing usable comes back."""
+        generated = generate_ai_response_with_type(f"Entry: {content}", 'title')
+        if not generated:
+            return None
+        # Clean up to a single line, truncate
+        clean = (generated or '').split('\n')[0].strip().strip('"\' ')
+        return clean[:140] if clean else None
+
+    def _finish_letter_moderation(letter_id):
+        """Background task: AI moderation first (unhides the letter), then the title."""
+        with app.app_context():
+            letter = db.session.get(Letter, letter_id)
+            if letter is None:
+                return
+            if letter.moderation_status == 'pending':
+                rule_version = moderator.keyword_version
+                flagged, reason = ai_moderate_letter_content(letter.content)
+                letter.is_flagged = bool(letter.is_flagged or flagged)
+                letter.moderation_reason = reason
+                letter.moderation_checked = True
+                letter.moderation_rule_version = rule_version
+                letter.moderation_status = 'done'
+                db.session.commit()
+            if not letter.title:
+                try:
+                    letter.title = _generate_letter_title(letter.content)
+                    db.session.commit()
+                except Exception as te:
+                    db.session.rollback()
+                    logger.warning(f"Title generation failed for letter {letter_id}: {te}")
+
+    def _pending_moderation_ids():
+        with app.app_context():
+            rows = (db.session.query(Letter.id)
+                    .filter(Letter.moderation_status == 'pending')
+                    .order_by(Letter.id)
+                    .limit(500)
+                    .all())
+            return [row[0] for row in rows]
+
+    moderation_queue = ModerationQueue(_finish_letter_moderation, sweep=_pending_moderation_ids,
+                                       workers=app.config.get('MODERATION_WORKERS', 2))
+
+    def _queue_letter_moderation(letter_id):
+        """Hand a freshly committed letter to the background queue (inline on serverless)."""
+        if app.config.get('MODERATION_ASYNC'):
+            moderation_queue.start(socketio.start_background_task)
+            # If the queue is full the idle-time sweep picks the letter up later
+            moderation_queue.enqueue(letter_id)
+            return
+        _finish_letter_moderation(letter_id)
+
+    # Outbound calls fanned out by submit() (green threads under eventlet)
+    _submit_pool = ThreadPoolExecutor(max_workers=app.config.get('SUBMIT_FANOUT_WORKERS', 8))
+
+    def _verify_recaptcha(secret: str, token: str, client_ip: str) -> bool:
+        """reCAPTCHA siteverify over the shared pooled httpx client."""
+        resp = gemini.shared_http().post(
+            app.config.get('RECAPTCHA_VERIFY_URL') or 'https://www.google.com/recaptcha/api/siteverify',
+            data={'secret': secret, 'response': token, 'remoteip': client_ip},
+            timeout=5
+        )
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        return bool(data.get('success'))
+
+    def _fan_out_submit(captcha, content: str, deadline: float, needs_ai_check: bool) -> dict:
+        """Run submit()'s outbound calls together under one shared deadline.
+
+        Without a background queue, the AI moderation check and title run alongside
+        the captcha check, so the wait is the slowest call rather than the sum; see
+        submit_fanout.gather_submit_calls for what comes back.
+        """
+        calls = {}
+        if not app.config.get('MODERATION_ASYNC'):
+            if needs_ai_check:
+                calls['moderation'] = _submit_pool.submit(ai_moderate_letter_content, content)
+            calls['title'] = _submit_pool.submit(_generate_letter_title, content)
+        return gather_submit_calls(captcha, calls, deadline)
+
+    def _store_late_submit_call(letter_id, rule_version, name, future):
+        """Save an AI result that missed submit()'s deadline once it arrives.
+
+        The call already ran once, so it isn't repeated. The letter went out
+        keyword-clean and unchecked, so a late verdict can only flag it; if the
+        call failed (or this callback never runs on a frozen serverless instance)
+        the letter stays unchecked (or untitled) for `flask remoderate --unchecked-only`.
+        """
+        if future.cancelled() or future.exception() is not None:
+            logger.warning(f"Late submit {name} call for letter {letter_id} failed: "
+                           f"{'cancelled' if future.cancelled() else future.exception()}")
+            return
+        with app.app_context():
+            try:
+                letter = db.session.get(Letter, letter_id)
+                if letter is None:
+                    return
+                if name == 'moderation' and not letter.moderation_checked:
+                    flagged, reason = future.result()
+                    # An admin may have flagged it meanwhile: keep that reason
+                    if flagged or not letter.is_flagged:
+                        letter.moderation_reason = reason
+                    letter.is_flagged = bool(letter.is_flagged or flagged)
+                    letter.moderation_checked = True
+                    letter.moderation_rule_version = max(letter.moderation_rule_version or 0, rule_version)
+                elif name == 'title' and not letter.title:
+                    letter.title = future.result()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Could not store late submit {name} result for letter {letter_id}: {e}")
+
+    @app.before_request
+    def _start_moderation_queue():
+        # Started lazily so pending letters from before a restart get swept
+        if app.config.get('MODERATION_ASYNC'):
+            moderation_queue.start(socketio.start_background_task)
+            rule_pack_watcher.check(socketio.start_background_task)
+        else:
+            # No background workers here: hot-swap only, `flask rescan-rules` catches letters up
+            rule_pack_watcher.check()
+
+    def _near_duplicate_index():
+        """The in-memory SimHash index, loaded from recent letters' stored fingerprints on first use.
+
+        Letters from before fingerprints existed get theirs at boot
+        (_backfill_letter_simhashes); any still missing one are left out.
+        """
+        index = near_dup.near_duplicates
+        if index.warmed:
+            return index
+        since = datetime.utcnow() - timedelta(seconds=index.window)
+        rows = (db.session.query(Letter.id, Letter.simhash, Letter.anon_user_id, Letter.created_at)
+                .filter(Letter.created_at >= since, Letter.simhash.isnot(None))
+                .order_by(Letter.id.desc())
+                .limit(index.max_entries)
+                .all())
+        loaded = [(letter_id, near_dup.from_db(stored), anon_id, (created_at - datetime(1970, 1, 1)).total_seconds())
+                  for letter_id, stored, anon_id, created_at in reversed(rows)]
+        index.warm(loaded)
+        logger.info(f"Near-duplicate index loaded with {len(loaded)} recent letters")
+        return index
+
+    def _sender_window():
+        """The per-sender sliding window, caught up with letters any process wrote since the last sync."""
+        def load_rows(after_id, since_ts):
+            since = datetime(1970, 1, 1) + timedelta(seconds=since_ts)
+            rows = (db.session.query(Letter.id, Letter.anon_user_id, Letter.created_at)
+                    .filter(Letter.id > after_id)
+                    .filter(Letter.created_at > since)
+                    .filter(Letter.anon_user_id.isnot(None))
+                    .order_by(Letter.id)
+                    .all())
+            return [(letter_id, anon_id, (created_at - datetime(1970, 1, 1)).total_seconds())
+                    for letter_id, anon_id, created_at in rows]
+        warmed = sender_window.warmed
+        sender_window.sync(load_rows)
+        if not warmed:
+            logger.info(f"Sender window loaded: {sender_window.stats()}")
+        return sender_window
 
     # Route: Submit letter
     @app.route('/submit', methods=['GET', 'POST'])
     def submit():
         try:
-            # Debug information
-            app.logger.info(f"Request language: {request.headers.get('Accept-Language', 'None')}")
-            app.logger.info(f"Template folder: {app.template_folder}")
-            app.logger.info(f"Available templates: {os.listdir(app.template_folder)}")
-            
             form = LetterForm()
-            mailboxes = PhysicalMailbox.query.filter_by(status='active').all()
+            mailboxes = mailbox_cache.mailboxes()
             recaptcha_site_key = app.config.get('RECAPTCHA_SITE_KEY')
             recaptcha_secret = app.config.get('RECAPTCHA_SECRET')
 
             # Basic IP-level rate limit to protect against automated abuse
-            client_ip = (request.headers.get('X-Forwarded-For', request.remote_addr or '') or '').split(',')[0].strip()
-            if _ip_limited(client_ip):
+            client_ip = _client_ip()
+            if rate_limiter.limited('submit', client_ip):
                 flash('We are receiving a lot of traffic from your network. Please wait a minute and try again.', 'info')
                 return render_template('submit.html', form=form, mailboxes=mailboxes,
                                        recaptcha_site_key=recaptcha_site_key)
@@ -754,36 +959,17 @@ try:
             if form.validate_on_submit():
                 # Google reCAPTCHA v2 checkbox verification. With valid keys configured,
                 # we require a successful check before accepting a letter submission.
+                # The check runs in the background while the local checks below (and,
+                # without a moderation queue, the AI calls) proceed; see _fan_out_submit.
+                captcha = None
                 if recaptcha_site_key and recaptcha_secret:
                     token = request.form.get('g-recaptcha-response')
                     if not token:
                         flash('Please complete the spam protection check before sending your letter.', 'error')
                         return render_template('submit.html', form=form, mailboxes=mailboxes,
                                                recaptcha_site_key=recaptcha_site_key)
-                    try:
-                        verify_resp = requests.post(
-                            'https://www.google.com/recaptcha/api/siteverify',
-                            data={
-                                'secret': recaptcha_secret,
-                                'response': token,
-                                'remoteip': client_ip,
-                            },
-                            timeout=5
-                        )
-                        data = {}
-                        try:
-                            data = verify_resp.json()
-                        except Exception:
-                            data = {}
-                        if not data.get('success'):
-                            flash('We could not verify that you are a real person. Please try again.', 'error')
-                            return render_template('submit.html', form=form, mailboxes=mailboxes,
-                                                   recaptcha_site_key=recaptcha_site_key)
-                    except Exception as ce:
-                        logger.warning(f'reCAPTCHA v2 verification error: {ce}')
-                        flash('Spam protection is temporarily unavailable. Please try again in a moment.', 'error')
-                        return render_template('submit.html', form=form, mailboxes=mailboxes,
-                                               recaptcha_site_key=recaptcha_site_key)
+                    captcha = _submit_pool.submit(_verify_recaptcha, recaptcha_secret, token, client_ip)
+                deadline = time.monotonic() + app.config.get('SUBMIT_DEADLINE_SECONDS', 8)
 
                 # Prepare submit context and de-duplicate / rate‑limit posts
                 content_clean = (form.content.data or '').strip()
@@ -806,12 +992,13 @@ try:
                     return redirect(url_for('submit'))
 
                 # Block duplicates submitted within the last 3 minutes by same anon user and same content
+                # (an index seek on (anon_user_id, content_sha256, created_at))
                 recent_window = datetime.utcnow() - timedelta(minutes=3)
                 existing = (
                     Letter.query
                     .filter(Letter.anon_user_id == anon_cookie)
+                    .filter(Letter.content_sha256 == Letter.hash_content(content_clean))
                     .filter(Letter.created_at >= recent_window)
-                    .filter(Letter.content == content_clean)
                     .order_by(Letter.created_at.desc())
                     .first()
                 )
@@ -821,38 +1008,66 @@ try:
                     resp.set_cookie('echoe_anon', anon_cookie, max_age=60*60*24*730, httponly=True, samesite='Lax', secure=True)
                     return resp
 
+                # Lightly edited copies, from this sender or any other, within the window
+                fingerprint = near_dup.simhash(content_clean)
+                near_index = _near_duplicate_index()
+                near_matches = near_index.find(fingerprint)
+
+                # Deterministic keyword scan is instant; the AI check and title
+                # generation run in the background moderation queue after commit
+                # (or alongside reCAPTCHA when there is no queue).
+                rule_version = moderator.keyword_version
+                flagged, kw = _deterministic_match(content_clean)
+                # Spam floods: held for review like keyword hits, no AI call needed
+                flood = not flagged and near_index.is_flood(content_clean, near_matches, anon_cookie)
+
+                fanned = _fan_out_submit(captcha, content_clean, deadline, needs_ai_check=not (flagged or flood))
+                if fanned['captcha'] is not None:
+                    message = ('We could not verify that you are a real person. Please try again.'
+                               if fanned['captcha'] == 'failed' else
+                               'Spam protection is temporarily unavailable. Please try again in a moment.')
+                    flash(message, 'error')
+                    return render_template('submit.html', form=form, mailboxes=mailboxes,
+                                           recaptcha_site_key=recaptcha_site_key)
+
                 # Create new letter
                 letter = Letter(
-                    title=None,
+                    title=fanned.get('title'),
                     topic=form.topic.data,
                     content=content_clean,
                     reply_method=form.reply_method.data,
                     anonymous_email=form.anonymous_email.data if form.reply_method.data == 'anonymous-email' else None
                 )
                 letter.anon_user_id = anon_cookie
-                
-                # Save to database (but decide moderation status first)
-                flagged, reason = ai_moderate_letter_content(letter.content)
-                letter.is_flagged = True if flagged else False
-                letter.moderation_reason = reason
-                letter.moderation_checked = True
+                letter.simhash = near_dup.to_db(fingerprint)
+                letter.moderation_rule_version = rule_version
+                if flagged or flood:
+                    letter.is_flagged = True
+                    letter.moderation_reason = (f"keyword: {kw}" if flagged
+                                                else f"near-duplicate of {len(near_matches)} recent letters")
+                    letter.moderation_checked = True
+                    letter.moderation_status = 'done'
+                elif 'moderation' in fanned:
+                    letter.is_flagged, letter.moderation_reason = fanned['moderation']
+                    letter.moderation_checked = True
+                    letter.moderation_status = 'done'
+                else:
+                    letter.is_flagged = False
+                    letter.moderation_checked = False
+                    # Without a queue nothing would ever unhide a pending letter: it goes
+                    # out keyword-clean, and a late AI verdict can still flag it
+                    letter.moderation_status = 'pending' if app.config.get('MODERATION_ASYNC') else 'done'
                 db.session.add(letter)
-                # Ensure the letter has an id/unique_id persisted before redirect
-                db.session.flush()
-                # Before commit, optionally generate a concise title
-                try:
-                    generated = generate_ai_response_with_type(
-                        f"Create a short, human, gentle 3-6 word title for this anonymous journal entry. Avoid quotes and weird phrasing. Entry: {letter.content}",
-                        'supportive'
-                    )
-                    if generated:
-                        # Clean up to a single line, truncate
-                        clean = (generated or '').split('\n')[0].strip().strip('"\' ')
-                        letter.title = (clean[:140] if clean else None)
-                except Exception:
-                    pass
-                # Commit after possible title generation to ensure unique_id is saved
+                # Commit right away so the writer isn't held up by Gemini round trips
                 db.session.commit()
+                near_dup.near_duplicates.add(letter.id, fingerprint, anon_cookie, near_duplicate=bool(near_matches))
+                if app.config.get('MODERATION_ASYNC'):
+                    _queue_letter_moderation(letter.id)
+                else:
+                    # Past the deadline: keep the calls already in flight instead of
+                    # running them again inline after the response was due
+                    for name, future in fanned['late'].items():
+                        future.add_done_callback(partial(_store_late_submit_call, letter.id, rule_version, name))
                     
                 # AI instant reply path removed per new product decision
                 
@@ -928,13 +1143,18 @@ try:
             
             form = UserReplyForm()
             if form.validate_on_submit():
+                now = datetime.utcnow()
                 user_reply = UserReply(
                     content=form.content.data,
                     response_id=response_id,
                     letter_id=letter.id,
-                    anon_user_id=anon_cookie
+                    anon_user_id=anon_cookie,
+                    created_at=now
                 )
                 db.session.add(user_reply)
+                # Follow-up counters, incremented in SQL so concurrent replies don't lose a count
+                letter.unread_reply_count = func.coalesce(Letter.unread_reply_count, 0) + 1
+                letter.last_reply_at = now
                 db.session.commit()
                 
                 flash('Your reply has been sent to the volunteer!', 'success')
@@ -1000,12 +1220,80 @@ try:
         api_key = app.config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY')
         return jsonify({
             'status': 'ok',
-            'ai_available': bool(api_key)
+            'ai_available': bool(api_key),
+            'gemini': gemini.stats(),
+            'coach_cache': coach_cache.stats(),
+            'moderation': moderator.stats(),
+            'rule_packs': rule_pack_watcher.stats(),
+            'near_duplicates': near_dup.near_duplicates.stats(),
+            'rate_limit': rate_limiter.stats(),
+            'mailbox_cache': mailbox_cache.stats(),
+            'sender_window': sender_window.stats()
         })
 
+    # Companion replies used when Gemini is unavailable or errors out
+    CHAT_FALLBACK_RESPONSES = [
+        "Thank you for sharing with me. Your feelings are valid. If you'd like more support, try writing an anonymous letter - our volunteers respond within 24-72 hours.",
+        "I hear you, and you're not alone. Many students feel similar pressures. Would you like me to help you find resources on our website?",
+        "It takes courage to reach out. If you need immediate support, Kids Help Phone is available 24/7 at 1-800-668-6868 or text HOME to 686868.",
+        "Your wellbeing matters to us at E.C.H.O.E. Our anonymous letter system lets you share more privately if you'd like personalized peer support.",
+        "I appreciate you trusting me with your thoughts. Remember, seeking support is a sign of strength. Check out our Helplines page for crisis resources."
+    ]
+    # Shorter list when the upstream call itself failed
+    CHAT_ERROR_FALLBACK_RESPONSES = CHAT_FALLBACK_RESPONSES[:3]
+    CHAT_UNEXPECTED_RESPONSE = "I'm sorry, I'm having trouble responding right now. Please try again in a moment."
+    CHAT_RATE_LIMITED = "You're sending messages faster than I can keep up. Please wait a moment and try again."
+    CHAT_TECHNICAL_DIFFICULTIES = "I apologize, but I'm experiencing technical difficulties. Please try again later or use our anonymous letter system for support."
+
+    def _chat_call_type(chat_type: str) -> str:
+        return 'chat_practical' if chat_type == 'practical' else 'chat_supportive'
+
+    def _chat_payload(message: str, chat_type: str) -> dict:
+        """Build the Gemini request body for the chat widget."""
+        return {
+            "systemInstruction": prompts.chat_instruction(chat_type),
+            "contents": prompts.user_content(f"User message: {message}"),
+            "generationConfig": {
+                "temperature": 0.7,
+                "topP": 0.9,
+                "maxOutputTokens": 300
+            }
+        }
+
+    def _sse(data: dict, event: str = None) -> str:
+        """Format one Server-Sent Events frame."""
+        frame = f"event: {event}\n" if event else ''
+        return frame + f"data: {json.dumps(data)}\n\n"
+
+    def _stream_chat(gemini_payload: dict, call_type: str):
+        """Forward Gemini tokens as SSE `delta` frames, then a final `done` frame.
+
+        If nothing was sent yet when Gemini fails, the usual fallback message is
+        streamed instead so the widget always gets a reply.
+        """
+        sent = False
+        try:
+            for chunk in gemini.stream_generate_content(gemini_payload, call_type=call_type):
+                sent = True
+                yield _sse({'delta': chunk})
+            if not sent:
+                app.logger.warning("Gemini stream finished without any text")
+                yield _sse({'delta': CHAT_UNEXPECTED_RESPONSE, 'fallback': True})
+        except GeminiError as ge:
+            app.logger.error(f"Gemini API stream error: {ge}")
+            if not sent:
+                yield _sse({'delta': random.choice(CHAT_ERROR_FALLBACK_RESPONSES), 'fallback': True})
+        except Exception as e:
+            app.logger.error(f"api_chat stream error: {str(e)}")
+            if not sent:
+                yield _sse({'delta': CHAT_TECHNICAL_DIFFICULTIES, 'fallback': True})
+        yield _sse({}, event='done')
+
     # API: Chat endpoint for AI companion and website help
+    # (asgi.py serves an async twin of this route)
     @app.route('/api/chat', methods=['POST'])
     def api_chat():
+        """Chat reply as JSON, or as an SSE token stream when `stream` is requested."""
         try:
             payload = request.get_json(silent=True) or {}
             message = (payload.get('message') or '').strip()
@@ -1013,72 +1301,33 @@ try:
             
             if not message:
                 return jsonify({'message': 'Please type a message to start chatting.'}), 200
+
+            allowed, retry_after = rate_limiter.hit('chat', _client_ip())
+            if not allowed:
+                return jsonify({'message': CHAT_RATE_LIMITED}), 429, {'Retry-After': str(int(retry_after) + 1)}
             
-            api_key = app.config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY')
-            if not api_key:
+            if not gemini.available:
                 # Fallback responses when API key is not available
-                fallback_responses = [
-                    "Thank you for sharing with me. Your feelings are valid. If you'd like more support, try writing an anonymous letter - our volunteers respond within 24-72 hours.",
-                    "I hear you, and you're not alone. Many students feel similar pressures. Would you like me to help you find resources on our website?",
-                    "It takes courage to reach out. If you need immediate support, Kids Help Phone is available 24/7 at 1-800-668-6868 or text HOME to 686868.",
-                    "Your wellbeing matters to us at E.C.H.O.E. Our anonymous letter system lets you share more privately if you'd like personalized peer support.",
-                    "I appreciate you trusting me with your thoughts. Remember, seeking support is a sign of strength. Check out our Helplines page for crisis resources."
-                ]
-                import random
-                return jsonify({'message': random.choice(fallback_responses)})
+                return jsonify({'message': random.choice(CHAT_FALLBACK_RESPONSES)})
             
-            # Build prompt based on chat type
-            if chat_type == 'practical':
-                # Customer service / website help mode
-                system_prompt = (
-                    "You are Echo, a friendly helper for the E.C.H.O.E. website (Empathy, Connection, Hope, Outreach, Empowerment). "
-                    "Help users navigate the website, find resources, and answer questions about E.C.H.O.E. services. "
-                    "Be helpful, concise, and friendly. Key pages: Helplines (crisis resources), Write a Letter (anonymous peer support), "
-                    "Events, Research Study, Social Media Campaigns. Keep responses brief and practical."
-                )
-            else:
-                # Companion / supportive mode
-                system_prompt = (
-                    "You are Echo, a warm and supportive AI companion for the E.C.H.O.E. mental health platform. "
-                    "Respond with empathy, care, and understanding. Do NOT diagnose or provide medical advice. "
-                    "Listen actively, validate feelings, and gently encourage professional help when appropriate. "
-                    "Remind users about crisis resources (Kids Help Phone: 1-800-668-6868, text HOME to 686868) when needed. "
-                    "Keep responses warm, supportive, and relatively brief. Use a caring tone like a kind friend."
+            gemini_payload = _chat_payload(message, chat_type)
+            call_type = _chat_call_type(chat_type)
+
+            wants_stream = bool(payload.get('stream')) or 'text/event-stream' in (request.headers.get('Accept') or '')
+            if wants_stream:
+                return app.response_class(
+                    stream_with_context(_stream_chat(gemini_payload, call_type)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
                 )
             
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={api_key}"
-            gemini_payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": f"{system_prompt}\n\nUser message: {message}"
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topP": 0.9,
-                    "maxOutputTokens": 300
-                }
-            }
-            
-            with httpx.Client(timeout=15) as client:
-                response = client.post(url, json=gemini_payload)
-                
-                # Log the response status for debugging
-                app.logger.info(f"Gemini API response status: {response.status_code}")
-                
-                # Check for HTTP errors first
-                if response.status_code != 200:
-                    app.logger.error(f"Gemini API HTTP error: {response.status_code} - {response.text[:500]}")
-                    # Use fallback responses when API fails
-                    fallback_responses = [
-                        "Thank you for sharing with me. Your feelings are valid. If you'd like more support, try writing an anonymous letter - our volunteers respond within 24-72 hours.",
-                        "I hear you, and you're not alone. Many students feel similar pressures. Would you like me to help you find resources on our website?",
-                        "It takes courage to reach out. If you need immediate support, Kids Help Phone is available 24/7 at 1-800-668-6868 or text HOME to 686868.",
-                    ]
-                    import random
-                    return jsonify({'message': random.choice(fallback_responses)})
-                
-                data = response.json()
+            try:
+                data = gemini.generate_content(gemini_payload, call_type=call_type)
+            except GeminiError as ge:
+                # HTTP error status or network failure from upstream
+                app.logger.error(f"Gemini API error: {ge}")
+                # Use fallback responses when API fails
+                return jsonify({'message': random.choice(CHAT_ERROR_FALLBACK_RESPONSES)})
             
             if data and 'candidates' in data and len(data['candidates']) > 0:
                 try:
@@ -1093,36 +1342,24 @@ try:
                 # Check if there's an error message in the response
                 if data and 'error' in data:
                     app.logger.error(f"Gemini API error: {data['error']}")
-                return jsonify({'message': "I'm sorry, I'm having trouble responding right now. Please try again in a moment."})
+                return jsonify({'message': CHAT_UNEXPECTED_RESPONSE})
         
         except Exception as e:
             app.logger.error(f"api_chat error: {str(e)}")
-            return jsonify({'message': "I apologize, but I'm experiencing technical difficulties. Please try again later or use our anonymous letter system for support."}), 200
+            return jsonify({'message': CHAT_TECHNICAL_DIFFICULTIES}), 200
 
     # Internal function: Generate AI response
     def generate_ai_response(message):
         try:
-            api_key = app.config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY')
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={api_key}"
-            
             payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": f"You are a supportive AI companion for the E.C.H.O.E mental health platform (Empathy, Connection, Hope, Outreach, Empowerment). "
-                               f"Respond with empathy and care. Do not diagnose or provide medical advice. "
-                               f"Keep responses supportive, thoughtful and relatively brief. "
-                               f"User message: {message}"
-                    }]
-                }]
+                "systemInstruction": prompts.response_type_instruction('volunteer_draft'),
+                "contents": prompts.user_content(f"User message: {message}"),
             }
             
-            # Use httpx to avoid eventlet/requests recursion issues and add a timeout
-            with httpx.Client(timeout=15) as client:
-                response = client.post(url, json=payload)
-            data = response.json()
-            
-            if data and 'candidates' in data and len(data['candidates']) > 0:
-                ai_response = " ".join([part['text'] for part in data['candidates'][0]['content']['parts']])
+            # Pooled httpx client (avoids eventlet/requests recursion issues, shared timeout)
+            data = gemini.generate_content(payload, call_type='volunteer_draft')
+            ai_response = candidate_text(data)
+            if ai_response:
                 return ai_response
             else:
                 return "I'm sorry, I'm having trouble generating a response right now. A human volunteer will review your letter soon."
@@ -1201,13 +1438,8 @@ try:
     @app.route('/login', methods=['GET', 'POST'])
     def login():
         try:
-            logger.info("Login route accessed")
-            logger.info(f"Request method: {request.method}")
-            logger.info(f"Request form data: {request.form}")
-            logger.info(f"Current user authenticated: {current_user.is_authenticated}")
-            
             if current_user.is_authenticated:
-                logger.info(f"User {current_user.username} is already authenticated, redirecting to index")
+                logger.debug(f"User {current_user.username} is already authenticated, redirecting to index")
                 return redirect(url_for('index'))
             
             if request.method == 'POST':
@@ -1215,8 +1447,6 @@ try:
                 password = request.form.get('password')
                 remember_me = request.form.get('remember_me') == 'on'
                 
-                logger.info(f"Login attempt for email: {email}")
-                
                 if not email or not password:
                     logger.warning("Missing email or password")
                     flash('Please enter both email and password', 'error')
@@ -1257,36 +1487,13 @@ try:
     @app.route('/volunteer/dashboard')
     @volunteer_required
     def volunteer_dashboard():
-        # Exclude anything flagged (including potential NULLs) from unprocessed list
-        unprocessed_letters = Letter.query.filter(
-            (Letter.is_processed == False) & ((Letter.is_flagged == False) | (Letter.is_flagged.is_(None)))
-        ).order_by(Letter.created_at).all()
-        
-        # Find letters with unread user replies
-        letters_with_unread_replies = []
-        processed_letters = Letter.query.filter(Letter.is_processed == True).all()
-        for letter in processed_letters:
-            total_unread = 0
-            last_activity = None
-            for response in letter.responses:
-                unread_count = response.user_replies.filter_by(is_read=False).count()
-                total_unread += unread_count
-                # Get the most recent user reply timestamp
-                latest_reply = response.user_replies.order_by(UserReply.created_at.desc()).first()
-                if latest_reply and (not last_activity or latest_reply.created_at > last_activity):
-                    last_activity = latest_reply.created_at
-            
-            if total_unread > 0:
-                letters_with_unread_replies.append({
-                    'letter': letter,
-                    'unread_count': total_unread,
-                    'last_activity': last_activity or letter.created_at
-                })
-        
+        page = request.args.get('page', 1, type=int)
+        unprocessed = unprocessed_page(page, app.config['VOLUNTEER_QUEUE_PAGE_SIZE'])
         # Volunteers no longer see flagged letters at all
         return render_template('volunteer/dashboard.html', 
-                              unprocessed_letters=unprocessed_letters,
-                              letters_with_unread_replies=letters_with_unread_replies)
+                              unprocessed_letters=unprocessed.items,
+                              unprocessed_pagination=unprocessed,
+                              letters_with_unread_replies=letters_with_unread_replies())
 
     # Volunteer route: Respond to letter
     @app.route('/volunteer/letter/<letter_id>', methods=['GET', 'POST'])
@@ -1294,14 +1501,18 @@ try:
     def respond_to_letter(letter_id):
         
         letter = Letter.query.filter_by(unique_id=letter_id).first_or_404()
+        if letter.moderation_status == 'pending' and not current_user.has_admin_access():
+            flash('This letter is still being checked for safety. Please try again in a moment.', 'info')
+            return redirect(url_for('volunteer_dashboard'))
         previous_responses = letter.responses.order_by(Response.created_at).all()
         
-        # Mark all user replies as read when volunteer views this letter
-        for response in previous_responses:
-            for user_reply in response.user_replies.all():
-                if not user_reply.is_read:
-                    user_reply.is_read = True
-        db.session.commit()
+        # Mark all user replies as read when volunteer views this letter. The count is
+        # re-derived in the same transaction, so a reply that lands in between stays counted
+        marked = (UserReply.query
+                  .filter(UserReply.letter_id == letter.id, UserReply.is_read == False)
+                  .update({'is_read': True}, synchronize_session=False))
+        if reconcile_reply_counters(letter.id) or marked:
+            db.session.commit()
 
         form = ResponseForm()
 
@@ -1417,106 +1628,41 @@ try:
     # Internal function: Generate AI response of specified type
     def generate_ai_response_with_type(message, response_type):
         try:
-            api_key = app.config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY')
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={api_key}"
-            
-            # Comprehensive E.C.H.O.E. website context for accurate responses
-            echoe_context = """
-You are Echo, the friendly AI assistant for E.C.H.O.E. (Empathy • Connection • Hope • Outreach • Empowerment), 
-a youth-led mental health organization based in Ontario, Canada. Our mission is to support students and young people 
-struggling with mental health through peer support and community connection.
-
-WEBSITE FEATURES & NAVIGATION:
-- Home: Welcome page with mission overview and latest updates
-- Write a Letter: Anonymous letter submission where users can share their feelings privately. Volunteers respond within 24-72 hours. Users can track replies via their Inbox.
-- Inbox: View responses to your anonymous letters
-- Risk & Protective Factors: Educational content about mental health warning signs and protective strategies
-- Helplines: Crisis resources including Kids Help Phone (1-800-668-6868), Crisis Text Line (text HOME to 686868), and local crisis numbers
-- Events: Information about our Mental Health Awareness events, workshops, and community activities
-- Calendar: Upcoming events and important dates
-- Team: Meet our dedicated volunteer team
-- Join Us: Information on how to become a volunteer
-- Blog: Articles and stories from our community
-- Social Media: Follow us on Instagram @echoe_hosa
-
-KEY SERVICES:
-1. Anonymous Letter System: Write about anything - stress, anxiety, relationships, school pressure. Our trained peer volunteers respond with empathy and support.
-2. Crisis Resources: We always recommend professional help for serious concerns. If someone is in crisis: Kids Help Phone 1-800-668-6868 or text HOME to 686868.
-3. Peer Support: We're not therapists, but caring peers who understand student struggles.
-4. Educational Content: Information about mental health, self-care, and wellness.
-
-IMPORTANT GUIDELINES:
-- Always be warm, supportive, and non-judgmental
-- For crisis situations, immediately provide crisis helpline numbers
-- Never provide medical diagnoses or professional clinical advice
-- Guide users to appropriate website features based on their needs
-- Keep responses concise and helpful (2-4 sentences for simple questions)
-"""
-            
-            if response_type == 'practical':
-                # Customer service / website help mode
-                prompt = f"""{echoe_context}
-
-MODE: Website Help & Navigation
-You are helping someone navigate the E.C.H.O.E. website and find information.
-- Answer questions about website features clearly
-- Direct users to the right pages for their needs
-- Be friendly but efficient
-- If they seem to need emotional support, gently suggest they use the "Write a Letter" feature or provide helpline numbers
-
-User question: {message}
-
-Respond helpfully in 2-4 sentences."""
-            elif response_type == 'reflective':
-                prompt = f"""{echoe_context}
-
-MODE: Reflective Support
-Ask thoughtful questions to help the user explore their feelings more deeply.
-Help them gain insight through gentle reflection rather than direct advice.
-
-User message: {message}
-
-Respond with a thoughtful, reflective question or observation (2-3 sentences)."""
-            else:  # supportive - companion mode
-                prompt = f"""{echoe_context}
-
-MODE: Emotional Support Companion
-You are providing emotional support as a caring peer companion.
-- Validate their feelings
-- Be warm and empathetic
-- If they mention crisis or self-harm, immediately provide: Kids Help Phone 1-800-668-6868, text HOME to 686868
-- Suggest writing an anonymous letter if they want more personalized support
-- Do not diagnose or give clinical advice
-
-User message: {message}
-
-Respond with empathy and care (2-4 sentences)."""
-            
+            # Static persona/mode text goes in systemInstruction (see prompts.py);
+            # contents only carries the per-call text
+            if response_type in ('moderation', 'title'):
+                text = message
+            elif response_type == 'practical':
+                text = f"User question: {message}"
+            else:
+                text = f"User message: {message}"
+            generation_config = {
+                "temperature": 0.7,
+                "topP": 0.9,
+                "maxOutputTokens": 300
+            }
+            if response_type == 'moderation':
+                generation_config["responseMimeType"] = "application/json"
             payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topP": 0.9,
-                    "maxOutputTokens": 300
-                }
+                "systemInstruction": prompts.response_type_instruction(response_type),
+                "contents": prompts.user_content(text),
+                "generationConfig": generation_config
             }
             
-            with httpx.Client(timeout=15) as client:
-                response = client.post(url, json=payload)
-            data = response.json()
-            
-            if data and 'candidates' in data and len(data['candidates']) > 0:
-                ai_response = " ".join([part['text'] for part in data['candidates'][0]['content']['parts']])
+            data = gemini.generate_content(payload, call_type=response_type)
+            ai_response = candidate_text(data)
+            if ai_response:
                 return ai_response
+            elif response_type in ('moderation', 'title'):
+                return None
             else:
                 return "I'm sorry, I'm having trouble generating a response right now. If you need immediate support, please call Kids Help Phone at 1-800-668-6868 or text HOME to 686868."
         
         except Exception as e:
             app.logger.error(f"Error generating AI response: {str(e)}")
+            # Task modes have no reader; a fallback message would become a title/verdict
+            if response_type in ('moderation', 'title'):
+                return None
             return "I'm sorry, I'm having trouble connecting right now. For immediate support, please call Kids Help Phone at 1-800-668-6868 or text HOME to 686868."
 
     # Internal function: Content moderation
@@ -1657,7 +1803,16 @@ Respond with empathy and care (2-4 sentences)."""
                              total_volunteers=total_volunteers,
                              total_admins=total_admins,
                              recent_letters=recent_letters,
-                             recent_responses=recent_responses)
+                             recent_responses=recent_responses,
+                             suspicious_anon=_suspicious_anon_senders())
+
+    @app.route('/admin/api/suspicious-senders')
+    @admin_required
+    def admin_suspicious_senders():
+        """Suspicious anonymous senders as JSON (refreshes the dashboard table)."""
+        return jsonify({'senders': _suspicious_anon_senders(),
+                        'threshold': sender_window.threshold,
+                        'window_hours': sender_window.window_hours})
 
     @app.route('/admin/users')
     @ultimate_admin_required
@@ -1833,8 +1988,12 @@ Respond with empathy and care (2-4 sentences)."""
     def admin_delete_response(response_id):
         """Delete a response (admin only)"""
         response = Response.query.get_or_404(response_id)
+        letter_id = response.letter_id
         
         db.session.delete(response)
+        db.session.flush()
+        # Its user replies went with it
+        reconcile_reply_counters(letter_id)
         db.session.commit()
         
         flash('Response has been deleted.', 'success')
@@ -2025,6 +2184,12 @@ Respond with empathy and care (2-4 sentences)."""
         message_text = data.get('text', '')
         user_name = session.get('anonymous_name', 'Anonymous')
 
+        if rate_limiter.limited('socket', _client_ip()):
+            emit('moderation_warning', {
+                'text': 'You are sending messages too quickly. Please wait a few seconds.'
+            })
+            return
+
         moderation_result = moderate_content_internal(message_text)
         
         if moderation_result['status'] == 'flagged':
@@ -0,0 +1,80 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of text with whitespace runs collapsed (for cache keys)."""
+    normalized = _WHITESPACE_RE.sub(' ', (text or '').strip())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class LRUTTLCache:
+    """Small thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
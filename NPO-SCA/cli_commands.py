@@ -9,8 +9,15 @@ author credits is a violation of the GPL license.
 """
 
 import click
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
 from flask.cli import with_appcontext
-from models import db, User, UserRole
+from models import db, User, UserRole, Letter, LetterCounter, ModerationRulePack
+from moderation import moderator
+from rule_packs import load_latest_rule_pack, publish_rule_pack, rescan_stale_letters
+from volunteer_queue import reconcile_reply_counters
 import os # Added import for os
 
 @click.command('seed-admin')
@@ -166,10 +173,160 @@ def set_password(email, password):
         db.session.rollback()
         click.echo(f'❌ Error updating password: {e}')
 
+# -------------------- Moderation utilities --------------------
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+@click.command('remoderate')
+@click.option('--batch-size', default=200, show_default=True, help='Letters per chunk (one commit per chunk)')
+@click.option('--concurrency', default=4, show_default=True, help='Letters moderated in parallel')
+@click.option('--unchecked-only', is_flag=True, help='Only letters never checked by moderation')
+@click.option('--checkpoint', default=None, help='Checkpoint file (default: instance/remoderate.checkpoint.json)')
+@click.option('--restart', is_flag=True, help='Ignore an existing checkpoint and start from the first letter')
+@with_appcontext
+def remoderate(batch_size, concurrency, unchecked_only, checkpoint, restart):
+    """Re-run keyword + AI moderation over stored letters, resumable from a checkpoint."""
+    checkpoint = checkpoint or os.path.join(current_app.instance_path, 'remoderate.checkpoint.json')
+    # Scan with the live rule pack, not just the built-in list
+    load_latest_rule_pack(moderator)
+    state = {} if restart else _load_checkpoint(checkpoint)
+    last_id = int(state.get('last_id') or 0)
+    totals = {key: int(state.get(key) or 0) for key in ('processed', 'flagged', 'unanswered')}
+    if last_id:
+        click.echo(f'Resuming after letter id {last_id} ({totals["processed"]} already processed)')
+
+    started = time.monotonic()
+    run_processed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while True:
+            query = Letter.query.filter(Letter.id > last_id)
+            if unchecked_only:
+                query = query.filter((Letter.moderation_checked == False) | (Letter.moderation_checked.is_(None)))
+            letters = query.order_by(Letter.id).limit(batch_size).all()
+            if not letters:
+                break
+
+            # Only plain strings go to the workers; the session stays on this thread
+            rule_version = moderator.keyword_version
+            verdicts = list(pool.map(moderator.verdict, [letter.content or '' for letter in letters]))
+            for letter, verdict in zip(letters, verdicts):
+                if verdict is None:
+                    totals['unanswered'] += 1
+                    continue
+                flagged, reason = verdict
+                # Never clears a flag: un-suspending stays an admin decision
+                if flagged and not letter.is_flagged:
+                    letter.is_flagged = True
+                    totals['flagged'] += 1
+                # A letter that stays flagged keeps the reason it was flagged for
+                if flagged or not letter.is_flagged:
+                    letter.moderation_reason = reason
+                letter.moderation_checked = True
+                letter.moderation_status = 'done'
+                letter.moderation_rule_version = rule_version
+            try:
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f'❌ Commit failed after letter id {last_id}: {e}')
+                return
+            last_id = letters[-1].id
+            db.session.expunge_all()
+
+            run_processed += len(letters)
+            totals['processed'] += len(letters)
+            _save_checkpoint(checkpoint, {'last_id': last_id, **totals})
+            rate = run_processed / max(time.monotonic() - started, 1e-9)
+            click.echo(f'  up to id {last_id}: {totals["processed"]} letters, '
+                       f'{totals["flagged"]} newly flagged, {rate:.1f} letters/s')
+
+    elapsed = time.monotonic() - started
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    click.echo(f'✅ Re-moderated {run_processed} letters in {elapsed:.1f}s '
+               f'({run_processed / max(elapsed, 1e-9):.1f} letters/s); '
+               f'{totals["flagged"]} newly flagged, {totals["unanswered"]} without an AI verdict')
+    if totals['unanswered']:
+        click.echo('   Letters without a verdict keep their previous moderation state.')
+
+@click.command('import-rules')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--note', default=None, help='Short description stored with the pack')
+@with_appcontext
+def import_rules(path, note):
+    """Publish a moderation rule pack ({category: [keywords]} JSON) as the next version."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        pack = publish_rule_pack(data, note=note)
+    except ValueError as e:
+        db.session.rollback()
+        click.echo(f'❌ Invalid rule pack: {e}')
+        return
+    keywords = sum(len(kws) for kws in json.loads(pack.rules).values())
+    click.echo(f'✅ Published rule pack v{pack.version} ({keywords} keywords)')
+    click.echo('   Running app processes pick it up within MODERATION_RULES_POLL_SECONDS.')
+
+@click.command('list-rules')
+@with_appcontext
+def list_rules():
+    """List published moderation rule packs, newest first."""
+    packs = ModerationRulePack.query.order_by(ModerationRulePack.version.desc()).all()
+    if not packs:
+        click.echo('No rule packs published; the built-in keyword list is live.')
+        return
+    for pack in packs:
+        keywords = sum(len(kws) for kws in json.loads(pack.rules).values())
+        click.echo(f'v{pack.version}  {pack.created_at:%Y-%m-%d %H:%M}  {keywords} keywords  {pack.note or ""}')
+
+@click.command('rescan-rules')
+@click.option('--batch-size', default=200, show_default=True, help='Letters per batch (one commit per batch)')
+@with_appcontext
+def rescan_rules(batch_size):
+    """Keyword-scan letters last checked with an older rule pack version."""
+    load_latest_rule_pack(moderator)
+    started = time.monotonic()
+    totals = rescan_stale_letters(moderator, batch_size=batch_size)
+    click.echo(f'✅ Rescanned {totals["scanned"]} letters with rules v{totals["version"]} '
+               f'in {time.monotonic() - started:.1f}s; {totals["flagged"]} newly flagged')
+
+@click.command('recount-letters')
+@with_appcontext
+def recount_letters():
+    """Rebuild the flagged/unprocessed nav counters from the letter table."""
+    values = LetterCounter.recount()
+    click.echo('✅ ' + ', '.join(f'{name}: {value}' for name, value in values.items()))
+
+@click.command('reconcile-replies')
+@with_appcontext
+def reconcile_replies():
+    """Recompute every letter's unread_reply_count / last_reply_at from user_reply."""
+    fixed = reconcile_reply_counters()
+    db.session.commit()
+    click.echo(f'✅ Reply counters reconciled ({fixed} letter(s) corrected)')
+
 def register_commands(app):  # type: ignore[no-redef]
     """Register all CLI commands with the Flask app"""
     app.cli.add_command(seed_admin)
     app.cli.add_command(list_admins)
     app.cli.add_command(migrate_roles)
     app.cli.add_command(create_user)
-    app.cli.add_command(set_password)
\ No newline at end of file
+    app.cli.add_command(set_password)
+    app.cli.add_command(remoderate)
+    app.cli.add_command(import_rules)
+    app.cli.add_command(list_rules)
+    app.cli.add_command(rescan_rules)
+    app.cli.add_command(recount_letters)
+    app.cli.add_command(reconcile_replies)
\ No newline at end of file
@@ -8,6 +8,7 @@ This file is part of the ECHOE project. Unauthorized removal of
 author credits is a violation of the GPL license.
 """
 
+import json
 import os
 from sqlalchemy.pool import NullPool
 
@@ -47,9 +48,111 @@ class Config:
     
     # AI API configuration
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') 
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash-lite')
+    # Override to point at a local stand-in (scripts/stub_google.py) for load tests
+    GEMINI_API_BASE = os.environ.get('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+    # Shared by every Gemini call through the pooled client (gemini_client.py)
+    GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', 15))
+    GEMINI_CONNECT_TIMEOUT = float(os.environ.get('GEMINI_CONNECT_TIMEOUT', 5))
+    GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', 1))
+    GEMINI_MAX_CONNECTIONS = int(os.environ.get('GEMINI_MAX_CONNECTIONS', 20))
+    # Adaptive timeout floor (the ceiling is GEMINI_TIMEOUT) and circuit breaker:
+    # open at this error rate over the last N calls, probe again after the reset delay
+    GEMINI_MIN_TIMEOUT = float(os.environ.get('GEMINI_MIN_TIMEOUT', 3))
+    GEMINI_BREAKER_WINDOW = int(os.environ.get('GEMINI_BREAKER_WINDOW', 20))
+    GEMINI_BREAKER_MIN_CALLS = int(os.environ.get('GEMINI_BREAKER_MIN_CALLS', 5))
+    GEMINI_BREAKER_ERROR_RATE = float(os.environ.get('GEMINI_BREAKER_ERROR_RATE', 0.5))
+    GEMINI_BREAKER_RESET_SECONDS = float(os.environ.get('GEMINI_BREAKER_RESET_SECONDS', 30))
+    # A half-open probe that hasn't reported back by then is abandoned
+    GEMINI_BREAKER_PROBE_SECONDS = float(os.environ.get('GEMINI_BREAKER_PROBE_SECONDS', 60))
+    # Serve the static system instructions (prompts.py) from Gemini context caching.
+    # Off by default: the instructions are below the models' minimum cacheable size,
+    # so this only pays off once the shared context grows.
+    GEMINI_CONTEXT_CACHE = os.environ.get('GEMINI_CONTEXT_CACHE', '0') == '1'
+    GEMINI_CONTEXT_CACHE_TTL = int(os.environ.get('GEMINI_CONTEXT_CACHE_TTL', 3600))
+    # Outbound AI scheduler: total concurrent Gemini calls, plus per-class overrides as
+    # JSON {"coach": [priority, max_concurrent, max_queue, max_wait_seconds], ...}.
+    # Classes: chat > moderation > draft > coach > title (gemini_client.DEFAULT_AI_CLASSES).
+    # Parsed by GeminiClient.init_app, which falls back to the defaults if it is malformed.
+    AI_SCHEDULER_CONCURRENCY = int(os.environ.get('AI_SCHEDULER_CONCURRENCY', 16))
+    AI_SCHEDULER_CLASSES = os.environ.get('AI_SCHEDULER_CLASSES')
+    # Threads running the Flask (WSGI) routes under the ASGI entrypoint (asgi.py)
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 32))
+    # LRU+TTL cache for /api/coach tips keyed by (mode, draft hash, letter hash)
+    COACH_CACHE_SIZE = int(os.environ.get('COACH_CACHE_SIZE', 512))
+    COACH_CACHE_TTL = int(os.environ.get('COACH_CACHE_TTL', 300))
 
     # Anti-abuse / CAPTCHA (optional)
     # Google reCAPTCHA v2 checkbox keys - MUST be set via environment variables.
     # Get your keys at: https://www.google.com/recaptcha/admin
     RECAPTCHA_SITE_KEY = os.environ.get('RECAPTCHA_SITE_KEY')
-    RECAPTCHA_SECRET = os.environ.get('RECAPTCHA_SECRET')
\ No newline at end of file
+    RECAPTCHA_SECRET = os.environ.get('RECAPTCHA_SECRET')
+    RECAPTCHA_VERIFY_URL = os.environ.get('RECAPTCHA_VERIFY_URL', 'https://www.google.com/recaptcha/api/siteverify')
+    # Token-bucket rate limits (rate_limit.py). Backend 'memory' is per process;
+    # 'sqlite' shares buckets between workers through RATE_LIMIT_SQLITE_PATH
+    # (default instance/ratelimit.sqlite3). RATE_LIMITS overrides per-limit
+    # budgets as JSON {"chat": [requests, per_seconds], ...}; limits are
+    # submit, chat, coach and socket (rate_limit.DEFAULT_LIMITS). Parsed by
+    # RateLimiter.init_app, which falls back to the defaults if it is malformed.
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 10000))
+    RATE_LIMITS = os.environ.get('RATE_LIMITS')
+    # Proxies in front of the app that append to X-Forwarded-For (Vercel/Render: 1).
+    # Limits key on the entry the outermost one added; 0 uses the socket peer.
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+    # /submit waits at most this long for its outbound calls together (reCAPTCHA,
+    # plus the AI check and title when MODERATION_ASYNC is off). A letter whose AI
+    # check misses it is published keyword-clean and flagged if the late verdict says
+    # so; letters whose check never landed are caught up by `flask remoderate --unchecked-only`
+    SUBMIT_DEADLINE_SECONDS = float(os.environ.get('SUBMIT_DEADLINE_SECONDS', 8))
+    SUBMIT_FANOUT_WORKERS = int(os.environ.get('SUBMIT_FANOUT_WORKERS', 8))
+    # Logging (logging_setup.py). 'production' (the default when ENVIRONMENT=production)
+    # writes through a background queue at INFO; 'dev' logs everything at DEBUG.
+    # LOG_LEVELS / LOG_SAMPLING are JSON per-logger overrides, e.g.
+    # {"app": "WARNING"} and {"app": 0.1} (keep 10% of the app's INFO/DEBUG lines).
+    LOG_PROFILE = os.environ.get('LOG_PROFILE') or (
+        'production' if os.environ.get('ENVIRONMENT') == 'production' else 'dev')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL')
+    LOG_LEVELS = json.loads(os.environ.get('LOG_LEVELS') or '{}')
+    LOG_SAMPLING = json.loads(os.environ.get('LOG_SAMPLING') or '{}')
+    # Submit page mailbox list: cache lifetime for writes made by other processes, and
+    # whether to list the active mailboxes (the seeded rows are placeholders until
+    # real locations are signed up; until then the page says "coming soon")
+    MAILBOX_CACHE_TTL = int(os.environ.get('MAILBOX_CACHE_TTL', 300))
+    SHOW_PHYSICAL_MAILBOXES = os.environ.get('SHOW_PHYSICAL_MAILBOXES', '0') == '1'
+    # New letters per page of the volunteer dashboard queue
+    VOLUNTEER_QUEUE_PAGE_SIZE = int(os.environ.get('VOLUNTEER_QUEUE_PAGE_SIZE', 24))
+    # Suspicious senders on the admin dashboard: anon IDs with at least THRESHOLD
+    # letters in the sliding window (sender_window.py). Each process catches up from
+    # the letter table at most every SUSPICIOUS_SENDER_SYNC_SECONDS, so counts cover
+    # all workers; per-process snapshots next to SUSPICIOUS_SENDER_SNAPSHOT (default
+    # instance/sender_window.json, written as sender_window.<pid>.json) speed up restarts
+    SUSPICIOUS_SENDER_THRESHOLD = int(os.environ.get('SUSPICIOUS_SENDER_THRESHOLD', 10))
+    SUSPICIOUS_SENDER_WINDOW_HOURS = int(os.environ.get('SUSPICIOUS_SENDER_WINDOW_HOURS', 24))
+    SUSPICIOUS_SENDER_SNAPSHOT = os.environ.get('SUSPICIOUS_SENDER_SNAPSHOT')
+    SUSPICIOUS_SENDER_SNAPSHOT_SECONDS = int(os.environ.get('SUSPICIOUS_SENDER_SNAPSHOT_SECONDS', 60))
+    SUSPICIOUS_SENDER_SYNC_SECONDS = int(os.environ.get('SUSPICIOUS_SENDER_SYNC_SECONDS', 15))
+
+    # Background moderation queue (AI check + title generation after /submit).
+    # Serverless runtimes can't keep workers alive, so they moderate inline.
+    MODERATION_ASYNC = os.environ.get('MODERATION_ASYNC', '0' if _is_vercel else '1') == '1'
+    MODERATION_WORKERS = int(os.environ.get('MODERATION_WORKERS', 2))
+    # Verdict cache keyed by normalized text (moderation.py)
+    MODERATION_CACHE_SIZE = int(os.environ.get('MODERATION_CACHE_SIZE', 2048))
+    MODERATION_CACHE_TTL = int(os.environ.get('MODERATION_CACHE_TTL', 3600))
+    # Published moderation rule packs: how often each process looks for a new
+    # version, and the batch size of the rescan that follows a swap
+    MODERATION_RULES_POLL_SECONDS = int(os.environ.get('MODERATION_RULES_POLL_SECONDS', 30))
+    MODERATION_RESCAN_BATCH = int(os.environ.get('MODERATION_RESCAN_BATCH', 200))
+    # Near-duplicate (SimHash) spam detection over recent letters (near_duplicates.py).
+    # A letter of at least NEAR_DUP_MIN_LENGTH normalized characters is held for review
+    # when its sender already sent NEAR_DUP_FLOOD_THRESHOLD close copies, or when
+    # NEAR_DUP_FLOOD_SENDERS distinct senders sent it. Shorter letters are never held.
+    NEAR_DUP_MAX_DISTANCE = int(os.environ.get('NEAR_DUP_MAX_DISTANCE', 5))
+    NEAR_DUP_BANDS = int(os.environ.get('NEAR_DUP_BANDS', 4))
+    NEAR_DUP_WINDOW_HOURS = float(os.environ.get('NEAR_DUP_WINDOW_HOURS', 24))
+    NEAR_DUP_MAX_ENTRIES = int(os.environ.get('NEAR_DUP_MAX_ENTRIES', 20000))
+    NEAR_DUP_FLOOD_THRESHOLD = int(os.environ.get('NEAR_DUP_FLOOD_THRESHOLD', 3))
+    NEAR_DUP_FLOOD_SENDERS = int(os.environ.get('NEAR_DUP_FLOOD_SENDERS', 10))
+    NEAR_DUP_MIN_LENGTH = int(os.environ.get('NEAR_DUP_MIN_LENGTH', 80))
\ No newline at end of file
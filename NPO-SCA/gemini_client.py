@@ -0,0 +1,916 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it.
+try:
+    import h2  # type: ignore  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+DEFAULT_BASE_URL = 'https://generativelanguage.googleapis.com/v1beta'
+DEFAULT_MODEL = 'gemini-2.5-flash-lite'
+
+# Upstream statuses worth one more attempt (rate limited / transient server errors)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """Raised when Gemini cannot be reached or answers with a non-200 status."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(GeminiError):
+    """Raised without contacting Gemini while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Rolling error-rate circuit breaker for upstream AI calls.
+
+    Closed: calls flow and outcomes are recorded over the last `window` calls.
+    Once at least `min_calls` are recorded and the error rate reaches
+    `error_rate`, the breaker opens and rejects calls for `reset_timeout`
+    seconds. It then lets a single half-open probe through; success closes the
+    circuit again, failure re-opens it. A probe that never reports back (its
+    caller was killed) is given up on after `probe_timeout` seconds. Latencies of
+    answered calls and of timed-out ones are kept so the client can adapt its
+    timeout; they are dropped when the breaker opens.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window=20, min_calls=5, error_rate=0.5, reset_timeout=30.0,
+                 probe_timeout=60.0, clock=time.monotonic):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.state = self.CLOSED
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Return True if a call may go upstream; every allowed call must be recorded."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    if self._clock() - self._probe_started < self.probe_timeout:
+                        self.rejected += 1
+                        return False
+                    logger.warning("Gemini half-open probe never reported back; sending a new one")
+                self._probe_in_flight = True
+                self._probe_started = self._clock()
+            return True
+
+    def record_success(self, latency=None):
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            if self.state == self.HALF_OPEN:
+                logger.info("Gemini circuit closed after successful probe")
+                self.state = self.CLOSED
+                self._probe_in_flight = False
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self, latency=None):
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self._outcomes.append(False)
+            if self.state == self.HALF_OPEN:
+                self._trip()
+            elif self.state == self.CLOSED and len(self._outcomes) >= self.min_calls \
+                    and self._current_error_rate() >= self.error_rate:
+                self._trip()
+
+    def _trip(self):
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        # Samples from before the outage would pin the timeout the probe needs to beat
+        self._latencies.clear()
+        self.times_opened += 1
+        logger.warning(f"Gemini circuit opened (error rate {self._current_error_rate():.0%}); "
+                       f"using fallbacks for {self.reset_timeout:.0f}s")
+
+    def _current_error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def latency_quantile(self, q: float):
+        """Latency at quantile q over recent answered or timed-out calls; None when there are none."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self) -> dict:
+        p50 = self.latency_quantile(0.5)
+        p95 = self.latency_quantile(0.95)
+        with self._lock:
+            return {
+                'state': self.state,
+                'error_rate': round(self._current_error_rate(), 3),
+                'recent_calls': len(self._outcomes),
+                'latency_p50_ms': round(p50 * 1000) if p50 is not None else None,
+                'latency_p95_ms': round(p95 * 1000) if p95 is not None else None,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight execution.
+
+    The first caller runs `fn`; callers arriving while it is still running wait
+    and receive the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class AIOverloadedError(GeminiError):
+    """Raised without contacting Gemini when the scheduler sheds a call under load."""
+
+
+class _AIClass:
+    __slots__ = ('name', 'priority', 'max_concurrent', 'max_queue', 'max_wait',
+                 'active', 'waiting', 'admitted', 'shed', 'wait_total')
+
+    def __init__(self, name, priority, max_concurrent, max_queue, max_wait):
+        self.name = name
+        self.priority = priority
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = float(max_wait)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.wait_total = 0.0
+
+
+# name: (priority, max_concurrent, max_queue, max_wait_seconds); lower priority runs first
+DEFAULT_AI_CLASSES = {
+    'chat': (0, 16, 64, 10),
+    'moderation': (1, 8, 200, 30),
+    'draft': (2, 4, 20, 15),
+    'coach': (3, 4, 16, 2),
+    'title': (4, 2, 50, 30),
+}
+
+
+def parse_scheduler_classes(raw) -> dict:
+    """AI_SCHEDULER_CLASSES overrides, given as a dict or its JSON text.
+
+    Each entry is name: [priority, max_concurrent, max_queue, max_wait_seconds].
+    A malformed value is logged and ignored, so the default classes apply.
+    """
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        classes = {}
+        for name, spec in data.items():
+            spec = tuple(spec)
+            if len(spec) != 4 or not all(isinstance(v, (int, float)) for v in spec):
+                raise ValueError(f'{name!r} needs [priority, max_concurrent, max_queue, max_wait_seconds]')
+            classes[name] = spec
+        return classes
+    except (TypeError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring malformed AI_SCHEDULER_CLASSES ({e}); using the default classes")
+        return {}
+
+
+def call_class(call_type: str) -> str:
+    """Scheduler class for a Gemini call type (see app.py call sites)."""
+    if call_type.startswith('chat') or call_type in ('supportive', 'practical', 'reflective'):
+        return 'chat'
+    if call_type.startswith('coach'):
+        return 'coach'
+    if call_type == 'volunteer_draft':
+        return 'draft'
+    if call_type in ('moderation', 'title'):
+        return call_type
+    return 'draft'
+
+
+class PriorityScheduler:
+    """Admission control for outbound AI calls by feature class.
+
+    At most `total` calls run at once, and each class is also capped at its own
+    `max_concurrent`. When a slot frees up it goes to the waiting call with the
+    best (priority, arrival) whose class is under its cap, so a flood of coach
+    polls cannot hold back a supportive chat reply. Each class has a bounded
+    queue and a maximum wait; calls beyond either are shed with
+    AIOverloadedError, and low-value classes get small queues and short waits
+    so they are shed first.
+    """
+
+    def __init__(self, classes=None, total=16, clock=time.monotonic):
+        self.total = max(1, int(total))
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._classes = {name: _AIClass(name, *spec)
+                         for name, spec in (classes or DEFAULT_AI_CLASSES).items()}
+        self._waiters = []  # [(priority, seq, class, queued_at)] in arrival order
+        self._seq = 0
+        self.active = 0
+
+    def _runnable_head(self):
+        best = None
+        for waiter in self._waiters:
+            if waiter[2].active < waiter[2].max_concurrent and (best is None or waiter[:2] < best[:2]):
+                best = waiter
+        return best
+
+    def _enqueue(self, name: str):
+        """Admit immediately (returns None) or queue a waiter; sheds when the queue is full."""
+        cls = self._classes.get(name) or self._classes['draft']
+        head = self._runnable_head()
+        if self.active < self.total and cls.active < cls.max_concurrent and \
+                (head is None or head[0] > cls.priority):
+            self._admit(cls, 0.0)
+            return None
+        if cls.waiting >= cls.max_queue:
+            cls.shed += 1
+            raise AIOverloadedError(f"AI scheduler queue full for '{cls.name}' calls", 503)
+        self._seq += 1
+        waiter = (cls.priority, self._seq, cls, self._clock())
+        self._waiters.append(waiter)
+        cls.waiting += 1
+        return waiter
+
+    def _grant(self, waiter) -> bool:
+        if self.active < self.total and self._runnable_head() is waiter:
+            self._leave(waiter)
+            self._admit(waiter[2], self._clock() - waiter[3])
+            return True
+        if self._clock() - waiter[3] >= waiter[2].max_wait:
+            self._leave(waiter)
+            waiter[2].shed += 1
+            raise AIOverloadedError(f"AI scheduler timed out queueing '{waiter[2].name}' call", 503)
+        return False
+
+    def _leave(self, waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            waiter[2].waiting -= 1
+            # Our leaving may make another waiter the runnable head
+            self._cond.notify_all()
+
+    def acquire(self, name: str):
+        with self._cond:
+            waiter = self._enqueue(name)
+            if waiter is None:
+                return
+            try:
+                while not self._grant(waiter):
+                    self._cond.wait(max(0.0, waiter[3] + waiter[2].max_wait - self._clock()))
+            except BaseException:
+                self._leave(waiter)
+                raise
+
+    async def acquire_async(self, name: str):
+        """acquire() for event-loop callers: polls for its turn instead of blocking a thread."""
+        with self._cond:
+            waiter = self._enqueue(name)
+        if waiter is None:
+            return
+        try:
+            while True:
+                with self._cond:
+                    if self._grant(waiter):
+                        return
+                await asyncio.sleep(0.005)
+        except BaseException:
+            with self._cond:
+                self._leave(waiter)
+            raise
+
+    def _admit(self, cls, waited):
+        self.active += 1
+        cls.active += 1
+        cls.admitted += 1
+        cls.wait_total += waited
+
+    def release(self, name: str):
+        cls = self._classes.get(name) or self._classes['draft']
+        with self._cond:
+            self.active -= 1
+            cls.active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, name: str):
+        self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'active': self.active,
+                'total': self.total,
+                'classes': {
+                    c.name: {
+                        'priority': c.priority,
+                        'active': c.active,
+                        'waiting': c.waiting,
+                        'admitted': c.admitted,
+                        'shed': c.shed,
+                        'avg_wait_ms': round(1000 * c.wait_total / c.admitted) if c.admitted else 0,
+                    } for c in self._classes.values()
+                },
+            }
+
+
+class GeminiClient:
+    """Process-wide Gemini client.
+
+    All AI calls share one pooled `httpx.Client`, so connections to
+    generativelanguage.googleapis.com stay alive between requests instead of
+    paying a TCP+TLS handshake per call. Configure with `init_app(app)`.
+    """
+
+    def __init__(self, app=None):
+        self._config = {}
+        self.model = DEFAULT_MODEL
+        self.base_url = DEFAULT_BASE_URL
+        self.timeout = 15.0
+        self.min_timeout = 3.0
+        self.timeout_multiplier = 3.0
+        self.connect_timeout = 5.0
+        self.max_retries = 1
+        self.retry_backoff = 0.5
+        self.max_connections = 20
+        self._client = None
+        self._aclient = None
+        self._aclient_loop = None
+        self._aflights = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.breaker = CircuitBreaker()
+        self.scheduler = PriorityScheduler()
+        self.context_cache = False
+        self.context_cache_ttl = 3600
+        self._context_caches = {}
+        self._usage = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read Gemini settings from the Flask config and register the client."""
+        self._config = app.config
+        self.model = app.config.get('GEMINI_MODEL') or DEFAULT_MODEL
+        self.base_url = (app.config.get('GEMINI_API_BASE') or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = float(app.config.get('GEMINI_TIMEOUT') or 15)
+        self.connect_timeout = float(app.config.get('GEMINI_CONNECT_TIMEOUT') or 5)
+        self.max_retries = int(app.config.get('GEMINI_MAX_RETRIES', 1))
+        self.max_connections = int(app.config.get('GEMINI_MAX_CONNECTIONS') or 20)
+        self.min_timeout = min(self.timeout, float(app.config.get('GEMINI_MIN_TIMEOUT') or 3))
+        self.breaker = CircuitBreaker(
+            window=int(app.config.get('GEMINI_BREAKER_WINDOW') or 20),
+            min_calls=int(app.config.get('GEMINI_BREAKER_MIN_CALLS') or 5),
+            error_rate=float(app.config.get('GEMINI_BREAKER_ERROR_RATE') or 0.5),
+            reset_timeout=float(app.config.get('GEMINI_BREAKER_RESET_SECONDS') or 30),
+            probe_timeout=float(app.config.get('GEMINI_BREAKER_PROBE_SECONDS') or 60),
+        )
+        classes = dict(DEFAULT_AI_CLASSES)
+        classes.update(parse_scheduler_classes(app.config.get('AI_SCHEDULER_CLASSES')))
+        self.scheduler = PriorityScheduler(classes, total=app.config.get('AI_SCHEDULER_CONCURRENCY') or 16)
+        self.context_cache = bool(app.config.get('GEMINI_CONTEXT_CACHE'))
+        self.context_cache_ttl = int(app.config.get('GEMINI_CONTEXT_CACHE_TTL') or 3600)
+        self._context_caches = {}
+        self.close()
+        app.extensions['gemini'] = self
+
+    @property
+    def api_key(self):
+        return self._config.get('GEMINI_API_KEY') or os.getenv('GEMINI_API_KEY')
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _http(self) -> httpx.Client:
+        """Return the shared pooled client, creating it on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    limits = httpx.Limits(max_connections=self.max_connections,
+                                          max_keepalive_connections=self.max_connections,
+                                          keepalive_expiry=60)
+                    # Transport-level retries cover connection failures only
+                    transport = httpx.HTTPTransport(http2=_HTTP2_AVAILABLE, limits=limits,
+                                                    retries=self.max_retries)
+                    self._client = httpx.Client(
+                        transport=transport,
+                        timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    )
+                    logger.info(f"Gemini client pool created (http2={_HTTP2_AVAILABLE})")
+        return self._client
+
+    def shared_http(self) -> httpx.Client:
+        """The same pool for the app's other Google calls (reCAPTCHA siteverify)."""
+        return self._http()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception:
+                    pass
+                self._client = None
+
+    def _async_http(self) -> httpx.AsyncClient:
+        """Pooled AsyncClient for the running event loop (ASGI mode, see asgi.py)."""
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections,
+                                  keepalive_expiry=60)
+            transport = httpx.AsyncHTTPTransport(http2=_HTTP2_AVAILABLE, limits=limits,
+                                                 retries=self.max_retries)
+            self._aclient = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+            self._aclient_loop = loop
+            logger.info(f"Gemini async client pool created (http2={_HTTP2_AVAILABLE})")
+        return self._aclient
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+            self._aclient_loop = None
+
+    def model_url(self, method='generateContent', model=None) -> str:
+        return f"{self.base_url}/models/{model or self.model}:{method}"
+
+    def current_timeout(self) -> float:
+        """Read timeout adapted to recent latency: a multiple of p95, within [min_timeout, timeout].
+
+        Half-open probes always get the full timeout, so a slower but healthy
+        upstream can close the circuit again.
+        """
+        p95 = self.breaker.latency_quantile(0.95)
+        if p95 is None or self.breaker.state != CircuitBreaker.CLOSED:
+            return self.timeout
+        return min(self.timeout, max(self.min_timeout, p95 * self.timeout_multiplier))
+
+    def _request_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.current_timeout(), connect=self.connect_timeout)
+
+    def stats(self) -> dict:
+        return {
+            'http2': _HTTP2_AVAILABLE,
+            'coalesced_requests': self._flights.coalesced,
+            'timeout_seconds': round(self.current_timeout(), 2),
+            'circuit': self.breaker.snapshot(),
+            'scheduler': self.scheduler.stats(),
+            'context_cache': self.context_cache,
+            'usage': self.usage(),
+        }
+
+    def usage(self) -> dict:
+        """Token usage per call type, from Gemini's usageMetadata."""
+        with self._lock:
+            report = {}
+            for call_type, u in self._usage.items():
+                calls = u['calls'] or 1
+                report[call_type] = {
+                    **u,
+                    'avg_prompt_tokens': round(u['prompt_tokens'] / calls, 1),
+                    'avg_cached_tokens': round(u['cached_tokens'] / calls, 1),
+                }
+            return report
+
+    def _record_usage(self, call_type: str, data):
+        meta = data.get('usageMetadata') if isinstance(data, dict) else None
+        if not meta:
+            return
+        with self._lock:
+            u = self._usage.setdefault(call_type, {'calls': 0, 'prompt_tokens': 0,
+                                                   'cached_tokens': 0, 'output_tokens': 0})
+            u['calls'] += 1
+            u['prompt_tokens'] += int(meta.get('promptTokenCount') or 0)
+            u['cached_tokens'] += int(meta.get('cachedContentTokenCount') or 0)
+            u['output_tokens'] += int(meta.get('candidatesTokenCount') or 0)
+
+    def _cached_content_name(self, system_instruction: dict, model: str):
+        """Name of a Gemini cachedContents entry holding this system instruction.
+
+        Created on first use and reused until shortly before its TTL ends. If the
+        API refuses (e.g. the instruction is below the model's minimum cacheable
+        size) the refusal is remembered and callers send the instruction inline.
+        """
+        if not self.context_cache:
+            return None
+        key = hashlib.sha256(
+            (model + json.dumps(system_instruction, sort_keys=True)).encode('utf-8')
+        ).hexdigest()
+        now = time.time()
+        entry = self._context_caches.get(key)
+        if entry and entry['expires'] > now:
+            return entry['name']
+        name, expires = None, now + 300
+        try:
+            resp = self._http().post(
+                f"{self.base_url}/cachedContents",
+                json={'model': f"models/{model}", 'systemInstruction': system_instruction,
+                      'ttl': f"{self.context_cache_ttl}s"},
+                headers={'x-goog-api-key': self.api_key},
+                timeout=self._request_timeout(),
+            )
+            if resp.status_code == 200:
+                name = resp.json().get('name')
+                # Refresh a minute before Gemini drops it
+                expires = now + max(60, self.context_cache_ttl - 60)
+            else:
+                expires = now + 3600
+                logger.info(f"Gemini context cache unavailable (HTTP {resp.status_code}); "
+                            f"sending system instruction inline")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.info(f"Gemini context cache creation failed: {e}")
+        self._context_caches[key] = {'name': name, 'expires': expires}
+        return name
+
+    def _forget_cached_content(self, name: str):
+        for key, entry in list(self._context_caches.items()):
+            if entry['name'] == name:
+                self._context_caches[key] = {'name': None, 'expires': time.time() + 300}
+
+    def generate_content(self, payload: dict, model=None, call_type='default') -> dict:
+        """POST a generateContent request and return the decoded JSON body.
+
+        Concurrent calls with an identical request (same prompt hash) share one
+        upstream call. `call_type` picks the scheduler class (call_class) and the
+        usage bucket. Raises GeminiError when no key is configured, the network
+        fails, the upstream answers with a non-200 status after retries, or the
+        scheduler sheds the call (AIOverloadedError).
+        """
+        if not self.api_key:
+            raise GeminiError('GEMINI_API_KEY not set')
+        model = model or self.model
+        key = hashlib.sha256(
+            (model + json.dumps(payload, sort_keys=True, ensure_ascii=False)).encode('utf-8')
+        ).hexdigest()
+        return self._flights.do(key, lambda: self._post_generate_cached(payload, model, call_type))
+
+    def _post_generate_cached(self, payload: dict, model: str, call_type: str) -> dict:
+        """Send the system instruction via cached content when possible, else inline."""
+        with self.scheduler.slot(call_class(call_type)):
+            return self._send_generate(payload, model, call_type)
+
+    def _send_generate(self, payload: dict, model: str, call_type: str) -> dict:
+        cached_name = None
+        system = payload.get('systemInstruction')
+        if system is not None:
+            cached_name = self._cached_content_name(system, model)
+        if cached_name:
+            cached_payload = {k: v for k, v in payload.items() if k != 'systemInstruction'}
+            cached_payload['cachedContent'] = cached_name
+            try:
+                data = self._post_generate(cached_payload, model)
+                self._record_usage(call_type, data)
+                return data
+            except GeminiError as e:
+                # Cache evicted or rejected upstream: drop it and retry inline once
+                if e.status_code not in (400, 403, 404):
+                    raise
+                logger.info(f"Gemini cached content {cached_name} rejected; retrying inline")
+                self._forget_cached_content(cached_name)
+        data = self._post_generate(payload, model)
+        self._record_usage(call_type, data)
+        return data
+
+    def _post_generate(self, payload: dict, model: str) -> dict:
+        if not self.breaker.allow():
+            raise CircuitOpenError('Gemini circuit open; skipping upstream call')
+        url = self.model_url('generateContent', model)
+        headers = {'x-goog-api-key': self.api_key}
+        timeout = self._request_timeout()
+        attempt = 0
+        recorded = False
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    resp = self._http().post(url, json=payload, headers=headers, timeout=timeout)
+                except httpx.HTTPError as e:
+                    recorded = True
+                    self.breaker.record_failure(_timeout_sample(e, timeout))
+                    raise GeminiError(f"Gemini request failed: {e}") from e
+                if resp.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                    attempt += 1
+                    time.sleep(self.retry_backoff * attempt)
+                    continue
+                recorded = True
+                return self._decode(resp, started)
+        finally:
+            # Interrupted with no outcome (eventlet.Timeout, GreenletExit, KeyboardInterrupt):
+            # still report it, or a half-open probe would stay in flight
+            if not recorded:
+                self.breaker.record_failure()
+
+    def _decode(self, resp: httpx.Response, started: float) -> dict:
+        """Record the final outcome with the breaker and return the JSON body."""
+        if resp.status_code in RETRYABLE_STATUS:
+            self.breaker.record_failure()
+            raise GeminiError(f"Gemini HTTP {resp.status_code}: {resp.text[:500]}", resp.status_code)
+        # Any other answer means the service is up, even a 4xx for a bad request;
+        # only full answers are latency samples, a fast rejection says nothing about them
+        if resp.status_code != 200:
+            self.breaker.record_success()
+            raise GeminiError(f"Gemini HTTP {resp.status_code}: {resp.text[:500]}", resp.status_code)
+        self.breaker.record_success(time.monotonic() - started)
+        try:
+            return resp.json()
+        except ValueError as e:
+            raise GeminiError(f"Gemini returned invalid JSON: {e}", resp.status_code) from e
+
+    def stream_generate_content(self, payload: dict, model=None, call_type='default'):
+        """Yield text chunks from streamGenerateContent (SSE) as Gemini produces them.
+
+        Errors before the first chunk raise GeminiError so callers can fall back;
+        the connection goes back to the shared pool when the generator closes.
+        """
+        api_key = self.api_key
+        if not api_key:
+            raise GeminiError('GEMINI_API_KEY not set')
+        # The scheduler slot is held until the stream is fully read or closed
+        with self.scheduler.slot(call_class(call_type)):
+            yield from self._stream_generate(payload, model, call_type, api_key)
+
+    def _stream_generate(self, payload: dict, model, call_type: str, api_key: str):
+        if not self.breaker.allow():
+            raise CircuitOpenError('Gemini circuit open; skipping upstream stream')
+        url = self.model_url('streamGenerateContent', model)
+        headers = {'x-goog-api-key': api_key}
+        timeout = self._request_timeout()
+        started = time.monotonic()
+        recorded = False
+        last_usage = None
+        try:
+            with self._http().stream('POST', url, params={'alt': 'sse'}, json=payload,
+                                     headers=headers, timeout=timeout) as resp:
+                if resp.status_code != 200:
+                    resp.read()
+                    recorded = True
+                    if resp.status_code in RETRYABLE_STATUS:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                    raise GeminiError(f"Gemini HTTP {resp.status_code}: {resp.text[:500]}",
+                                      resp.status_code)
+                # Time to response headers is the latency sample for streams
+                recorded = True
+                self.breaker.record_success(time.monotonic() - started)
+                for line in resp.iter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    try:
+                        chunk = json.loads(line[5:].strip())
+                    except ValueError:
+                        continue
+                    # Only the final chunk carries complete usage metadata
+                    if isinstance(chunk, dict) and chunk.get('usageMetadata', {}).get('candidatesTokenCount'):
+                        last_usage = chunk
+                    text = candidate_text(chunk, sep='')
+                    if text:
+                        yield text
+            if last_usage is not None:
+                self._record_usage(call_type, last_usage)
+        except httpx.HTTPError as e:
+            if not recorded:
+                recorded = True
+                self.breaker.record_failure(_timeout_sample(e, timeout))
+            raise GeminiError(f"Gemini stream failed: {e}") from e
+        finally:
+            if not recorded:
+                self.breaker.record_failure()
+
+
+    # ---- asyncio variants (ASGI mode). Same breaker, scheduler and usage
+    # accounting; the system instruction is always sent inline here.
+
+    async def agenerate_content(self, payload: dict, model=None, call_type='default') -> dict:
+        """Async generate_content; identical concurrent requests share one call."""
+        if not self.api_key:
+            raise GeminiError('GEMINI_API_KEY not set')
+        model = model or self.model
+        key = hashlib.sha256(
+            (model + json.dumps(payload, sort_keys=True, ensure_ascii=False)).encode('utf-8')
+        ).hexdigest()
+        flight = self._aflights.get(key)
+        if flight is not None:
+            self._flights.coalesced += 1
+            return await asyncio.shield(flight)
+        flight = self._aflights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._apost_generate(payload, model, call_type)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            # Followers of a cancelled leader (client went away) get a plain failure
+            if isinstance(e, asyncio.CancelledError):
+                e = GeminiError('Gemini request cancelled')
+            flight.set_exception(e)
+            # Mark retrieved so a flight without followers doesn't log a warning
+            flight.exception()
+            raise
+        finally:
+            self._aflights.pop(key, None)
+
+    async def _apost_generate(self, payload: dict, model: str, call_type: str) -> dict:
+        name = call_class(call_type)
+        await self.scheduler.acquire_async(name)
+        try:
+            if not self.breaker.allow():
+                raise CircuitOpenError('Gemini circuit open; skipping upstream call')
+            url = self.model_url('generateContent', model)
+            headers = {'x-goog-api-key': self.api_key}
+            timeout = self._request_timeout()
+            attempt = 0
+            recorded = False
+            try:
+                while True:
+                    started = time.monotonic()
+                    try:
+                        resp = await self._async_http().post(url, json=payload, headers=headers, timeout=timeout)
+                    except httpx.HTTPError as e:
+                        recorded = True
+                        self.breaker.record_failure(_timeout_sample(e, timeout))
+                        raise GeminiError(f"Gemini request failed: {e}") from e
+                    if resp.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                        attempt += 1
+                        await asyncio.sleep(self.retry_backoff * attempt)
+                        continue
+                    recorded = True
+                    data = self._decode(resp, started)
+                    self._record_usage(call_type, data)
+                    return data
+            finally:
+                # Cancelled mid-request (the client disconnected): still report it,
+                # or a half-open probe would stay in flight
+                if not recorded:
+                    self.breaker.record_failure()
+        finally:
+            self.scheduler.release(name)
+
+    async def astream_generate_content(self, payload: dict, model=None, call_type='default'):
+        """Async stream_generate_content: yields text chunks as Gemini produces them."""
+        api_key = self.api_key
+        if not api_key:
+            raise GeminiError('GEMINI_API_KEY not set')
+        name = call_class(call_type)
+        await self.scheduler.acquire_async(name)
+        try:
+            if not self.breaker.allow():
+                raise CircuitOpenError('Gemini circuit open; skipping upstream stream')
+            timeout = self._request_timeout()
+            started = time.monotonic()
+            recorded = False
+            last_usage = None
+            try:
+                async with self._async_http().stream(
+                        'POST', self.model_url('streamGenerateContent', model), params={'alt': 'sse'},
+                        json=payload, headers={'x-goog-api-key': api_key},
+                        timeout=timeout) as resp:
+                    if resp.status_code != 200:
+                        await resp.aread()
+                        recorded = True
+                        if resp.status_code in RETRYABLE_STATUS:
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()
+                        raise GeminiError(f"Gemini HTTP {resp.status_code}: {resp.text[:500]}",
+                                          resp.status_code)
+                    recorded = True
+                    self.breaker.record_success(time.monotonic() - started)
+                    async for line in resp.aiter_lines():
+                        if not line.startswith('data:'):
+                            continue
+                        try:
+                            chunk = json.loads(line[5:].strip())
+                        except ValueError:
+                            continue
+                        if isinstance(chunk, dict) and chunk.get('usageMetadata', {}).get('candidatesTokenCount'):
+                            last_usage = chunk
+                        text = candidate_text(chunk, sep='')
+                        if text:
+                            yield text
+                if last_usage is not None:
+                    self._record_usage(call_type, last_usage)
+            except httpx.HTTPError as e:
+                if not recorded:
+                    recorded = True
+                    self.breaker.record_failure(_timeout_sample(e, timeout))
+                raise GeminiError(f"Gemini stream failed: {e}") from e
+            finally:
+                if not recorded:
+                    self.breaker.record_failure()
+        finally:
+            self.scheduler.release(name)
+
+
+def _timeout_sample(error: httpx.HTTPError, timeout: httpx.Timeout):
+    """Latency sample for a failed call: the read timeout a timed-out call hit, else None."""
+    if isinstance(error, httpx.TimeoutException):
+        return timeout.read
+    return None
+
+
+def candidate_text(data, sep=' ') -> str:
+    """Join the text parts of the first candidate; '' when the shape is unexpected."""
+    try:
+        parts = data['candidates'][0]['content']['parts']
+    except (KeyError, IndexError, TypeError):
+        return ''
+    return sep.join(p.get('text', '') for p in parts if isinstance(p, dict))
+
+
+gemini = GeminiClient()
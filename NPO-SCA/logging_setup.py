@@ -0,0 +1,108 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Chatty third-party loggers, quieted in production unless LOG_LEVELS says otherwise
+PRODUCTION_LEVELS = {
+    'werkzeug': 'WARNING',
+    'httpx': 'WARNING',
+    'httpcore': 'WARNING',
+    'hpack': 'WARNING',
+    'engineio': 'WARNING',
+    'socketio': 'WARNING',
+}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records below WARNING, per logger.
+
+    `rates` maps logger names to the share of records kept (0.0-1.0); a logger
+    uses the rate of its nearest configured ancestor ('app' covers 'app.x').
+    Warnings and errors always pass.
+    """
+
+    def __init__(self, rates, rng=random.random):
+        super().__init__()
+        self.rates = {name: float(rate) for name, rate in (rates or {}).items()}
+        self._rng = rng
+        self._resolved = {}
+
+    def _rate(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            probe = name
+            while True:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                if '.' not in probe:
+                    rate = self.rates.get('', 1.0)
+                    break
+                probe = probe.rsplit('.', 1)[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or self._rng() < rate
+
+
+def _stop_listener(listener):
+    # Flush what is still queued at exit; a no-op if already stopped
+    if listener._thread is not None:
+        listener.stop()
+
+
+def configure_logging(profile='dev', level=None, levels=None, sampling=None, stream=None):
+    """Set up root logging for the given profile; returns the QueueListener (or None).
+
+    'dev' logs everything at DEBUG straight to stdout, as the app always has.
+    'production' logs at INFO (or `level`) through a QueueHandler: request
+    threads only enqueue the record, and one QueueListener thread does the
+    formatting and writing. `levels` ({logger: level}) and `sampling`
+    ({logger: rate}, see SamplingFilter) tune individual loggers.
+    """
+    stream = stream or sys.stdout
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = None
+    if profile == 'production':
+        records = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(records)
+        listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        listener.start()
+        atexit.register(_stop_listener, listener)
+        root.setLevel(level or 'INFO')
+        merged = dict(PRODUCTION_LEVELS)
+    else:
+        handler = output
+        root.setLevel(level or 'DEBUG')
+        merged = {}
+    merged.update(levels or {})
+    for name, logger_level in merged.items():
+        logging.getLogger(name).setLevel(logger_level)
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+    root.addHandler(handler)
+    return listener
@@ -0,0 +1,111 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import threading
+import time
+
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import PhysicalMailbox
+
+_FIELDS = ('id', 'name', 'address', 'city', 'province', 'postal_code', 'description', 'operating_hours')
+
+
+class MailboxCache:
+    """Read-through cache of the active mailboxes and the /submit offline-option fragment.
+
+    Committing an inserted, updated or deleted PhysicalMailbox in this process
+    drops both; `ttl` bounds how long writes from other processes (CLI,
+    predeploy, other workers) go unseen. Bulk `query.update()` calls bypass
+    the session events, so they call `invalidate()` themselves.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._app = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._mailboxes = None
+        self._fragment = None
+        self._expires = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.ttl = app.config.get('MAILBOX_CACHE_TTL', self.ttl)
+        app.jinja_env.globals['offline_option_html'] = self.offline_fragment
+        app.extensions['mailbox_cache'] = self
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._mailboxes = None
+            self._fragment = None
+
+    def mailboxes(self) -> list[dict]:
+        """Active mailboxes as plain dicts (safe to share across sessions and threads)."""
+        with self._lock:
+            if self._mailboxes is not None and time.monotonic() < self._expires:
+                self.hits += 1
+                return self._mailboxes
+            generation = self._generation
+        self.misses += 1
+        rows = PhysicalMailbox.query.filter_by(status='active').order_by(PhysicalMailbox.id).all()
+        mailboxes = [{field: getattr(row, field) for field in _FIELDS} for row in rows]
+        with self._lock:
+            # A write committed while we were reading wins; don't store what we read
+            if generation == self._generation:
+                self._mailboxes = mailboxes
+                self._fragment = None
+                self._expires = time.monotonic() + self.ttl
+        return mailboxes
+
+    def offline_fragment(self) -> Markup:
+        """The 'Find Physical Mailboxes' section of submit.html, rendered once per cache fill."""
+        mailboxes = self.mailboxes()
+        with self._lock:
+            if self._fragment is not None and self._fragment[0] is mailboxes:
+                return self._fragment[1]
+        # Straight through the Jinja env: render_template would also run the
+        # nav-count context processors, which the fragment doesn't use
+        html = Markup(self._app.jinja_env.get_template('partials/offline_option.html').render(
+            mailboxes=mailboxes, show_mailboxes=self._app.config.get('SHOW_PHYSICAL_MAILBOXES', False)))
+        with self._lock:
+            if self._mailboxes is mailboxes:
+                self._fragment = (mailboxes, html)
+        return html
+
+    def stats(self) -> dict:
+        return {'cached': self._mailboxes is not None, 'hits': self.hits, 'misses': self.misses}
+
+
+mailbox_cache = MailboxCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_mailbox_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, PhysicalMailbox):
+            session.info['mailboxes_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('mailboxes_changed', False):
+        mailbox_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_writes(session):
+    session.info.pop('mailboxes_changed', None)
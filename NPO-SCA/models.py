@@ -12,6 +12,8 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, inspect
+import hashlib
 import uuid
 import enum
 
@@ -121,6 +123,24 @@ class Letter(db.Model):
     is_flagged = db.Column(db.Boolean, default=False)
     is_processed = db.Column(db.Boolean, default=False)
     
+    # Moderation metadata. 'pending' letters are waiting for the background AI
+    # check and stay hidden from volunteers; NULL means checked before the queue existed.
+    moderation_reason = db.Column(db.Text)
+    moderation_checked = db.Column(db.Boolean, default=False)
+    moderation_status = db.Column(db.String(20), index=True)
+    # Rule pack version the keyword scan last ran with (0: never); see rule_packs.py
+    moderation_rule_version = db.Column(db.Integer, default=0, index=True)
+    # SimHash of the normalized content (signed 64-bit), for near-duplicate spam checks
+    simhash = db.Column(db.BigInteger)
+    # SHA-256 of the exact content, kept in sync on every flush; indexed with the
+    # sender and time below for the exact-duplicate check in submit()
+    content_sha256 = db.Column(db.String(64))
+    # Denormalized from user_reply for the volunteer follow-up list: replies the
+    # volunteers haven't opened yet, and the newest reply (read or not). Kept in step
+    # by the reply/respond routes; `flask reconcile-replies` recomputes them.
+    unread_reply_count = db.Column(db.Integer, default=0)
+    last_reply_at = db.Column(db.DateTime)
+    
     # 时间戳
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
@@ -133,10 +153,30 @@ class Letter(db.Model):
     responder_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     responses = db.relationship('Response', backref='letter', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_letter_anon_content_created', 'anon_user_id', 'content_sha256', 'created_at'),
+        # Partial index over letters awaiting follow-up, in last_reply_at order
+        db.Index('ix_letter_unread_replies', 'last_reply_at',
+                 sqlite_where=db.text('unread_reply_count > 0'),
+                 postgresql_where=db.text('unread_reply_count > 0')),
+    )
+
+    @staticmethod
+    def hash_content(content):
+        return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
     def __repr__(self):
         return f'<Letter {self.unique_id}>'
 
 
+@event.listens_for(Letter, 'before_insert')
+@event.listens_for(Letter, 'before_update')
+def _sync_letter_content_hash(mapper, connection, target):
+    # Flag, read and counter updates leave the content alone: no need to rehash it
+    if target.content_sha256 is None or inspect(target).attrs.content.history.has_changes():
+        target.content_sha256 = Letter.hash_content(target.content)
+
+
 class Response(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
@@ -146,7 +186,7 @@ class Response(db.Model):
     response_type = db.Column(db.String(20))  # 'human', 'ai', 'hybrid'
     
     # 关系
-    letter_id = db.Column(db.Integer, db.ForeignKey('letter.id'), nullable=False)
+    letter_id = db.Column(db.Integer, db.ForeignKey('letter.id'), nullable=False, index=True)
     
     # AI 元数据
     ai_model = db.Column(db.String(50))
@@ -166,7 +206,7 @@ class UserReply(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), nullable=False)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), nullable=False, index=True)
     
     # Track which letter this reply chain belongs to (for easier querying)
     letter_id = db.Column(db.Integer, db.ForeignKey('letter.id'), nullable=False)
@@ -194,4 +234,112 @@ class PhysicalMailbox(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<Mailbox {self.name} - {self.city}>' 
\ No newline at end of file
+        return f'<Mailbox {self.name} - {self.city}>' 
+
+
+class ModerationRulePack(db.Model):
+    """Versioned moderation keyword pack; the highest version is the live one (see rule_packs.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, unique=True, nullable=False)
+    rules = db.Column(db.Text, nullable=False)  # JSON: {category: [keywords]}
+    note = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ModerationRulePack v{self.version}>'
+
+
+class LetterCounter(db.Model):
+    """Running letter counts behind the staff nav badges, kept in step with `letter`.
+
+    The Letter listeners below adjust these rows inside the same flush (and so
+    the same transaction) as the letter write; `recount()` rebuilds them from
+    scratch. Bulk `query.update()`s on the counted columns bypass the
+    listeners, so write those letters through the ORM instead.
+    """
+    __tablename__ = 'letter_counter'
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    NAMES = ('flagged', 'unprocessed')
+
+    @staticmethod
+    def memberships(is_flagged, is_processed, moderation_status) -> dict:
+        """Which counters a letter in this state belongs to (mirrors the recount queries)."""
+        flagged = bool(is_flagged)
+        return {
+            'flagged': flagged,
+            # Unreplied, unflagged and cleared by the AI check (hidden from volunteers until then)
+            'unprocessed': is_processed is not None and not is_processed and not flagged
+                           and moderation_status != 'pending',
+        }
+
+    @classmethod
+    def recount(cls) -> dict:
+        """Recompute every counter from `letter` and store it; returns {name: value}."""
+        cls.__table__.create(db.engine, checkfirst=True)
+        values = {
+            'flagged': Letter.query.filter(Letter.is_flagged == True).count(),  # noqa: E712
+            'unprocessed': Letter.query.filter(
+                (Letter.is_processed == False)  # noqa: E712
+                & ((Letter.is_flagged == False) | Letter.is_flagged.is_(None))  # noqa: E712
+                & (Letter.moderation_status.is_(None) | (Letter.moderation_status != 'pending'))
+            ).count(),
+        }
+        for name, value in values.items():
+            db.session.merge(cls(name=name, value=value))
+        db.session.commit()
+        return values
+
+    @classmethod
+    def values(cls) -> dict:
+        """Stored counts; recounts first if a counter row is missing."""
+        values = {row.name: row.value for row in cls.query.all()}
+        if any(name not in values for name in cls.NAMES):
+            values = cls.recount()
+        return values
+
+    def __repr__(self):
+        return f'<LetterCounter {self.name}={self.value}>'
+
+
+def _bump_letter_counters(connection, before, after):
+    table = LetterCounter.__table__
+    for name in LetterCounter.NAMES:
+        delta = int(after.get(name, False)) - int(before.get(name, False))
+        if delta:
+            connection.execute(table.update().where(table.c.name == name)
+                               .values(value=table.c.value + delta))
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history loads the old value on assignment, so after_update can see what changed
+for _attr in (Letter.is_flagged, Letter.is_processed, Letter.moderation_status):
+    event.listen(_attr, 'set', _load_old_value, active_history=True)
+
+
+def _letter_memberships(target, old=False):
+    state = db.inspect(target)
+    values = []
+    for key in ('is_flagged', 'is_processed', 'moderation_status'):
+        history = state.attrs[key].history
+        values.append(history.deleted[0] if old and history.deleted else getattr(target, key))
+    return LetterCounter.memberships(*values)
+
+
+@event.listens_for(Letter, 'after_insert')
+def _count_inserted_letter(mapper, connection, target):
+    _bump_letter_counters(connection, {}, _letter_memberships(target))
+
+
+@event.listens_for(Letter, 'after_update')
+def _count_updated_letter(mapper, connection, target):
+    _bump_letter_counters(connection, _letter_memberships(target, old=True), _letter_memberships(target))
+
+
+@event.listens_for(Letter, 'before_delete')
+def _count_deleted_letter(mapper, connection, target):
+    _bump_letter_counters(connection, _letter_memberships(target), {})
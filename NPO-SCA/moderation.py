@@ -0,0 +1,296 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import deque
+
+from caching import LRUTTLCache
+
+# Core categories across languages (stems/keywords)
+KEYWORD_CATEGORIES = {
+    # Self-harm / suicide (multi-lang, stems)
+    'self_harm': (
+        'suicide','selfharm','endmylife','hangmyself','overdose','kms','killmyself',
+        'tuersoi','seppuku','suicidio','suicidar','suicidarse','suicid', 'самоубий', 'суицид', '죽다', '自杀', '自殺', '自殺',
+    ),
+    # Threats / violence
+    'violence': (
+        'killyou','shoot','bomb','terrorist','execute','stab','toten','toten','tuer','matar','убью','殺す','korosu','杀了你','죽여',
+    ),
+    # Sexual violence
+    'sexual_violence': (
+        'rape','rapist','vergewaltig','viol', 'violar','강간','レイプ','强奸','اغتصاب',
+    ),
+    # Doxxing / illegal
+    'doxxing': (
+        'dox','leakaddress','creditcard','ssn','socialsecurity',
+    ),
+    # Hate slurs/profanity (representative; not exhaustive)
+    'hate_profanity': (
+        'nigger','faggot','kike','chink','spic','retard','tranny',
+        'puta','pendejo','mierda','cabron','putain','salope','encule','merde','scheisse','arschloch','hurensohn',
+        'blyat','suka','сука','бляд',
+        'fuck','motherfucker','cunt','shit','bitch','asshole',
+        '操','傻逼','妈的','去死','滚','垃圾',
+        '死ね','くそ','畜生',
+        '씨발','좆','병신',
+    ),
+}
+HARD_KEYWORDS = tuple(kw for kws in KEYWORD_CATEGORIES.values() for kw in kws)
+# Version of the built-in list above; published rule packs (rule_packs.py) count up from here
+BUILTIN_RULE_VERSION = 1
+
+
+# Leetspeak digits to letters and ASCII punctuation/whitespace dropped, in a single
+# bytes.translate over the UTF-8 form (ASCII bytes never occur inside multi-byte
+# sequences, and unlike str.translate it stays fast on CJK/Cyrillic text)
+_LEET_TABLE = bytes.maketrans(b'0134578', b'oieastb')
+_ASCII_NON_WORD = bytes(c for c in range(128) if not (chr(c).isalnum() or chr(c) == '_'))
+# Lead bytes of 4-byte sequences, i.e. characters above the BMP (emoji etc.)
+_ASTRAL_LEADS = b'\xf0\xf1\xf2\xf3\xf4'
+_NON_WORD_RE = re.compile(r"[^\w\u0080-\uffff]+")
+# Newlines are gone by now; DOTALL just spares the per-character newline test
+_REPEAT_RE = re.compile(r"(.)\1\1+", re.DOTALL)
+
+
+def normalize_for_moderation(text: str) -> tuple[str, str]:
+    """Return (simple_norm, ascii_norm) for leetspeak/spacing obfuscation checks."""
+    raw = (text or '').lower().encode('utf-8', 'surrogatepass').translate(_LEET_TABLE, _ASCII_NON_WORD)
+    simple = raw.decode('utf-8', 'surrogatepass')
+    if any(lead in raw for lead in _ASTRAL_LEADS):
+        simple = _NON_WORD_RE.sub("", simple)
+    # Collapse 3+ repeats to 2
+    simple = _REPEAT_RE.sub(r"\1\1", simple)
+    if simple.isascii():
+        return simple, simple
+    try:
+        ascii_norm = unicodedata.normalize('NFKD', simple).encode('ascii', 'ignore').decode('ascii')
+    except Exception:
+        ascii_norm = simple
+    return simple, ascii_norm
+
+
+def parse_rules(data) -> dict:
+    """Validate a rule pack body: {category: [keyword, ...]} -> {category: (keyword, ...)}.
+
+    Keywords are matched against normalized text, so they are stored lowercased.
+    Raises ValueError on anything else.
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError('rule pack must be a non-empty {category: [keywords]} object')
+    rules = {}
+    for category, keywords in data.items():
+        if not isinstance(category, str) or not category.strip():
+            raise ValueError(f'invalid category name: {category!r}')
+        if not isinstance(keywords, list) or not all(isinstance(kw, str) for kw in keywords):
+            raise ValueError(f'category {category!r} must be a list of strings')
+        cleaned = tuple(kw.strip().lower() for kw in keywords if kw.strip())
+        if not cleaned:
+            raise ValueError(f'category {category!r} has no keywords')
+        rules[category.strip()] = cleaned
+    return rules
+
+
+def verdict_key(simple: str, ascii_norm: str) -> str:
+    """Cache key for a verdict: the ascii form, unless folding to ascii dropped characters.
+
+    Accents fold away cleanly, but scripts without an ascii form (CJK, Cyrillic,
+    Arabic...) would all collapse to '', so those keep the simple form.
+    """
+    return ascii_norm if len(ascii_norm) >= len(simple) else simple
+
+
+class KeywordMatcher:
+    """Keyword lookups over a keyword list, prepared once per keyword set.
+
+    find_all() reports every keyword through an Aho-Corasick automaton, one pass
+    per haystack whatever the number of keywords. first_match() only needs the
+    highest-priority keyword, so it checks keywords in order with C-level `in`
+    and stops at the first hit, looking only in the haystacks a keyword can
+    occur in. `keywords` is either a {category: keywords} mapping or a plain
+    iterable (category 'keyword').
+    """
+
+    def __init__(self, keywords):
+        if isinstance(keywords, dict):
+            pairs = [(kw, cat) for cat, kws in keywords.items() for kw in kws]
+        else:
+            pairs = [(kw, 'keyword') for kw in keywords]
+        category = {}
+        for kw, cat in pairs:
+            if kw and kw not in category:
+                category[kw] = cat
+        # Index order is match priority: the first listed keyword wins in deterministic_match
+        self.keywords = tuple(category)
+        self.categories = tuple(category.values())
+        # A keyword the normalizer leaves untouched is in the simple form whenever it is
+        # in the lowercased text, so the raw haystack only needs a scan for the others;
+        # likewise the ascii form can only hold ascii keywords
+        self._plan = tuple((kw, kw.isascii(), normalize_for_moderation(kw)[0] != kw)
+                           for kw in self.keywords)
+        self.scan_raw = any(raw for _, _, raw in self._plan)
+        self._build()
+
+    def _build(self):
+        goto, out = [{}], [[]]
+        for idx, kw in enumerate(self.keywords):
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    out.append([])
+                    nxt = goto[state][ch] = len(goto) - 1
+                state = nxt
+            out[state].append(idx)
+
+        # Breadth-first failure links, folded into a full transition table so the
+        # scan is one dict lookup per character
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            if state:
+                delta[state] = {**delta[fail[state]], **goto[state]}
+                out[state] = out[state] + out[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+        self._step = [d.get for d in delta]
+        self._out = out
+
+    def scan(self, haystack: str, found: set) -> set:
+        """Add the index of every keyword occurring in `haystack` to `found`."""
+        step, out = self._step, self._out
+        state = 0
+        for ch in haystack:
+            state = step[state](ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def first_match(self, text: str, normalized=None):
+        """Index of the highest-priority keyword in the text or its normalized forms, else None."""
+        simple, ascii_norm = normalized or normalize_for_moderation(text)
+        folded = ascii_norm != simple
+        lower = None
+        for idx, (kw, is_ascii, raw) in enumerate(self._plan):
+            if kw in simple or (folded and is_ascii and kw in ascii_norm):
+                return idx
+            if raw:
+                if lower is None:
+                    lower = (text or '').lower()
+                if kw in lower:
+                    return idx
+        return None
+
+    def find_all(self, text: str, normalized=None) -> list[tuple[str, str]]:
+        """Every (keyword, category) found in the text or its normalized forms, in priority order."""
+        simple, ascii_norm = normalized or normalize_for_moderation(text)
+        found = self.scan(simple, set())
+        if ascii_norm != simple:
+            self.scan(ascii_norm, found)
+        if self.scan_raw:
+            self.scan((text or '').lower(), found)
+        return [(self.keywords[i], self.categories[i]) for i in sorted(found)]
+
+
+class Moderator:
+    """Deterministic keyword scan plus a verdict cache in front of the AI check.
+
+    Verdicts are keyed by the normalized text, so repeated chat lines, spam floods
+    and resubmitted letters (including spacing/leetspeak variants) are judged once
+    per TTL. Changing the keyword list invalidates every cached verdict.
+    """
+
+    def __init__(self, keywords=KEYWORD_CATEGORIES, cache_size=2048, ttl=3600):
+        self.matcher = KeywordMatcher(keywords)
+        self.keyword_version = BUILTIN_RULE_VERSION
+        self.verdicts = LRUTTLCache(maxsize=cache_size, ttl=ttl)
+        # Default AI check, registered by the app (see ai_moderate_letter_content)
+        self.ai_check = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.verdicts = LRUTTLCache(maxsize=app.config.get('MODERATION_CACHE_SIZE', 2048),
+                                    ttl=app.config.get('MODERATION_CACHE_TTL', 3600))
+        app.extensions['moderator'] = self
+
+    def set_keywords(self, keywords, version=None):
+        """Replace the keyword list; cached verdicts were computed against the old one.
+
+        The matcher is compiled before the swap, so scans in flight finish on the
+        old list and never see a half-built one. `version` is the rule pack version
+        (default: the next one).
+        """
+        matcher = KeywordMatcher(keywords)
+        with self._lock:
+            self.matcher = matcher
+            self.keyword_version = version if version is not None else self.keyword_version + 1
+        self.invalidate()
+
+    @property
+    def keywords(self) -> tuple:
+        return self.matcher.keywords
+
+    def invalidate(self):
+        self.verdicts.clear()
+
+    def keyword_matches(self, text: str, normalized=None) -> list[tuple[str, str]]:
+        """Every (keyword, category) in the text, highest-priority keyword first."""
+        return self.matcher.find_all(text, normalized)
+
+    def deterministic_match(self, text: str, normalized=None) -> tuple[bool, str]:
+        matcher = self.matcher
+        idx = matcher.first_match(text, normalized)
+        if idx is not None:
+            return True, matcher.keywords[idx]
+        return False, ''
+
+    def moderate(self, text: str, ai_check=None) -> tuple[bool, str]:
+        """Return (flagged, reason); unflagged when no verdict could be reached."""
+        return self.verdict(text, ai_check) or (False, '')
+
+    def verdict(self, text: str, ai_check=None):
+        """Return (flagged, reason), from the cache when this text was already judged.
+
+        `ai_check(text)` runs only when no keyword matches; it returns (flagged, reason),
+        or None when the AI could not answer, in which case nothing is cached and
+        None is returned.
+        """
+        ai_check = ai_check or self.ai_check
+        normalized = normalize_for_moderation(text)
+        key = verdict_key(*normalized)
+        if key:
+            cached = self.verdicts.get(key)
+            if cached is not None:
+                return cached
+        version = self.keyword_version
+        flagged, kw = self.deterministic_match(text, normalized)
+        if flagged:
+            verdict = (True, f"keyword: {kw}")
+        else:
+            verdict = ai_check(text) if ai_check else None
+            if verdict is None:
+                return None
+        # Skip the store if the keyword list changed while the AI was answering
+        if key and version == self.keyword_version:
+            self.verdicts.set(key, verdict)
+        return verdict
+
+    def stats(self) -> dict:
+        return {'keyword_version': self.keyword_version, 'keywords': len(self.keywords),
+                'verdict_cache': self.verdicts.stats()}
+
+
+moderator = Moderator()
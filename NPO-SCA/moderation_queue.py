@@ -0,0 +1,99 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationQueue:
+    """Background pipeline that finishes AI moderation and titles after `/submit` commits.
+
+    `process(letter_id)` does the actual work; `sweep()` returns ids of letters
+    still pending (after a restart or a full queue) and is polled whenever the
+    workers are idle. Workers are spawned with the SocketIO background-task
+    helper so they are greenlets under eventlet and threads otherwise.
+    """
+
+    def __init__(self, process, sweep=None, workers=2, maxsize=1000, sweep_interval=60):
+        self._process = process
+        self._sweep = sweep
+        self._workers = max(1, int(workers))
+        self._sweep_interval = sweep_interval
+        self._queue = queue.Queue(maxsize)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self.stats = {'enqueued': 0, 'processed': 0, 'failed': 0, 'dropped': 0}
+
+    def start(self, spawn):
+        """Start the worker loops once; `spawn(fn)` runs fn in the background."""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self._workers):
+            spawn(self._run)
+        logger.info(f"Moderation queue started with {self._workers} worker(s)")
+
+    def enqueue(self, letter_id) -> bool:
+        """Queue a letter for background moderation. Returns False if the queue is full."""
+        with self._lock:
+            if letter_id in self._queued:
+                return True
+            try:
+                self._queue.put_nowait(letter_id)
+            except queue.Full:
+                self.stats['dropped'] += 1
+                logger.warning(f"Moderation queue full; letter {letter_id} stays pending until the next sweep")
+                return False
+            self._queued.add(letter_id)
+            self.stats['enqueued'] += 1
+        return True
+
+    def pending_count(self) -> int:
+        return self._queue.qsize()
+
+    def join(self):
+        """Block until every queued letter has been processed (used by tests/CLI)."""
+        self._queue.join()
+
+    def _run_sweep(self):
+        if not self._sweep:
+            return
+        try:
+            for letter_id in self._sweep():
+                if not self.enqueue(letter_id):
+                    break
+        except Exception as e:
+            logger.error(f"Moderation sweep failed: {e}")
+
+    def _run(self):
+        self._run_sweep()
+        while True:
+            try:
+                letter_id = self._queue.get(timeout=self._sweep_interval)
+            except queue.Empty:
+                self._run_sweep()
+                continue
+            try:
+                self._process(letter_id)
+                self.stats['processed'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Background moderation failed for letter {letter_id}: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(letter_id)
+                self._queue.task_done()
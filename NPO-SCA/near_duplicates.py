@@ -0,0 +1,199 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+
+from moderation import normalize_for_moderation
+
+SIMHASH_BITS = 64
+# bytes.translate tables isolating one bit of every byte (b'\x01' if set), for bit counting
+_BIT_TABLES = [bytes((b >> bit) & 1 for b in range(256)) for bit in range(8)]
+
+
+def simhash(text: str, shingle=3) -> int:
+    """64-bit SimHash over character shingles of the moderation-normalized text.
+
+    Normalizing first means spacing, punctuation, case and leetspeak edits don't
+    move the fingerprint; shingling characters (not words) works for CJK too.
+    Returns 0 for empty text.
+    """
+    simple = normalize_for_moderation(text)[0]
+    if not simple:
+        return 0
+    shingles = {simple[i:i + shingle] for i in range(max(1, len(simple) - shingle + 1))}
+    digests = b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles)
+    # Majority vote per bit, counted column-wise over the packed digests
+    half = len(shingles) / 2
+    value = 0
+    for byte in range(8):
+        column = digests[byte::8]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) > half:
+                value |= 1 << (byte * 8 + bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def to_db(fingerprint: int) -> int:
+    """Unsigned 64-bit fingerprint -> signed value that fits a BIGINT/SQLite INTEGER column."""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def from_db(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """Banded in-memory index of recent letter fingerprints.
+
+    The 64 bits are split into `bands` equal bands and only letters sharing at
+    least one band exactly are compared, so a lookup reads a handful of small
+    buckets instead of every recent letter. Matches within `bands - 1` bits are
+    always found; up to `max_distance` most are (about 89% at 4 bits and 74% at 5
+    with 4 bands). More bands raise recall but widen the buckets. Entries older
+    than `window` seconds (or beyond `max_entries`) are evicted oldest first.
+    Per-sender counters back the admin list of near-duplicate senders.
+
+    `is_flood` decides when matches mean spam: short texts never do (common
+    phrases like "I feel so alone" collide naturally), and longer ones only when
+    `flood_threshold` matches come from the same sender or `flood_senders`
+    distinct senders sent the same text.
+    """
+
+    def __init__(self, max_distance=5, bands=4, window=86400, max_entries=20000, min_length=80,
+                 flood_threshold=3, flood_senders=10, clock=time.time):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.window = window
+        self.max_entries = max_entries
+        self.min_length = min_length
+        self.flood_threshold = flood_threshold
+        self.flood_senders = flood_senders
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._configure_bands()
+        self._entries = {}      # letter_id -> (fingerprint, anon_id, ts, is_near_duplicate)
+        self._order = deque()   # (ts, letter_id), oldest first
+        self._buckets = {}      # (band, band_value) -> set(letter_id)
+        self._senders = {}      # anon_id -> [letters, near_duplicates]
+        self.warmed = False
+
+    def _configure_bands(self):
+        self._band_bits = SIMHASH_BITS // self.bands
+        self._band_mask = (1 << self._band_bits) - 1
+
+    def init_app(self, app):
+        self.max_distance = app.config.get('NEAR_DUP_MAX_DISTANCE', self.max_distance)
+        self.bands = app.config.get('NEAR_DUP_BANDS', self.bands)
+        self.window = app.config.get('NEAR_DUP_WINDOW_HOURS', self.window / 3600) * 3600
+        self.max_entries = app.config.get('NEAR_DUP_MAX_ENTRIES', self.max_entries)
+        self.min_length = app.config.get('NEAR_DUP_MIN_LENGTH', self.min_length)
+        self.flood_threshold = app.config.get('NEAR_DUP_FLOOD_THRESHOLD', self.flood_threshold)
+        self.flood_senders = app.config.get('NEAR_DUP_FLOOD_SENDERS', self.flood_senders)
+        self._configure_bands()
+        app.extensions['near_duplicates'] = self
+
+    def _band_keys(self, fingerprint):
+        return [(band, (fingerprint >> (band * self._band_bits)) & self._band_mask)
+                for band in range(self.bands)]
+
+    def find(self, fingerprint: int, exclude_id=None) -> list[tuple]:
+        """Recent letters within max_distance bits: [(letter_id, distance, anon_id)], closest first."""
+        if not fingerprint:
+            return []
+        with self._lock:
+            self._expire(self._clock())
+            candidates = set()
+            for key in self._band_keys(fingerprint):
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(exclude_id)
+            matches = []
+            for letter_id in candidates:
+                other, anon_id = self._entries[letter_id][:2]
+                distance = hamming(fingerprint, other)
+                if distance <= self.max_distance:
+                    matches.append((letter_id, distance, anon_id))
+        matches.sort(key=lambda m: (m[1], m[0]))
+        return matches
+
+    def is_flood(self, text: str, matches, anon_id=None) -> bool:
+        """True when `matches` (from find) make this letter part of a spam flood."""
+        if len(normalize_for_moderation(text)[0]) < self.min_length:
+            return False
+        same_sender = sum(1 for match in matches if anon_id and match[2] == anon_id)
+        senders = {match[2] for match in matches if match[2]}
+        if anon_id:
+            senders.add(anon_id)
+        return same_sender >= self.flood_threshold or len(senders) >= self.flood_senders
+
+    def add(self, letter_id, fingerprint: int, anon_id=None, ts=None, near_duplicate=False):
+        if not fingerprint:
+            return
+        with self._lock:
+            if letter_id in self._entries:
+                return
+            ts = self._clock() if ts is None else ts
+            self._entries[letter_id] = (fingerprint, anon_id, ts, near_duplicate)
+            self._order.append((ts, letter_id))
+            for key in self._band_keys(fingerprint):
+                self._buckets.setdefault(key, set()).add(letter_id)
+            if anon_id:
+                counts = self._senders.setdefault(anon_id, [0, 0])
+                counts[0] += 1
+                counts[1] += int(near_duplicate)
+            self._expire(self._clock())
+
+    def warm(self, rows):
+        """Load (letter_id, fingerprint, anon_id, ts) rows, oldest first, e.g. from the DB at startup."""
+        for letter_id, fingerprint, anon_id, ts in rows:
+            near = bool(self.find(fingerprint, exclude_id=letter_id))
+            self.add(letter_id, fingerprint, anon_id, ts, near)
+        self.warmed = True
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._order and (self._order[0][0] < cutoff or len(self._order) > self.max_entries):
+            _, letter_id = self._order.popleft()
+            fingerprint, anon_id, _, near = self._entries.pop(letter_id)
+            for key in self._band_keys(fingerprint):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(letter_id)
+                    if not bucket:
+                        del self._buckets[key]
+            if anon_id:
+                counts = self._senders[anon_id]
+                counts[0] -= 1
+                counts[1] -= int(near)
+                if counts[0] <= 0:
+                    del self._senders[anon_id]
+
+    def near_duplicate_senders(self, min_near=2, limit=20) -> list[dict]:
+        """Senders with at least `min_near` near-duplicate letters in the window, most first."""
+        with self._lock:
+            self._expire(self._clock())
+            rows = [{'anon_id': anon_id, 'count': counts[0], 'near_duplicates': counts[1]}
+                    for anon_id, counts in self._senders.items() if counts[1] >= min_near]
+        rows.sort(key=lambda r: (-r['near_duplicates'], -r['count']))
+        return rows[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'letters': len(self._entries), 'buckets': len(self._buckets),
+                    'bands': self.bands, 'max_distance': self.max_distance}
+
+
+near_duplicates = NearDuplicateIndex()
@@ -0,0 +1,227 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# name -> (requests, per_seconds): a bucket of `requests` tokens refilled over `per_seconds`
+DEFAULT_LIMITS = {
+    'submit': (30, 60),   # /submit page loads + posts per IP
+    'chat': (20, 60),     # /api/chat per IP
+    'coach': (30, 60),    # /api/coach AI tips per IP (heuristic tips past the limit)
+    'socket': (10, 10),   # Socket.IO chat messages per IP
+}
+
+
+def parse_limits(raw) -> dict:
+    """RATE_LIMITS overrides, given as a dict or its JSON text, as {name: (requests, per_seconds)}.
+
+    A malformed value is logged and ignored, so the defaults apply: like a
+    backend failure, a bad setting must not take the app down.
+    """
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        limits = {}
+        for name, limit in data.items():
+            requests, per_seconds = limit
+            if not all(isinstance(v, (int, float)) and v > 0 for v in (requests, per_seconds)):
+                raise ValueError(f'{name!r} needs two positive numbers')
+            limits[name] = (requests, per_seconds)
+        return limits
+    except (TypeError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring malformed RATE_LIMITS ({e}); using the default limits")
+        return {}
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBackend:
+    """Per-process buckets in an LRU-bounded dict: O(1) per check, at most `max_keys` keys.
+
+    An evicted key comes back with a full bucket, which is also what it would
+    have refilled to after sitting idle that long.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost, now):
+        """Spend `cost` tokens if available; return (allowed, retry_after_seconds)."""
+        with self._lock:
+            state = self._buckets.pop(key, None)
+            tokens = capacity if state is None else _refill(state[0], state[1], now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    """Buckets in a shared SQLite file, so every worker on the host sees the same counts.
+
+    Each check is one short IMMEDIATE transaction on a WAL database, over one
+    connection per process behind a lock (thread-locals are per greenlet under
+    eventlet, which would mean a new connection per request). The busy timeout
+    is short because SQLite waits for another worker's write lock without
+    yielding; a check that can't get it fails open. Rows idle long enough to
+    have refilled are pruned every `prune_every` checks, and the oldest are
+    dropped beyond `max_keys`.
+    """
+
+    def __init__(self, path, max_keys=100000, max_idle=3600, prune_every=1000, busy_timeout=0.1):
+        self.path = path
+        self.max_keys = max_keys
+        self.max_idle = max_idle
+        self.prune_every = prune_every
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._checks = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            conn = self._conn()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                         'updated REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_buckets_updated ON buckets(updated)')
+
+    def _conn(self):
+        """The process's connection (caller holds the lock); reopened in a forked worker."""
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                       check_same_thread=False)
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._pid = os.getpid()
+        return self._db
+
+    def take(self, key, capacity, rate, cost, now):
+        with self._lock:
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                             (key, tokens, now))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            self._checks += 1
+            if self._checks % self.prune_every == 0:
+                self._prune(conn, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def prune(self, now):
+        with self._lock:
+            self._prune(self._conn(), now)
+
+    def _prune(self, conn, now):
+        conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.max_idle,))
+        conn.execute('DELETE FROM buckets WHERE key IN (SELECT key FROM buckets ORDER BY updated DESC '
+                     'LIMIT -1 OFFSET ?)', (self.max_keys,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+
+class RateLimiter:
+    """Named token-bucket limits over a pluggable backend.
+
+    `limited('chat', ip)` spends one token from that key's 'chat' bucket and says
+    whether the caller is over the limit. Backend failures fail open: a broken
+    limiter must not take the site down with it. Keys come from `client_ip`,
+    which trusts only the X-Forwarded-For hops added by our own proxies.
+    """
+
+    def __init__(self, backend=None, limits=None, trusted_proxies=1, clock=time.time):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.trusted_proxies = trusted_proxies
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self._clock = clock
+        self.stats_counts = {}
+
+    def init_app(self, app):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(parse_limits(app.config.get('RATE_LIMITS')))
+        self.trusted_proxies = int(app.config.get('TRUSTED_PROXY_HOPS', self.trusted_proxies))
+        max_keys = int(app.config.get('RATE_LIMIT_MAX_KEYS') or 10000)
+        if app.config.get('RATE_LIMIT_BACKEND') == 'sqlite':
+            path = app.config.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(app.instance_path, 'ratelimit.sqlite3')
+            self.backend = SQLiteBackend(path, max_keys=max_keys)
+        else:
+            self.backend = MemoryBackend(max_keys=max_keys)
+        app.extensions['rate_limiter'] = self
+
+    def client_ip(self, forwarded_for, peer) -> str:
+        """The client address as seen by the outermost of `trusted_proxies` proxies.
+
+        Each proxy appends the address it received the request from, so the
+        trusted entry is the Nth from the right; anything left of it is whatever
+        the client sent and would give it a fresh bucket per request. With fewer
+        hops than expected (or none trusted), the socket peer is used.
+        """
+        hops = [hop.strip() for hop in (forwarded_for or '').split(',') if hop.strip()]
+        if self.trusted_proxies <= 0 or len(hops) < self.trusted_proxies:
+            return peer or ''
+        return hops[-self.trusted_proxies]
+
+    def hit(self, name, key, cost=1):
+        """Spend `cost` tokens; return (allowed, retry_after_seconds)."""
+        if not key:
+            return True, 0.0
+        requests, per_seconds = self.limits[name]
+        try:
+            allowed, retry_after = self.backend.take(f'{name}:{key}', float(requests),
+                                                     requests / float(per_seconds), cost, self._clock())
+        except Exception as e:
+            logger.warning(f"Rate limiter backend error ({name}): {e}")
+            return True, 0.0
+        counts = self.stats_counts.setdefault(name, [0, 0])
+        counts[0 if allowed else 1] += 1
+        return allowed, retry_after
+
+    def limited(self, name, key, cost=1) -> bool:
+        return not self.hit(name, key, cost)[0]
+
+    def stats(self) -> dict:
+        return {'backend': type(self.backend).__name__, 'keys': len(self.backend),
+                'limits': {name: list(limit) for name, limit in self.limits.items()},
+                'allowed_denied': {name: list(counts) for name, counts in self.stats_counts.items()}}
+
+
+rate_limiter = RateLimiter()
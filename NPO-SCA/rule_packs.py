@@ -0,0 +1,162 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import func, or_
+
+from models import db, Letter, ModerationRulePack
+from moderation import BUILTIN_RULE_VERSION, parse_rules
+
+logger = logging.getLogger(__name__)
+
+
+def latest_rule_version() -> int:
+    """Highest published rule pack version (the built-in list when none is published)."""
+    version = db.session.query(func.max(ModerationRulePack.version)).scalar()
+    return max(version or 0, BUILTIN_RULE_VERSION)
+
+
+def publish_rule_pack(data, note=None) -> ModerationRulePack:
+    """Validate and store `data` ({category: [keywords]}) as the next rule pack version."""
+    rules = parse_rules(data)
+    pack = ModerationRulePack(version=latest_rule_version() + 1,
+                              rules=json.dumps({c: list(kws) for c, kws in rules.items()}, ensure_ascii=False),
+                              note=note)
+    db.session.add(pack)
+    db.session.commit()
+    return pack
+
+
+def load_latest_rule_pack(moderator) -> bool:
+    """Swap the newest published pack into `moderator`; True when the rules changed."""
+    version = latest_rule_version()
+    if version <= moderator.keyword_version:
+        return False
+    pack = ModerationRulePack.query.filter_by(version=version).first()
+    try:
+        rules = parse_rules(json.loads(pack.rules))
+    except ValueError as e:
+        logger.error(f"Rule pack v{version} is invalid, keeping v{moderator.keyword_version}: {e}")
+        return False
+    moderator.set_keywords(rules, version=version)
+    logger.info(f"Moderation rules v{version} loaded ({len(moderator.keywords)} keywords)")
+    return True
+
+
+def rescan_stale_letters(moderator, batch_size=200, pause=0.0, max_batches=None) -> dict:
+    """Re-run the keyword scan on letters last scanned with an older rule version.
+
+    Works in batches through the moderation_rule_version index, committing each
+    one; letters still waiting for the background queue are left to it. Like
+    `flask remoderate`, flags are only ever added. Stops early if the rules
+    change underneath it (the next run picks up from there).
+    """
+    version = moderator.keyword_version
+    totals = {'version': version, 'scanned': 0, 'flagged': 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = (db.session.query(Letter.id, Letter.content, Letter.is_flagged)
+                .filter(Letter.moderation_rule_version < version)
+                .filter(or_(Letter.moderation_status.is_(None), Letter.moderation_status != 'pending'))
+                .order_by(Letter.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        for letter_id, content, is_flagged in rows:
+            flagged, kw = moderator.deterministic_match(content or '')
+            if flagged and not is_flagged:
+                # Through the ORM (not a bulk update) so the nav-badge counters follow
+                letter = db.session.get(Letter, letter_id)
+                letter.is_flagged = True
+                letter.moderation_reason = f"keyword: {kw}"
+                totals['flagged'] += 1
+        (Letter.query.filter(Letter.id.in_([row[0] for row in rows]))
+         .update({'moderation_rule_version': version}, synchronize_session=False))
+        db.session.commit()
+        totals['scanned'] += len(rows)
+        batches += 1
+        if moderator.keyword_version != version:
+            break
+        if pause:
+            time.sleep(pause)
+    return totals
+
+
+class RulePackWatcher:
+    """Polls for newly published rule packs and hot-swaps them into the moderator.
+
+    `check(spawn)` is cheap to call on every request: it queries at most once per
+    poll interval, and after a swap (or on the first check) starts one background
+    rescan of stale letters via `spawn(fn)`.
+    """
+
+    def __init__(self, moderator, poll_interval=30, batch_size=200, pause=0.05):
+        self.moderator = moderator
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._app = None
+        self._next_check = 0.0
+        self._rescanned_version = None
+        self._rescanning = False
+        self._lock = threading.Lock()
+        self.last_rescan = None
+
+    def init_app(self, app):
+        self._app = app
+        self.poll_interval = app.config.get('MODERATION_RULES_POLL_SECONDS', self.poll_interval)
+        self.batch_size = app.config.get('MODERATION_RESCAN_BATCH', self.batch_size)
+        app.extensions['rule_pack_watcher'] = self
+
+    def check(self, spawn=None):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.poll_interval
+        try:
+            load_latest_rule_pack(self.moderator)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Rule pack check failed: {e}")
+            return
+        if spawn is not None and self._rescanned_version != self.moderator.keyword_version:
+            self._start_rescan(spawn)
+
+    def _start_rescan(self, spawn):
+        with self._lock:
+            if self._rescanning:
+                return
+            self._rescanning = True
+        spawn(self._run_rescan)
+
+    def _run_rescan(self):
+        try:
+            with self._app.app_context():
+                totals = rescan_stale_letters(self.moderator, self.batch_size, self.pause)
+            self.last_rescan = totals
+            self._rescanned_version = totals['version']
+            if totals['scanned']:
+                logger.info(f"Rule rescan v{totals['version']}: {totals['scanned']} letters, "
+                            f"{totals['flagged']} newly flagged")
+        except Exception as e:
+            logger.error(f"Rule rescan failed: {e}")
+        finally:
+            with self._lock:
+                self._rescanning = False
+
+    def stats(self) -> dict:
+        return {'version': self.moderator.keyword_version, 'rescanning': self._rescanning,
+                'last_rescan': self.last_rescan}
@@ -0,0 +1,223 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class SenderWindow:
+    """Sliding-window letter counts per anonymous sender, in hourly buckets.
+
+    Each letter bumps its sender's count in the current hour's bucket and in a
+    running total; buckets older than `window_hours` are subtracted as they
+    expire. Senders at or above `threshold` are tracked in a separate set, so
+    listing them reads only those senders, never the whole window.
+
+    The letter table is the source of truth: `sync` adds letters with ids above
+    the last one counted, at most every `sync_interval` seconds, so each process
+    sees the letters every worker accepted. Snapshots (one file per process next
+    to `snapshot_path`) only save the initial rebuild after a restart; without a
+    usable one the window is rebuilt from the last `window_hours` of letters.
+    """
+
+    def __init__(self, window_hours=24, threshold=10, snapshot_path=None, snapshot_interval=60,
+                 sync_interval=15, clock=time.time):
+        self.window_hours = window_hours
+        self.threshold = threshold
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.sync_interval = sync_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = deque()   # (hour, {anon_id: count}), oldest first
+        self._totals = {}         # anon_id -> letters in the window
+        self._over = set()        # anon_ids with totals >= threshold
+        self._next_snapshot = 0.0
+        self._last_id = 0         # highest letter id counted
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+        self.warmed = False
+
+    def init_app(self, app):
+        self.window_hours = app.config.get('SUSPICIOUS_SENDER_WINDOW_HOURS', self.window_hours)
+        self.threshold = app.config.get('SUSPICIOUS_SENDER_THRESHOLD', self.threshold)
+        self.snapshot_interval = app.config.get('SUSPICIOUS_SENDER_SNAPSHOT_SECONDS', self.snapshot_interval)
+        self.sync_interval = app.config.get('SUSPICIOUS_SENDER_SYNC_SECONDS', self.sync_interval)
+        self.snapshot_path = (app.config.get('SUSPICIOUS_SENDER_SNAPSHOT')
+                              or os.path.join(app.instance_path, 'sender_window.json'))
+        atexit.register(self.save_snapshot, True)
+        app.extensions['sender_window'] = self
+
+    def _track(self, anon_id, delta):
+        total = self._totals.get(anon_id, 0) + delta
+        if total > 0:
+            self._totals[anon_id] = total
+        else:
+            self._totals.pop(anon_id, None)
+        if total >= self.threshold:
+            self._over.add(anon_id)
+        else:
+            self._over.discard(anon_id)
+
+    def add(self, anon_id, ts=None):
+        if not anon_id:
+            return
+        ts = self._clock() if ts is None else ts
+        hour = int(ts // 3600)
+        with self._lock:
+            self._expire(self._clock())
+            if hour <= self._oldest_live_hour(self._clock()):
+                return
+            if self._buckets and self._buckets[-1][0] == hour:
+                bucket = self._buckets[-1][1]
+            elif not self._buckets or self._buckets[-1][0] < hour:
+                bucket = {}
+                self._buckets.append((hour, bucket))
+            else:
+                # Late arrival (warming out of order): find its bucket
+                bucket = next((b for h, b in self._buckets if h == hour), None)
+                if bucket is None:
+                    return
+            bucket[anon_id] = bucket.get(anon_id, 0) + 1
+            self._track(anon_id, 1)
+
+    def sync(self, load_rows, force=False):
+        """Count letters written since the last sync (by any process).
+
+        `load_rows(after_id, since_ts)` returns (letter_id, anon_id, created_ts)
+        for letters with a higher id created after `since_ts`, in id order. The
+        first sync restores the freshest snapshot, then catches up from its last
+        id; later ones run at most every `sync_interval` seconds unless forced.
+        """
+        if self.warmed and not force and time.monotonic() < self._next_sync:
+            return
+        with self._sync_lock:
+            if self.warmed and not force and time.monotonic() < self._next_sync:
+                return
+            if not self.warmed:
+                self.load_snapshot(max_age=self.window_hours * 3600)
+            rows = load_rows(self._last_id, self._clock() - self.window_hours * 3600)
+            for letter_id, anon_id, ts in rows:
+                self.add(anon_id, ts)
+                self._last_id = max(self._last_id, letter_id)
+            self.warmed = True
+            self._next_sync = time.monotonic() + self.sync_interval
+        if rows:
+            self.save_snapshot()
+
+    def _oldest_live_hour(self, now):
+        return int(now // 3600) - self.window_hours
+
+    def _expire(self, now):
+        cutoff = self._oldest_live_hour(now)
+        while self._buckets and self._buckets[0][0] <= cutoff:
+            _, bucket = self._buckets.popleft()
+            for anon_id, count in bucket.items():
+                self._track(anon_id, -count)
+
+    def top(self, k=20, threshold=None) -> list[dict]:
+        """Senders with at least `threshold` letters in the window, most first."""
+        with self._lock:
+            self._expire(self._clock())
+            if threshold is None or threshold >= self.threshold:
+                candidates = self._over
+            else:
+                candidates = self._totals
+            rows = [(self._totals[a], a) for a in candidates
+                    if self._totals[a] >= (self.threshold if threshold is None else threshold)]
+        rows.sort(key=lambda r: (-r[0], r[1]))
+        return [{'anon_id': anon_id, 'count': count} for count, anon_id in rows[:k]]
+
+    def _own_snapshot_path(self):
+        root, ext = os.path.splitext(self.snapshot_path)
+        return f'{root}.{os.getpid()}{ext}'
+
+    def save_snapshot(self, force=False):
+        """Write this process's snapshot (at most once per snapshot_interval unless forced)."""
+        # Never replace a good snapshot with a window that was never loaded
+        if not self.snapshot_path or not self.warmed:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now < self._next_snapshot:
+                return
+            self._next_snapshot = now + self.snapshot_interval
+            data = {'saved_at': self._clock(), 'window_hours': self.window_hours, 'last_id': self._last_id,
+                    'buckets': [[hour, dict(bucket)] for hour, bucket in self._buckets]}
+        path = self._own_snapshot_path()
+        tmp = f'{path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Sender window snapshot not saved: {e}")
+
+    def _read_snapshot(self, path, max_age):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            saved_at = float(data['saved_at'])
+            if max_age is not None and self._clock() - saved_at > max_age:
+                # Left by a process long gone: nothing in it is still in the window
+                os.remove(path)
+                return None
+            buckets = [(int(hour), {str(a): int(c) for a, c in bucket.items()})
+                       for hour, bucket in data['buckets']]
+            return int(data.get('last_id') or 0), saved_at, buckets
+        except (OSError, TypeError, ValueError, KeyError, AttributeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Sender window snapshot {path} ignored: {e}")
+            return None
+
+    def load_snapshot(self, max_age=None):
+        """Restore the most complete snapshot any process left next to `snapshot_path`.
+
+        Every snapshot is the letter table up to its `last_id`, so the one with the
+        highest id wins. Returns its save time, or None if none is usable (missing,
+        unreadable or older than `max_age` seconds).
+        """
+        if not self.snapshot_path:
+            return None
+        root, ext = os.path.splitext(self.snapshot_path)
+        snapshots = [snap for snap in (self._read_snapshot(path, max_age)
+                                       for path in glob.glob(f'{glob.escape(root)}.*{ext}'))
+                     if snap is not None]
+        if not snapshots:
+            return None
+        last_id, saved_at, buckets = max(snapshots, key=lambda snap: (snap[0], snap[1]))
+        with self._lock:
+            self._buckets.clear()
+            self._totals.clear()
+            self._over.clear()
+            for hour, bucket in sorted(buckets):
+                self._buckets.append((hour, bucket))
+                for anon_id, count in bucket.items():
+                    self._track(anon_id, count)
+            self._expire(self._clock())
+            self._last_id = last_id
+        return saved_at
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'senders': len(self._totals), 'over_threshold': len(self._over),
+                    'buckets': len(self._buckets), 'threshold': self.threshold, 'last_id': self._last_id}
+
+
+sender_window = SenderWindow()
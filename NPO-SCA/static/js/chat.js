@@ -694,13 +694,11 @@ function sendMessage() {
     messageInput.value = '';
     autoResizeTextarea(messageInput);
 
-    // Show typing indicator
+    // Show typing indicator; tokens replace it as soon as they stream in
     addTypingIndicator();
 
     // Process AI response based on mode
-    setTimeout(() => {
-        processAIResponse(message);
-    }, 1000);
+    processAIResponse(message);
 }
 
 function addMessage(sender, content, extraClass = '') {
@@ -766,19 +764,36 @@ function removeTypingIndicator() {
 }
 
 async function processAIResponse(userMessage) {
+    const extraClass = chatMode === 'customer-service' ? 'customer-service-message' : 'companion-message';
+    let streamedContent = null;
+
+    // Render streamed tokens into a single AI message as they arrive
+    const onDelta = (text) => {
+        if (!streamedContent) {
+            removeTypingIndicator();
+            addMessage('ai', '', extraClass);
+            streamedContent = chatMessages.lastElementChild.querySelector('p');
+        }
+        streamedContent.textContent += text;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    };
+
     try {
         let responseData;
 
         if (chatMode === 'customer-service') {
-            responseData = await getCustomerServiceResponse(userMessage);
+            responseData = await getCustomerServiceResponse(userMessage, onDelta);
         } else if (chatMode === 'companion') {
-            responseData = await getCompanionResponse(userMessage);
+            responseData = await getCompanionResponse(userMessage, onDelta);
         }
 
         removeTypingIndicator();
 
+        if (streamedContent) {
+            return;
+        }
+
         if (responseData && responseData.message) {
-            const extraClass = chatMode === 'customer-service' ? 'customer-service-message' : 'companion-message';
             addMessage('ai', responseData.message, extraClass);
         } else {
             addMessage('ai', "I'm sorry, I'm having trouble responding right now. Please try again in a moment.");
@@ -791,15 +806,63 @@ async function processAIResponse(userMessage) {
     }
 }
 
-async function getCustomerServiceResponse(message) {
-    return await fetchAIResponse(message, 'practical');
+async function getCustomerServiceResponse(message, onDelta) {
+    return await fetchAIResponse(message, 'practical', onDelta);
 }
 
-async function getCompanionResponse(message) {
-    return await fetchAIResponse(message, 'supportive');
+async function getCompanionResponse(message, onDelta) {
+    return await fetchAIResponse(message, 'supportive', onDelta);
+}
+
+// Read the Server-Sent Events stream from /api/chat, calling onDelta per chunk
+async function readChatStream(body, onDelta) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let message = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+
+            if (event === 'done') {
+                return { message };
+            }
+            if (!data) continue;
+
+            try {
+                const parsed = JSON.parse(data);
+                if (parsed.delta) {
+                    message += parsed.delta;
+                    onDelta(parsed.delta);
+                }
+            } catch (parseError) {
+                console.warn('Skipping malformed chat stream frame:', parseError);
+            }
+        }
+    }
+    return { message };
 }
 
-async function fetchAIResponse(prompt, type) {
+async function fetchAIResponse(prompt, type, onDelta) {
+    // Stream tokens when the browser can read response bodies incrementally
+    const canStream = Boolean(onDelta && window.ReadableStream && window.TextDecoder);
     try {
         const response = await fetch('/api/chat', {
             method: 'POST',
@@ -808,14 +871,22 @@ async function fetchAIResponse(prompt, type) {
             },
             body: JSON.stringify({
                 message: prompt,
-                type: type
+                type: type,
+                stream: canStream
             })
         });
 
-        if (!response.ok) {
+        // 429 carries a friendly "slow down" message in the JSON body
+        if (!response.ok && response.status !== 429) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
+        // The server answers with plain JSON when AI is unavailable, even if we asked to stream
+        const contentType = response.headers.get('Content-Type') || '';
+        if (canStream && response.body && contentType.includes('text/event-stream')) {
+            return await readChatStream(response.body, onDelta);
+        }
+
         const data = await response.json();
         return data;
 
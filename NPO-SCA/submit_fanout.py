@@ -0,0 +1,54 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+import logging
+import time
+from concurrent.futures import wait
+
+logger = logging.getLogger(__name__)
+
+
+def gather_submit_calls(captcha, calls: dict, deadline: float) -> dict:
+    """Wait for submit()'s outbound calls together, until one shared deadline.
+
+    `captcha` is the in-flight siteverify future (None when reCAPTCHA is off) and
+    `calls` maps names ('moderation', 'title') to the AI futures running beside it.
+    Returns {'captcha': None | 'failed' | 'error'} plus the result of every call
+    that finished in time, and 'late': the calls still running at the deadline
+    (their results can be stored once they arrive, without calling again). A
+    captcha that fails, errors or misses the deadline discards all AI results.
+    """
+    pending = list(calls.values()) + ([captcha] if captcha is not None else [])
+    if pending:
+        wait(pending, timeout=max(0.0, deadline - time.monotonic()))
+
+    result = {'captcha': None}
+    if captcha is not None:
+        if not captcha.done():
+            logger.warning('reCAPTCHA v2 verification timed out')
+            result['captcha'] = 'error'
+        elif captcha.exception() is not None:
+            logger.warning(f'reCAPTCHA v2 verification error: {captcha.exception()}')
+            result['captcha'] = 'error'
+        elif not captcha.result():
+            result['captcha'] = 'failed'
+    if result['captcha'] is not None:
+        for future in pending:
+            future.cancel()
+        return result
+    result['late'] = {}
+    for name, future in calls.items():
+        if not future.done():
+            result['late'][name] = future
+        elif future.exception() is not None:
+            logger.warning(f"Submit {name} call failed: {future.exception()}")
+        else:
+            result[name] = future.result()
+    return result
@@ -0,0 +1,35 @@
+"""Tests for the LRU+TTL cache helpers"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from caching import LRUTTLCache, content_hash
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = LRUTTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' becomes most recently used
+    cache.set('c', 3)           # evicts 'b'
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUTTLCache(maxsize=4, ttl=0.01)
+    cache.set('k', 'v')
+    time.sleep(0.02)
+    assert cache.get('k') is None
+    cache.set('k', 'v', ttl=60)
+    assert cache.get('k') == 'v'
+
+
+def test_content_hash_ignores_whitespace_runs():
+    assert content_hash('I  feel\nsad ') == content_hash('I feel sad')
+    assert content_hash('I feel sad') != content_hash('I feel sad!')
@@ -0,0 +1,446 @@
+"""Tests for the shared Gemini client (no network; uses httpx.MockTransport)"""
+
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import pytest
+from flask import Flask
+
+from gemini_client import (GeminiClient, GeminiError, SingleFlight, CircuitBreaker,
+                           CircuitOpenError, PriorityScheduler, AIOverloadedError,
+                           DEFAULT_AI_CLASSES, call_class, candidate_text)
+
+
+def _reply(text):
+    return {'candidates': [{'content': {'parts': [{'text': text}]}}]}
+
+
+def make_client(handler, **config):
+    client = GeminiClient()
+    client._config = {'GEMINI_API_KEY': 'test-key', **config}
+    client.retry_backoff = 0
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_generate_content_reuses_pooled_client():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=_reply('hello'))
+
+    client = make_client(handler)
+    pooled = client._http()
+    assert candidate_text(client.generate_content({'contents': []})) == 'hello'
+    assert candidate_text(client.generate_content({'contents': []})) == 'hello'
+    assert client._http() is pooled
+    assert len(seen) == 2
+    assert seen[0].headers['x-goog-api-key'] == 'test-key'
+    assert 'key=' not in str(seen[0].url)
+
+
+def test_retryable_status_is_retried_once():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            return httpx.Response(503, text='busy')
+        return httpx.Response(200, json=_reply('ok'))
+
+    client = make_client(handler)
+    assert candidate_text(client.generate_content({})) == 'ok'
+    assert len(calls) == 2
+
+
+def test_non_retryable_status_raises():
+    client = make_client(lambda request: httpx.Response(400, text='bad request'))
+    with pytest.raises(GeminiError) as exc:
+        client.generate_content({})
+    assert exc.value.status_code == 400
+
+
+def test_missing_key_raises(monkeypatch):
+    client = make_client(lambda request: httpx.Response(200, json=_reply('x')))
+    client._config = {}
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    assert not client.available
+    with pytest.raises(GeminiError):
+        client.generate_content({})
+
+
+def test_candidate_text_handles_unexpected_shapes():
+    assert candidate_text({}) == ''
+    assert candidate_text({'candidates': []}) == ''
+    assert candidate_text(_reply('a')) == 'a'
+
+
+def test_stream_generate_content_yields_sse_chunks():
+    body = (
+        'data: {"candidates": [{"content": {"parts": [{"text": "Hel"}]}}]}\r\n\r\n'
+        'data: {"candidates": [{"content": {"parts": [{"text": "lo"}]}}]}\r\n\r\n'
+    )
+
+    def handler(request):
+        assert request.url.params['alt'] == 'sse'
+        assert request.url.path.endswith(':streamGenerateContent')
+        return httpx.Response(200, text=body, headers={'Content-Type': 'text/event-stream'})
+
+    client = make_client(handler)
+    assert list(client.stream_generate_content({})) == ['Hel', 'lo']
+
+
+def test_stream_error_status_raises_before_first_chunk():
+    client = make_client(lambda request: httpx.Response(500, text='boom'))
+    with pytest.raises(GeminiError):
+        list(client.stream_generate_content({}))
+
+
+def test_concurrent_identical_requests_share_one_upstream_call():
+    calls = []
+    gate = threading.Event()
+
+    def handler(request):
+        calls.append(request)
+        gate.wait(2)
+        return httpx.Response(200, json=_reply('shared'))
+
+    client = make_client(handler)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(
+        candidate_text(client.generate_content({'contents': [{'parts': [{'text': 'same'}]}]}))))
+        for _ in range(5)]
+    for w in workers:
+        w.start()
+    deadline = time.monotonic() + 5
+    while client._flights.coalesced < 4:
+        assert time.monotonic() < deadline, 'followers never joined the in-flight call'
+        time.sleep(0.01)
+    gate.set()
+    for w in workers:
+        w.join()
+    assert results == ['shared'] * 5
+    assert len(calls) == 1
+    assert client.stats()['coalesced_requests'] == 4
+
+
+def test_single_flight_propagates_errors_and_forgets_key():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.do('k', lambda: (_ for _ in ()).throw(ValueError('x')))
+    assert flights.do('k', lambda: 42) == 42
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_opens_after_repeated_failures_and_recovers_via_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window=10, min_calls=3, error_rate=0.5, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now = 31
+    assert breaker.allow()          # half-open probe
+    assert not breaker.allow()      # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 62
+    assert breaker.allow()
+    breaker.record_success(0.2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()['times_opened'] == 2
+
+
+class _Killed(BaseException):
+    """Stands in for eventlet.Timeout / GreenletExit: not an Exception, not an httpx error."""
+
+
+def test_interrupted_probe_reopens_the_circuit_instead_of_wedging_it():
+    clock = FakeClock()
+
+    def handler(request):
+        raise _Killed()
+
+    client = make_client(handler)
+    client.breaker = CircuitBreaker(window=10, min_calls=1, error_rate=0.5, reset_timeout=30, clock=clock)
+    client.breaker.record_failure()
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 31
+    with pytest.raises(_Killed):
+        client.generate_content({'probe': 1})
+    assert client.breaker.state == CircuitBreaker.OPEN    # the probe counted as a failure
+
+    clock.now = 62
+    client._client = httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(200, json=_reply('ok'))))
+    assert candidate_text(client.generate_content({'probe': 2})) == 'ok'
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_probe_is_abandoned_after_probe_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=30, probe_timeout=60, clock=clock)
+    breaker.record_failure()
+    clock.now = 31
+    assert breaker.allow()          # probe whose caller never reports back
+    clock.now = 90
+    assert not breaker.allow()
+    clock.now = 92
+    assert breaker.allow()          # given up on; a new probe goes out
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_skips_upstream_and_timeout_adapts():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(503, text='down')
+
+    client = make_client(handler)
+    client.max_retries = 0
+    client.breaker = CircuitBreaker(window=10, min_calls=2, error_rate=0.5, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(GeminiError):
+            client.generate_content({'n': _})
+    with pytest.raises(CircuitOpenError):
+        client.generate_content({'n': 'skipped'})
+    assert len(calls) == 2
+    assert client.stats()['circuit']['state'] == 'open'
+
+    fresh = make_client(lambda request: httpx.Response(200, json=_reply('ok')))
+    assert fresh.current_timeout() == fresh.timeout
+    for latency in (0.2, 0.3, 0.4):
+        fresh.breaker.record_success(latency)
+    assert fresh.current_timeout() == fresh.min_timeout
+
+
+def test_timeout_recovers_when_latency_rises_after_the_window_fills():
+    upstream = {'latency': 4.0}
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions['timeout']['read'])
+        if request.extensions['timeout']['read'] < upstream['latency']:
+            raise httpx.ReadTimeout('slow', request=request)
+        return httpx.Response(200, json=_reply('ok'))
+
+    clock = FakeClock()
+    client = make_client(handler)
+    client.max_retries = 0
+    client.breaker = CircuitBreaker(window=10, min_calls=2, error_rate=0.5, reset_timeout=30, clock=clock)
+    for _ in range(10):
+        client.breaker.record_success(0.5)
+    assert client.current_timeout() == client.min_timeout
+
+    # The timed-out call is a latency sample, so the next one waits long enough
+    with pytest.raises(GeminiError):
+        client.generate_content({'n': 1})
+    assert candidate_text(client.generate_content({'n': 2})) == 'ok'
+    assert seen == [3.0, 9.0]
+
+    # Fast 4xx replies are not latency samples
+    client._client = httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(400, text='bad')))
+    for _ in range(10):
+        with pytest.raises(GeminiError):
+            client.generate_content({'bad': _})
+    assert client.current_timeout() == 9.0
+
+    # Once tripped, the probe gets the full timeout, not one fitted to the old samples
+    upstream['latency'] = 12.0
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    for _ in range(10):
+        client.breaker.record_success(0.5)
+    while client.breaker.state == CircuitBreaker.CLOSED:
+        client.breaker.record_failure()
+    clock.now = 31
+    assert candidate_text(client.generate_content({'probe': 1})) == 'ok'
+    assert seen[-1] == client.timeout
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_usage_metadata_is_tracked_per_call_type():
+    def handler(request):
+        body = _reply('ok')
+        body['usageMetadata'] = {'promptTokenCount': 120, 'cachedContentTokenCount': 100,
+                                 'candidatesTokenCount': 8}
+        return httpx.Response(200, json=body)
+
+    client = make_client(handler)
+    client.generate_content({'contents': [1]}, call_type='moderation')
+    client.generate_content({'contents': [2]}, call_type='moderation')
+    usage = client.stats()['usage']['moderation']
+    assert usage['calls'] == 2
+    assert usage['prompt_tokens'] == 240
+    assert usage['avg_cached_tokens'] == 100
+
+
+def test_context_cache_swaps_system_instruction_and_falls_back_inline():
+    sent = []
+
+    def handler(request):
+        if request.url.path.endswith('/cachedContents'):
+            return httpx.Response(200, json={'name': 'cachedContents/abc'})
+        body = json.loads(request.content)
+        sent.append(body)
+        if 'cachedContent' in body and len(sent) > 1:
+            return httpx.Response(404, text='cache expired')
+        return httpx.Response(200, json=_reply('ok'))
+
+    client = make_client(handler)
+    client.context_cache = True
+    system = {'parts': [{'text': 'persona'}]}
+    client.generate_content({'systemInstruction': system, 'contents': [1]})
+    assert sent[0]['cachedContent'] == 'cachedContents/abc'
+    assert 'systemInstruction' not in sent[0]
+
+    client.generate_content({'systemInstruction': system, 'contents': [2]})
+    assert sent[-1]['systemInstruction'] == system
+    assert 'cachedContent' not in sent[-1]
+
+
+def test_scheduler_grants_free_slots_by_priority():
+    scheduler = PriorityScheduler(total=1)
+    scheduler.acquire('coach')
+    order = []
+
+    def call(name):
+        with scheduler.slot(name):
+            order.append(name)
+
+    threads = []
+    for name in ('title', 'coach', 'chat'):
+        threads.append(threading.Thread(target=call, args=(name,)))
+        threads[-1].start()
+        while scheduler.stats()['classes'][name]['waiting'] == 0:
+            time.sleep(0.005)
+    scheduler.release('coach')
+    for t in threads:
+        t.join()
+    assert order == ['chat', 'coach', 'title']
+
+
+def test_scheduler_sheds_low_priority_work_first():
+    scheduler = PriorityScheduler({'chat': (0, 4, 4, 5), 'coach': (3, 1, 0, 0.05), 'draft': (2, 1, 1, 5)}, total=4)
+    scheduler.acquire('coach')
+    with pytest.raises(AIOverloadedError):
+        scheduler.acquire('coach')          # coach is at its cap and has no queue
+    with scheduler.slot('chat'):
+        pass                                # chat still gets a slot
+    assert scheduler.stats()['classes']['coach']['shed'] == 1
+    assert call_class('chat_supportive') == 'chat'
+    assert call_class('coach_reply') == 'coach'
+    assert call_class('volunteer_draft') == 'draft'
+
+
+def test_malformed_scheduler_classes_fall_back_to_defaults():
+    app = Flask(__name__)
+    client = GeminiClient()
+    for raw in ('{"coach": [3, 1', '{"coach": [3, 1]}', '{"coach": "slow"}'):
+        app.config['AI_SCHEDULER_CLASSES'] = raw
+        client.init_app(app)
+        assert client.scheduler.stats()['classes']['coach']['priority'] == DEFAULT_AI_CLASSES['coach'][0], raw
+    app.config['AI_SCHEDULER_CLASSES'] = '{"coach": [5, 1, 0, 1]}'
+    client.init_app(app)
+    assert client.scheduler.stats()['classes']['coach']['priority'] == 5
+
+
+def test_shed_call_never_reaches_upstream():
+    calls = []
+    client = make_client(lambda request: calls.append(1) or httpx.Response(200, json=_reply('x')))
+    client.scheduler = PriorityScheduler({'coach': (3, 1, 0, 0), 'draft': (2, 1, 0, 0)}, total=1)
+    client.scheduler.acquire('coach')
+    with pytest.raises(AIOverloadedError):
+        client.generate_content({'contents': []}, call_type='coach_write')
+    assert calls == []
+
+
+def _use_async_transport(client, handler):
+    client._aclient = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._aclient_loop = asyncio.get_running_loop()
+
+
+def test_async_generate_coalesces_and_records_usage():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={**_reply('hi'), 'usageMetadata': {'totalTokenCount': 3}})
+
+    client = make_client(lambda r: httpx.Response(500))
+
+    async def run():
+        _use_async_transport(client, handler)
+        results = await asyncio.gather(*(client.agenerate_content({'contents': ['x']}, call_type='chat')
+                                         for _ in range(5)))
+        await client.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert [candidate_text(r) for r in results] == ['hi'] * 5
+    assert len(calls) == 1
+    assert client.usage()['chat']['calls'] == 1
+    assert client.scheduler.stats()['classes']['chat']['active'] == 0
+
+
+def test_async_stream_yields_chunks_and_releases_slot():
+    body = ''.join(f"data: {json.dumps(_reply(t))}\r\n\r\n" for t in ('Hel', 'lo'))
+    client = make_client(lambda r: httpx.Response(500))
+
+    async def run():
+        _use_async_transport(client, lambda r: httpx.Response(200, text=body))
+        return [chunk async for chunk in client.astream_generate_content({}, call_type='chat_stream')]
+
+    assert asyncio.run(run()) == ['Hel', 'lo']
+    assert client.scheduler.stats()['classes']['chat']['active'] == 0
+
+
+def test_cancelled_async_probe_reopens_the_circuit():
+    clock = FakeClock()
+    client = make_client(lambda r: httpx.Response(500))
+    client.breaker = CircuitBreaker(window=10, min_calls=1, error_rate=0.5, reset_timeout=30, clock=clock)
+
+    async def run(call):
+        started = asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200, json=_reply('late'))
+
+        _use_async_transport(client, handler)
+        client.breaker.record_failure()
+        clock.now += 31                        # half-open: this call is the probe
+        task = asyncio.ensure_future(call())
+        await started.wait()
+        task.cancel()                          # SSE client went away mid-request
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.aclose()
+
+    async def stream():
+        return [chunk async for chunk in client.astream_generate_content({}, call_type='chat_stream')]
+
+    for call in (lambda: client.agenerate_content({'n': 1}, call_type='chat'), stream):
+        asyncio.run(run(call))
+        assert client.breaker.state == CircuitBreaker.OPEN
+        assert client.scheduler.stats()['classes']['chat']['active'] == 0
@@ -0,0 +1,57 @@
+"""Tests for the indexed content hash behind the exact-duplicate letter check"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import hashlib
+
+from flask import Flask
+from sqlalchemy import inspect
+
+from models import db, Letter
+
+
+def test_content_hash_tracks_content_and_is_indexed(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'letters.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        letter = Letter(content='Hello there', anon_user_id='a1')
+        db.session.add(letter)
+        db.session.commit()
+        assert letter.content_sha256 == hashlib.sha256(b'Hello there').hexdigest()
+
+        letter.content = 'Hello again'
+        db.session.commit()
+        assert letter.content_sha256 == Letter.hash_content('Hello again')
+
+        match = (Letter.query.filter_by(anon_user_id='a1', content_sha256=Letter.hash_content('Hello again'))
+                 .first())
+        assert match is letter
+        indexes = {ix['name']: ix['column_names'] for ix in inspect(db.engine).get_indexes('letter')}
+        assert indexes['ix_letter_anon_content_created'] == ['anon_user_id', 'content_sha256', 'created_at']
+
+
+def test_content_hash_is_only_recomputed_when_content_changes(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'letters.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        letter = Letter(content='Hello there', anon_user_id='a1')
+        db.session.add(letter)
+        db.session.commit()
+
+        hashed = []
+        original = Letter.hash_content
+        monkeypatch.setattr(Letter, 'hash_content', staticmethod(lambda content: hashed.append(content) or original(content)))
+        letter.is_flagged = True
+        letter.unread_reply_count = 3
+        db.session.commit()
+        assert hashed == []
+
+        letter.content_sha256 = None
+        db.session.commit()
+        assert hashed == ['Hello there'] and letter.content_sha256 == original('Hello there')
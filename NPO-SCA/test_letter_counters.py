@@ -0,0 +1,77 @@
+"""Tests for the maintained flagged/unprocessed letter counters"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from cli_commands import register_commands
+from models import db, Letter, LetterCounter
+
+
+def _stored():
+    return {row.name: row.value for row in LetterCounter.query.all()}
+
+
+def test_counters_follow_letter_writes_and_match_a_recount(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'letters.db'}"
+    db.init_app(app)
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        assert LetterCounter.values() == {'flagged': 0, 'unprocessed': 0}
+
+        letters = []
+        for i in range(40):
+            letter = Letter(content=f'letter {i}', is_flagged=rng.random() < 0.3,
+                            moderation_status=rng.choice([None, 'pending', 'done']))
+            db.session.add(letter)
+            letters.append(letter)
+        db.session.commit()
+        assert _stored() == LetterCounter.recount()
+
+        # Updates on expired instances (after commit) still see the old values
+        for _ in range(60):
+            letter = rng.choice(letters)
+            field = rng.choice(['is_flagged', 'is_processed', 'moderation_status'])
+            setattr(letter, field, rng.choice([None, 'pending', 'done']) if field == 'moderation_status'
+                    else rng.random() < 0.5)
+            db.session.commit()
+        expected = _stored()
+        assert LetterCounter.recount() == expected
+
+        db.session.delete(letters[0])
+        db.session.delete(letters[1])
+        db.session.commit()
+        expected = _stored()
+        assert LetterCounter.recount() == expected
+
+        # A rolled-back write leaves the counters untouched
+        letters[2].is_flagged = not letters[2].is_flagged
+        db.session.flush()
+        db.session.rollback()
+        assert _stored() == expected
+
+        # With the rows in place values() trusts them; rebuilding is recount()'s job
+        db.session.merge(LetterCounter(name='flagged', value=99))
+        db.session.commit()
+        assert LetterCounter.values()['flagged'] == 99
+
+
+def test_recount_letters_command_is_registered(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'letters.db'}"
+    db.init_app(app)
+    register_commands(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Letter(content='a', is_flagged=True), Letter(content='b')])
+        db.session.commit()
+        db.session.query(LetterCounter).delete()
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['recount-letters'])
+    assert result.exit_code == 0, result.output
+    assert 'flagged: 1' in result.output and 'unprocessed: 1' in result.output
@@ -0,0 +1,63 @@
+"""Tests for the dev/production logging profiles and per-logger sampling"""
+
+import io
+import logging
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from logging_setup import SamplingFilter, configure_logging
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    for name in ('echoe.test', 'echoe.test.child', 'werkzeug'):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def _record(name, level):
+    return logging.LogRecord(name, level, __file__, 1, 'msg', None, None)
+
+
+def test_sampling_filter_uses_nearest_configured_logger():
+    draws = iter([0.05, 0.5, 0.05, 0.5])
+    sampler = SamplingFilter({'app': 0.1, 'app.noisy': 0.0}, rng=lambda: next(draws))
+    assert sampler.filter(_record('app', logging.INFO))             # 0.05 < 0.1
+    assert not sampler.filter(_record('app.views', logging.INFO))   # 0.5, inherits 'app'
+    assert not sampler.filter(_record('app.noisy', logging.DEBUG))  # rate 0 drops everything
+    assert sampler.filter(_record('app.noisy', logging.WARNING))    # warnings always kept
+    assert sampler.filter(_record('other', logging.INFO))           # unconfigured: kept
+
+
+def test_production_profile_writes_through_queue_listener(restore_logging):
+    out = io.StringIO()
+    listener = configure_logging('production', levels={'echoe.test.child': 'WARNING'},
+                                 sampling={'echoe.test': 0.0}, stream=out)
+    try:
+        assert isinstance(logging.getLogger().handlers[0], logging.handlers.QueueHandler)
+        assert logging.getLogger('werkzeug').level == logging.WARNING
+        logging.getLogger('echoe.test').debug('below INFO')
+        logging.getLogger('echoe.test').info('sampled away')
+        logging.getLogger('echoe.test.child').info('below its WARNING level')
+        logging.getLogger('echoe.test').warning('kept')
+    finally:
+        listener.stop()
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 1 and lines[0].endswith('echoe.test - WARNING - kept')
+
+
+def test_dev_profile_logs_debug_synchronously(restore_logging):
+    out = io.StringIO()
+    assert configure_logging('dev', stream=out) is None
+    logging.getLogger('echoe.test').debug('visible')
+    assert 'DEBUG - visible' in out.getvalue()
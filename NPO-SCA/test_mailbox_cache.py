@@ -0,0 +1,72 @@
+"""Tests for the cached active-mailbox list and submit page fragment"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from mailbox_cache import MailboxCache
+import mailbox_cache as mailbox_cache_module
+from models import db, PhysicalMailbox
+
+
+def _mailbox(name, status='active'):
+    return PhysicalMailbox(name=name, address='1 Main St', city='Toronto', province='ON', status=status)
+
+
+def test_cache_is_read_through_and_dropped_on_mailbox_commits(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'mailboxes.db'}"
+    app.config['SHOW_PHYSICAL_MAILBOXES'] = True
+    db.init_app(app)
+    cache = MailboxCache(ttl=300)
+    cache.init_app(app)
+    monkeypatch.setattr(mailbox_cache_module, 'mailbox_cache', cache)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([_mailbox('Library'), _mailbox('Closed Cafe', status='inactive')])
+        db.session.commit()
+
+        selects = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: selects.append(statement)
+                     if 'WHERE physical_mailbox.status' in statement else None)
+        assert [box['name'] for box in cache.mailboxes()] == ['Library']
+        html = cache.offline_fragment()
+        assert 'Library' in html and 'Closed Cafe' not in html
+        assert cache.offline_fragment() is html
+        assert len(selects) == 1
+
+        db.session.add(_mailbox('Community Centre'))
+        db.session.commit()
+        assert [box['name'] for box in cache.mailboxes()] == ['Library', 'Community Centre']
+
+        box = PhysicalMailbox.query.filter_by(name='Library').first()
+        box.status = 'inactive'
+        db.session.commit()
+        assert 'Library' not in cache.offline_fragment()
+
+        # Rolled-back writes leave the cache alone
+        cache.mailboxes()
+        reads = len(selects)
+        box.status = 'active'
+        db.session.flush()
+        db.session.rollback()
+        cache.mailboxes()
+        assert len(selects) == reads
+
+
+def test_fragment_keeps_coming_soon_note_until_enabled(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'mailboxes.db'}"
+    db.init_app(app)
+    cache = MailboxCache()
+    cache.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(_mailbox('Library'))
+        db.session.commit()
+        html = cache.offline_fragment()
+    assert 'Coming soon' in html and 'Library' not in html
@@ -0,0 +1,80 @@
+"""Tests for keyword moderation and the verdict cache"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from moderation import KeywordMatcher, Moderator, normalize_for_moderation, verdict_key
+
+
+def test_normalizer_defeats_leetspeak_and_spacing():
+    simple, ascii_norm = normalize_for_moderation('S.u 1 c 1 d 3!!!')
+    assert simple == 'suicide'
+    assert ascii_norm == 'suicide'
+
+
+def test_normalizer_multilingual_and_astral_text():
+    assert normalize_for_moderation('Всё плохо!!! сууука') == ('всёплохосуука', '')
+    assert normalize_for_moderation('学校で疲れた、もう死にたい…') == ('学校で疲れた、もう死にたい…', '...')
+    # Emoji are dropped like punctuation; accents fold only in the ascii form
+    assert normalize_for_moderation('k1ll 😞😞😞 y0u 💔') == ('killyou', 'killyou')
+    assert normalize_for_moderation('Très   SEULE\n\tça') == ('trèsseuleça', 'tresseuleca')
+    assert normalize_for_moderation(None) == ('', '')
+
+
+def test_verdict_key_keeps_scripts_without_ascii_form():
+    assert verdict_key(*normalize_for_moderation('Café  au lait')) == 'cafeaulait'
+    assert verdict_key(*normalize_for_moderation('你好')) == '你好'
+
+
+def test_repeated_content_is_judged_once():
+    calls = []
+
+    def ai_check(text):
+        calls.append(text)
+        return False, 'fine'
+
+    mod = Moderator()
+    assert mod.moderate('Had a rough day at school', ai_check) == (False, 'fine')
+    assert mod.moderate('had a rough  day at school!', ai_check) == (False, 'fine')
+    assert len(calls) == 1
+    assert mod.moderate('I want to kill you', ai_check) == (True, 'keyword: killyou')
+    assert len(calls) == 1
+
+
+def test_ai_failures_are_not_cached():
+    answers = [None, (True, 'spam')]
+    mod = Moderator()
+    assert mod.moderate('buy followers now', lambda text: answers.pop(0)) == (False, '')
+    assert mod.moderate('buy followers now', lambda text: answers.pop(0)) == (True, 'spam')
+
+
+def test_keyword_change_invalidates_cached_verdicts():
+    mod = Moderator(keywords=['badword'])
+    assert mod.moderate('totally fine text', lambda text: (False, '')) == (False, '')
+    mod.set_keywords(['fine'])
+    assert mod.moderate('totally fine text', lambda text: (False, '')) == (True, 'keyword: fine')
+    assert mod.stats()['keyword_version'] == 2
+
+
+def test_keyword_matches_report_every_keyword_with_category():
+    mod = Moderator()
+    assert mod.keyword_matches('s.u.i.c.i.d.e, also: I will k1ll y0u') == [
+        ('suicide', 'self_harm'), ('suicid', 'self_harm'), ('killyou', 'violence')]
+    assert mod.keyword_matches('Мне сказали: сука') == [('сука', 'hate_profanity')]
+    assert mod.keyword_matches('a calm and ordinary day') == []
+
+
+def test_automaton_agrees_with_substring_scan():
+    keywords = ['he', 'she', 'his', 'hers', 'kill you', 'a.b']
+    matcher = KeywordMatcher(keywords)
+    # Keywords the normalizer would rewrite still need the raw-text scan
+    assert matcher.scan_raw
+    for text in ('ushers', 'I will KILL YOU', 'a.b', 'ab', 'h e r s', ''):
+        lower = text.lower()
+        haystacks = (lower,) + normalize_for_moderation(text)
+        expected = [kw for kw in keywords if any(kw in h for h in haystacks)]
+        assert [kw for kw, _ in matcher.find_all(text)] == expected, text
+        first = matcher.first_match(text)
+        assert (matcher.keywords[first] if first is not None else None) == (expected or [None])[0], text
+    assert not KeywordMatcher({'x': ['suicide', 'killyou']}).scan_raw
@@ -0,0 +1,49 @@
+"""Tests for the background moderation queue"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from moderation_queue import ModerationQueue
+
+
+def _spawn(fn):
+    threading.Thread(target=fn, daemon=True).start()
+
+
+def test_enqueued_letters_are_processed_in_background():
+    done = []
+    q = ModerationQueue(done.append, workers=2)
+    q.start(_spawn)
+    for letter_id in (1, 2, 3):
+        assert q.enqueue(letter_id)
+    q.join()
+    assert sorted(done) == [1, 2, 3]
+    assert q.stats['processed'] == 3
+
+
+def test_sweep_recovers_pending_letters_on_start():
+    done = []
+    q = ModerationQueue(done.append, sweep=lambda: [10, 11], workers=1)
+    q.start(_spawn)
+    q.start(_spawn)  # second start is a no-op
+    # The sweep runs on the worker thread: wait until it has queued both letters,
+    # otherwise join() may return before anything was enqueued
+    deadline = time.monotonic() + 5
+    while q.stats['enqueued'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    q.join()
+    assert sorted(done) == [10, 11]
+
+
+def test_full_queue_drops_and_failures_are_counted():
+    q = ModerationQueue(lambda letter_id: 1 / 0, maxsize=1)
+    assert q.enqueue(1)
+    assert q.enqueue(1)  # already queued
+    assert not q.enqueue(2)
+    assert q.stats['dropped'] == 1
+    q.start(_spawn)
+    q.join()
+    assert q.stats['failed'] == 1
@@ -0,0 +1,91 @@
+"""Tests for SimHash fingerprints and the banded near-duplicate index"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from near_duplicates import NearDuplicateIndex, from_db, hamming, simhash, to_db
+
+SPAM = ("Visit my channel for free followers and cheap likes, best deals on the internet, "
+        "click the link in my bio now and get a thousand followers today only!")
+LETTER = ("I have been feeling very lonely since I moved to a new school this year. Nobody talks "
+          "to me at lunch and I sit alone most days.")
+
+
+def test_simhash_ignores_obfuscation_and_separates_unrelated_text():
+    fp = simhash(SPAM)
+    assert simhash(SPAM.upper().replace(' ', '  ')) == fp
+    assert simhash(SPAM.replace('free', 'fr33')) == fp
+    assert hamming(fp, simhash(SPAM.replace('cheap', 'cheapest'))) <= 5
+    assert hamming(fp, simhash(LETTER)) > 15
+    assert simhash('') == 0
+    assert from_db(to_db(fp | 1 << 63)) == fp | 1 << 63
+    assert -(1 << 63) <= to_db(fp | 1 << 63) < 0
+
+
+def test_index_finds_close_fingerprints_only():
+    rng = random.Random(3)
+    index = NearDuplicateIndex(max_distance=5)
+    base = rng.getrandbits(64)
+    for letter_id in range(1, 2001):
+        index.add(letter_id, rng.getrandbits(64), anon_id='noise')
+    index.add(5000, base, anon_id='a')
+    index.add(5001, base ^ 0b111, anon_id='b')      # 3 bits: always shares a band
+    assert [m[:2] for m in index.find(base)] == [(5000, 0), (5001, 3)]
+    assert [m[0] for m in index.find(base, exclude_id=5000)] == [5001]
+    assert index.find(0) == []
+
+
+def test_window_eviction_updates_sender_counts():
+    now = [1000.0]
+    index = NearDuplicateIndex(window=60, clock=lambda: now[0])
+    fp = simhash(SPAM)
+    index.add(1, fp, anon_id='spammer')
+    now[0] += 30
+    index.add(2, fp, anon_id='spammer', near_duplicate=True)
+    index.add(3, fp, anon_id='spammer', near_duplicate=True)
+    assert index.near_duplicate_senders() == [{'anon_id': 'spammer', 'count': 3, 'near_duplicates': 2}]
+    now[0] += 45  # letter 1 leaves the window
+    assert [m[0] for m in index.find(fp)] == [2, 3]
+    assert index.near_duplicate_senders() == [{'anon_id': 'spammer', 'count': 2, 'near_duplicates': 2}]
+    now[0] += 60
+    assert index.near_duplicate_senders() == []
+    assert index.stats()['letters'] == 0
+
+
+def test_warm_marks_repeats_as_near_duplicates():
+    index = NearDuplicateIndex()
+    fp = simhash(LETTER)
+    index.warm([(1, fp, 'x', None), (2, fp, 'x', None), (3, simhash(SPAM), 'y', None)])
+    assert index.warmed
+    assert index.near_duplicate_senders(min_near=1) == [{'anon_id': 'x', 'count': 2, 'near_duplicates': 1}]
+
+
+def test_short_common_phrases_are_never_a_flood():
+    index = NearDuplicateIndex()
+    for phrase in ('I feel so alone', 'I want to die', 'I feel so alone.', 'i feel so alone!!'):
+        fp = simhash(phrase)
+        matches = index.find(fp)
+        assert not index.is_flood(phrase, matches, anon_id='same')
+        index.add(len(index._entries) + 1, fp, anon_id='same')
+    assert len(index.find(simhash('I feel so alone'))) >= 3
+
+
+def test_flood_needs_one_repeating_sender_or_many_senders():
+    index = NearDuplicateIndex(flood_threshold=3, flood_senders=5)
+    fp = simhash(SPAM)
+    for letter_id, sender in enumerate(['a', 'b', 'c', 'd'], start=1):
+        index.add(letter_id, fp, anon_id=sender)
+    matches = index.find(fp)
+    assert len(matches) == 4
+    assert not index.is_flood(SPAM, matches, anon_id='a')      # 1 copy from a, 4 senders
+    assert index.is_flood(SPAM, matches, anon_id='e')          # a fifth distinct sender
+
+    solo = NearDuplicateIndex(flood_threshold=3, flood_senders=5)
+    for letter_id in range(1, 3):
+        solo.add(letter_id, fp, anon_id='spammer')
+    assert not solo.is_flood(SPAM, solo.find(fp), anon_id='spammer')
+    solo.add(3, fp, anon_id='spammer')
+    assert solo.is_flood(SPAM, solo.find(fp), anon_id='spammer')
+    assert not solo.is_flood(SPAM, solo.find(fp), anon_id=None)
@@ -0,0 +1,118 @@
+"""Tests for the token-bucket rate limiter and its memory/SQLite backends"""
+
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from rate_limit import DEFAULT_LIMITS, MemoryBackend, RateLimiter, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = RateLimiter(limits={'chat': (3, 30)}, clock=clock)
+    assert [limiter.limited('chat', '1.2.3.4') for _ in range(4)] == [False, False, False, True]
+    assert not limiter.limited('chat', '5.6.7.8')       # separate key, separate bucket
+    allowed, retry_after = limiter.hit('chat', '1.2.3.4')
+    assert not allowed and 9 < retry_after <= 10        # one token per 10 seconds
+    clock.now += 10
+    assert not limiter.limited('chat', '1.2.3.4')
+    assert limiter.limited('chat', '1.2.3.4')
+    assert not limiter.limited('chat', '')               # no key, no limit
+    assert limiter.stats()['allowed_denied']['chat'] == [5, 3]
+
+
+def test_memory_backend_is_lru_bounded():
+    clock = FakeClock()
+    limiter = RateLimiter(MemoryBackend(max_keys=100), limits={'submit': (1, 60)}, clock=clock)
+    for i in range(1000):
+        limiter.limited('submit', f'10.0.{i // 256}.{i % 256}')
+    assert len(limiter.backend) == 100
+    assert limiter.limited('submit', '10.0.3.231')      # most recent key is still tracked
+    assert not limiter.limited('submit', '10.0.0.0')    # oldest was evicted (comes back full)
+
+
+def test_sqlite_backend_is_shared_between_limiters(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / 'buckets.sqlite3')
+    first = RateLimiter(SQLiteBackend(path), limits={'socket': (2, 10)}, clock=clock)
+    second = RateLimiter(SQLiteBackend(path), limits={'socket': (2, 10)}, clock=clock)
+    assert not first.limited('socket', 'ip')
+    assert not second.limited('socket', 'ip')
+    assert first.limited('socket', 'ip')
+    clock.now += 5
+    assert not second.limited('socket', 'ip')
+
+    backend = SQLiteBackend(path, max_keys=3, max_idle=60)
+    for i in range(10):
+        backend.take(f'k{i}', 1.0, 1.0, 1, clock.now + i)
+    backend.prune(clock.now + 10)
+    assert len(backend) == 3
+
+
+
+def test_sqlite_backend_shares_one_connection_across_threads(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'buckets.sqlite3'), prune_every=7)
+    conn = backend._db
+    results = []
+
+    def worker():
+        for _ in range(25):
+            results.append(backend.take('chat:ip', 100.0, 0.001, 1, 1000.0)[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(True) == 100
+    assert backend._checks == 200
+    assert backend._db is conn
+
+def test_backend_errors_fail_open():
+    class Broken:
+        def take(self, *args):
+            raise OSError('disk full')
+
+        def __len__(self):
+            return 0
+
+    limiter = RateLimiter(Broken(), limits={'chat': (1, 60)})
+    assert not limiter.limited('chat', 'ip')
+    assert not limiter.limited('chat', 'ip')
+
+
+def test_spoofed_forwarded_for_does_not_reset_the_bucket():
+    limiter = RateLimiter(limits={'chat': (3, 60)}, clock=FakeClock())
+    # The proxy appends the real peer; whatever the client sent sits to its left
+    spoofed = [limiter.client_ip(f'10.0.{i}.{i}, 203.0.113.7', '172.16.0.1') for i in range(4)]
+    assert set(spoofed) == {'203.0.113.7'}
+    assert [limiter.limited('chat', key) for key in spoofed] == [False, False, False, True]
+    assert limiter.stats()['keys'] == 1
+
+    assert limiter.client_ip(None, '172.16.0.1') == '172.16.0.1'        # reached directly
+    two_hops = RateLimiter(trusted_proxies=2)
+    assert two_hops.client_ip('1.2.3.4, 203.0.113.7, 10.0.0.2', '10.0.0.3') == '203.0.113.7'
+    assert RateLimiter(trusted_proxies=0).client_ip('1.2.3.4', '10.0.0.3') == '10.0.0.3'
+
+
+def test_malformed_rate_limits_fall_back_to_defaults():
+    app = Flask(__name__)
+    limiter = RateLimiter()
+    for raw in ('{"chat": [10, 60]', '{"chat": "fast"}', '[1, 2]', '{"chat": [0, 60]}'):
+        app.config['RATE_LIMITS'] = raw
+        limiter.init_app(app)
+        assert limiter.limits == DEFAULT_LIMITS, raw
+    app.config['RATE_LIMITS'] = '{"chat": [10, 60]}'
+    limiter.init_app(app)
+    assert limiter.limits['chat'] == (10, 60) and limiter.limits['submit'] == DEFAULT_LIMITS['submit']
@@ -0,0 +1,73 @@
+"""Tests for the `flask remoderate` CLI command"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask
+
+from models import db, Letter
+from moderation import moderator
+from cli_commands import remoderate
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'letters.db'}"
+    db.init_app(app)
+    app.cli.add_command(remoderate)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Letter(content='I had a calm week'),
+            Letter(content='I will kill you', is_processed=True),
+            Letter(content='buy cheap followers here'),
+            Letter(content='Just want to talk', moderation_checked=True),
+        ])
+        db.session.commit()
+    monkeypatch.setattr(moderator, 'ai_check',
+                        lambda text: (True, 'spam') if 'followers' in text else (False, ''))
+    moderator.invalidate()
+    return app
+
+
+def test_remoderate_flags_and_reports_throughput(app):
+    result = app.test_cli_runner().invoke(args=['remoderate', '--batch-size', '2', '--concurrency', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'letters/s' in result.output
+    with app.app_context():
+        letters = {l.content: l for l in Letter.query.all()}
+        assert letters['I will kill you'].is_flagged
+        assert letters['buy cheap followers here'].moderation_reason == 'spam'
+        assert not letters['I had a calm week'].is_flagged
+        assert all(l.moderation_checked for l in letters.values())
+    assert not os.path.exists(os.path.join(app.instance_path, 'remoderate.checkpoint.json'))
+
+
+def test_remoderate_resumes_from_checkpoint(app):
+    checkpoint = os.path.join(app.instance_path, 'remoderate.checkpoint.json')
+    with open(checkpoint, 'w') as f:
+        json.dump({'last_id': 2, 'processed': 2}, f)
+    result = app.test_cli_runner().invoke(args=['remoderate', '--unchecked-only'])
+    assert result.exit_code == 0, result.output
+    assert 'Resuming after letter id 2' in result.output
+    with app.app_context():
+        assert not db.session.get(Letter, 2).moderation_checked
+        assert db.session.get(Letter, 3).is_flagged
+
+
+def test_remoderate_keeps_the_reason_of_letters_that_stay_flagged(app):
+    with app.app_context():
+        db.session.add(Letter(content='Hello there, nice weather', is_flagged=True,
+                              moderation_reason='near-duplicate of 4 recent letters'))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['remoderate'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        letter = Letter.query.filter_by(content='Hello there, nice weather').one()
+        assert letter.is_flagged
+        assert letter.moderation_reason == 'near-duplicate of 4 recent letters'
+        assert letter.moderation_checked
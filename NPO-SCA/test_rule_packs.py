@@ -0,0 +1,94 @@
+"""Tests for versioned moderation rule packs and the stale-letter rescan"""
+
+import sys
+import os
+import json
+import threading
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask
+
+from models import db, Letter, ModerationRulePack
+from moderation import Moderator, BUILTIN_RULE_VERSION
+from rule_packs import (RulePackWatcher, latest_rule_version, load_latest_rule_pack,
+                        publish_rule_pack, rescan_stale_letters)
+from cli_commands import import_rules
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'letters.db'}"
+    db.init_app(app)
+    app.cli.add_command(import_rules)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Letter(content='I keep buying crypto scams', moderation_status='done'),
+            Letter(content='a calm week, nothing new'),
+            Letter(content='another crypto pitch', moderation_status='pending'),
+            Letter(content='crypto again', moderation_status='done', moderation_rule_version=5),
+        ])
+        db.session.commit()
+    return app
+
+
+def test_published_pack_is_hot_swapped(app, tmp_path):
+    mod = Moderator()
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'spam': ['Crypto', ' '], 'self_harm': ['suicide']}))
+    result = app.test_cli_runner().invoke(args=['import-rules', str(path), '--note', 'crypto spam'])
+    assert 'Published rule pack v2' in result.output, result.output
+    with app.app_context():
+        assert latest_rule_version() == BUILTIN_RULE_VERSION + 1
+        assert load_latest_rule_pack(mod)
+        assert not load_latest_rule_pack(mod)
+        assert mod.keyword_version == 2
+        assert mod.keyword_matches('CRYPTO deals') == [('crypto', 'spam')]
+        # A corrupt pack never replaces working rules
+        db.session.add(ModerationRulePack(version=3, rules='{"spam": []}'))
+        db.session.commit()
+        assert not load_latest_rule_pack(mod)
+        assert mod.keyword_version == 2
+        with pytest.raises(ValueError):
+            publish_rule_pack({'spam': 'crypto'})
+
+
+def test_rescan_only_touches_letters_scanned_with_older_rules(app):
+    mod = Moderator()
+    with app.app_context():
+        publish_rule_pack({'spam': ['crypto']})
+        load_latest_rule_pack(mod)
+        totals = rescan_stale_letters(mod, batch_size=1)
+        assert totals == {'version': 2, 'scanned': 2, 'flagged': 1}
+        letters = {l.content: l for l in Letter.query.all()}
+        assert letters['I keep buying crypto scams'].is_flagged
+        assert letters['I keep buying crypto scams'].moderation_reason == 'keyword: crypto'
+        assert letters['I keep buying crypto scams'].moderation_rule_version == 2
+        assert not letters['a calm week, nothing new'].is_flagged
+        # Pending letters belong to the moderation queue; newer ones are current
+        assert letters['another crypto pitch'].moderation_rule_version == 0
+        assert not letters['crypto again'].is_flagged
+        assert rescan_stale_letters(mod)['scanned'] == 0
+
+
+def test_watcher_polls_at_most_once_per_interval_and_rescans(app):
+    mod = Moderator()
+    watcher = RulePackWatcher(mod, poll_interval=60, pause=0)
+    watcher.init_app(app)
+    threads = []
+
+    def spawn(fn):
+        threads.append(threading.Thread(target=fn))
+        threads[-1].start()
+
+    with app.app_context():
+        publish_rule_pack({'spam': ['crypto']})
+        watcher.check(spawn)
+        watcher.check(spawn)
+    for t in threads:
+        t.join()
+    assert len(threads) == 1
+    assert mod.keyword_version == 2
+    assert watcher.stats()['last_rescan'] == {'version': 2, 'scanned': 2, 'flagged': 1}
@@ -0,0 +1,112 @@
+"""Tests for the hourly-bucket sliding window of letters per anonymous sender"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sender_window import SenderWindow
+
+HOUR = 3600
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_window_counts_expire_by_the_hour_and_list_top_senders():
+    clock = FakeClock()
+    window = SenderWindow(window_hours=24, threshold=3, clock=clock)
+    for _ in range(4):
+        window.add('spammer')
+    for _ in range(2):
+        window.add('regular')
+    clock.now += 5 * HOUR
+    for _ in range(3):
+        window.add('burst')
+    window.add('regular')
+
+    assert window.top() == [{'anon_id': 'spammer', 'count': 4}, {'anon_id': 'burst', 'count': 3},
+                            {'anon_id': 'regular', 'count': 3}]
+    assert window.top(k=1) == [{'anon_id': 'spammer', 'count': 4}]
+    assert window.top(threshold=4) == [{'anon_id': 'spammer', 'count': 4}]
+    assert {s['anon_id'] for s in window.top(threshold=1)} == {'spammer', 'burst', 'regular'}
+
+    clock.now += 20 * HOUR           # the first hour's bucket leaves the window
+    assert window.top() == [{'anon_id': 'burst', 'count': 3}]
+    assert window.stats()['senders'] == 2
+    clock.now += 24 * HOUR
+    assert window.top(threshold=1) == [] and window.stats()['buckets'] == 0
+
+
+class FakeLetters:
+    """Stands in for the letter table that every process writes to."""
+
+    def __init__(self):
+        self.rows = []
+        self.reads = []
+
+    def write(self, anon_id, ts):
+        self.rows.append((len(self.rows) + 1, anon_id, ts))
+
+    def load_rows(self, after_id, since_ts):
+        self.reads.append((after_id, since_ts))
+        return [row for row in self.rows if row[0] > after_id and row[2] > since_ts]
+
+
+def test_each_process_catches_up_with_letters_written_by_others():
+    clock = FakeClock()
+    letters = FakeLetters()
+    worker_a = SenderWindow(threshold=3, sync_interval=0, clock=clock)
+    worker_b = SenderWindow(threshold=3, sync_interval=0, clock=clock)
+    for _ in range(2):
+        letters.write('spammer', clock.now)     # accepted by worker A
+    worker_a.sync(letters.load_rows)
+    letters.write('spammer', clock.now)         # accepted by worker B
+    for window in (worker_a, worker_b):
+        window.sync(letters.load_rows)
+        assert window.top() == [{'anon_id': 'spammer', 'count': 3}]
+    assert letters.reads[-2][0] == 2            # A only read the letter it hadn't counted
+
+    throttled = SenderWindow(threshold=1, sync_interval=3600, clock=clock)
+    throttled.sync(letters.load_rows)
+    letters.write('late', clock.now)
+    throttled.sync(letters.load_rows)
+    assert [s['anon_id'] for s in throttled.top()] == ['spammer']
+    throttled.sync(letters.load_rows, force=True)
+    assert {s['anon_id'] for s in throttled.top()} == {'spammer', 'late'}
+
+
+def test_snapshots_are_per_process_and_restore_before_catching_up(tmp_path):
+    clock = FakeClock()
+    letters = FakeLetters()
+    path = str(tmp_path / 'senders.json')
+    window = SenderWindow(threshold=2, snapshot_path=path, clock=clock)
+    window.save_snapshot(force=True)
+    assert os.listdir(tmp_path) == []           # never loaded: nothing worth saving yet
+    for _ in range(3):
+        letters.write('a', clock.now)
+    window.sync(letters.load_rows)
+    window.save_snapshot(force=True)
+    assert os.listdir(tmp_path) == [f'senders.{os.getpid()}.json']
+    # A snapshot left by another process that had seen fewer letters
+    with open(tmp_path / 'senders.1.json', 'w') as f:
+        json.dump({'saved_at': clock.now, 'last_id': 1, 'buckets': []}, f)
+
+    clock.now += HOUR
+    letters.write('b', clock.now - 60)
+    letters.write('b', clock.now)
+    restarted = SenderWindow(threshold=2, snapshot_path=path, clock=clock)
+    restarted.sync(letters.load_rows)
+    assert letters.reads[-1][0] == 3            # most complete snapshot, then only newer ids
+    assert restarted.top() == [{'anon_id': 'a', 'count': 3}, {'anon_id': 'b', 'count': 2}]
+
+    clock.now += 48 * HOUR           # snapshots older than the window: rebuilt from letters only
+    stale = SenderWindow(threshold=2, snapshot_path=path, clock=clock)
+    stale.sync(letters.load_rows)
+    assert letters.reads[-1] == (0, clock.now - 24 * HOUR)
+    assert stale.top() == [] and os.listdir(tmp_path) == []
@@ -0,0 +1,55 @@
+"""The local Google stand-in (scripts/stub_google.py) must speak the shapes the app parses"""
+
+import sys
+import os
+import threading
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import httpx
+import pytest
+
+from gemini_client import GeminiClient, GeminiError, candidate_text
+from stub_google import StubConfig, make_server
+
+
+@pytest.fixture
+def stub():
+    config = StubConfig(candidates=['hello from the stub'])
+    server = make_server(port=0, config=config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", config
+    server.shutdown()
+    server.server_close()
+
+
+def _client(base):
+    client = GeminiClient()
+    client._config = {'GEMINI_API_KEY': 'stub'}
+    client.base_url = f"{base}/v1beta"
+    return client
+
+
+def test_gemini_client_talks_to_stub(stub):
+    base, config = stub
+    client = _client(base)
+    data = client.generate_content({'contents': [{'parts': [{'text': 'hi'}]}]}, call_type='chat')
+    assert candidate_text(data) == 'hello from the stub'
+    assert client.stats()['usage']['chat']['calls'] == 1
+    moderation = client.generate_content({'generationConfig': {'responseMimeType': 'application/json'}})
+    assert '"flagged": false' in candidate_text(moderation)
+    assert ''.join(client.stream_generate_content({'contents': []})) == 'hello from the stub'
+
+
+def test_injected_errors_and_siteverify(stub):
+    base, config = stub
+    config.error_rate = 1.0
+    client = _client(base)
+    client.max_retries = 0
+    with pytest.raises(GeminiError):
+        client.generate_content({'n': 1})
+
+    resp = httpx.post(f"{base}/recaptcha/api/siteverify", data={'secret': 's', 'response': 'token'})
+    assert resp.json()['success'] is True
+    assert config.counts['siteverify'] == 1
@@ -0,0 +1,78 @@
+"""Tests for submit()'s fan-out of reCAPTCHA and AI calls under one deadline"""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from submit_fanout import gather_submit_calls
+
+
+@pytest.fixture
+def pool():
+    executor = ThreadPoolExecutor(max_workers=4)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _verify(outcome, delay=0.0):
+    """A fake _verify_recaptcha: True/False, or an exception to raise."""
+    def verify():
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return verify
+
+
+def _ai(result, release=None):
+    """A slow AI stub that finishes when `release` is set (immediately without one)."""
+    calls = []
+
+    def call():
+        calls.append(1)
+        if release is not None:
+            release.wait(5)
+        return result
+    call.calls = calls
+    return call
+
+
+@pytest.mark.parametrize('captcha, expected', [
+    (_verify(False), 'failed'),
+    (_verify(ConnectionError('siteverify unreachable')), 'error'),
+    (_verify(True, delay=1.0), 'error'),          # misses the deadline
+])
+def test_captcha_failure_discards_ai_results(pool, captcha, expected):
+    calls = {'moderation': pool.submit(_ai((True, 'flagged'))), 'title': pool.submit(_ai('A title'))}
+    started = time.monotonic()
+    result = gather_submit_calls(pool.submit(captcha), calls, deadline=started + 0.3)
+    assert result == {'captcha': expected}
+    assert time.monotonic() - started < 0.9
+
+
+def test_deadline_bounds_the_wait_and_hands_back_late_calls(pool):
+    release = threading.Event()
+    moderation, title = _ai((False, 'ok')), _ai('Slow title', release)
+    calls = {'moderation': pool.submit(moderation), 'title': pool.submit(title)}
+    started = time.monotonic()
+    result = gather_submit_calls(pool.submit(_verify(True)), calls, deadline=started + 0.2)
+    assert time.monotonic() - started < 0.5
+    assert result['captcha'] is None and result['moderation'] == (False, 'ok')
+    assert 'title' not in result and list(result['late']) == ['title']
+
+    # The late call finishes on its own; nothing is called twice
+    release.set()
+    assert result['late']['title'].result(timeout=1) == 'Slow title'
+    assert len(moderation.calls) == len(title.calls) == 1
+
+
+def test_failed_ai_call_is_dropped_without_a_captcha(pool):
+    def broken():
+        raise RuntimeError('gemini down')
+    result = gather_submit_calls(None, {'title': pool.submit(broken)}, deadline=time.monotonic() + 1)
+    assert result == {'captcha': None, 'late': {}}
@@ -0,0 +1,101 @@
+"""Tests for the volunteer dashboard queries: paginated queue and unread-reply aggregate"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, Letter, Response, UserReply
+from volunteer_queue import unprocessed_page, letters_with_unread_replies, reconcile_reply_counters
+
+QUERY_BUDGET = 3  # queue COUNT + queue page + follow-up list
+
+
+def _seed():
+    start = datetime(2026, 1, 1)
+    expected = {}
+    for i in range(30):
+        letter = Letter(content=f'answered {i}', title=f'Letter {i}', is_processed=True,
+                        created_at=start + timedelta(hours=i))
+        db.session.add(letter)
+        db.session.flush()
+        unread, last = 0, None
+        for r in range(2):
+            response = Response(content='reply', letter_id=letter.id)
+            db.session.add(response)
+            db.session.flush()
+            for k in range(3):
+                is_read = (i + r + k) % 4 != 0
+                created = start + timedelta(days=2, hours=i, minutes=10 * r + k)
+                db.session.add(UserReply(content='thanks', response_id=response.id, letter_id=letter.id,
+                                         is_read=is_read, created_at=created))
+                unread += not is_read
+                last = max(last or created, created)
+        if unread:
+            expected[letter.unique_id] = (unread, last)
+    for i in range(25):
+        db.session.add(Letter(content=f'new {i}', created_at=start + timedelta(minutes=i)))
+    db.session.add(Letter(content='flagged', is_flagged=True))
+    db.session.add(Letter(content='pending', moderation_status='pending'))
+    db.session.commit()
+    return expected
+
+
+def test_dashboard_queries_stay_within_a_fixed_budget(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'volunteer.db'}"
+    db.init_app(app)
+    with app.test_request_context():
+        db.create_all()
+        expected = _seed()
+        assert reconcile_reply_counters() == 30   # replies seeded directly: every answered letter
+        db.session.commit()
+        db.session.expunge_all()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        page = unprocessed_page(page=2, per_page=10)
+        replies = letters_with_unread_replies()
+        # Everything the template reads, without lazy loads
+        rendered = [(letter.title, letter.topic, letter.unique_id, letter.created_at) for letter in page.items]
+        rendered += [(item['letter'].title, item['letter'].unique_id, item['unread_count'], item['last_activity'])
+                     for item in replies]
+        assert len(statements) <= QUERY_BUDGET
+
+    assert (page.total, page.pages) == (25, 3)
+    assert [letter.content for letter in page.items] == [f'new {i}' for i in range(10, 20)]
+    assert {item['letter'].unique_id: (item['unread_count'], item['last_activity']) for item in replies} == expected
+    assert [item['last_activity'] for item in replies] == sorted(
+        (item['last_activity'] for item in replies), reverse=True)
+    assert len(rendered) == 10 + len(expected)
+
+
+def test_reconcile_repairs_drifted_reply_counters(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'volunteer.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        expected = _seed()
+        reconcile_reply_counters()
+        db.session.commit()
+        assert reconcile_reply_counters() == 0
+
+        letters = Letter.query.filter(Letter.is_processed == True).order_by(Letter.id).all()
+        letters[0].unread_reply_count = 99
+        letters[1].last_reply_at = None
+        letters[2].unread_reply_count = None
+        db.session.commit()
+        assert reconcile_reply_counters(letter_id=letters[0].id) == 1
+        assert reconcile_reply_counters() == 2
+        db.session.commit()
+
+        db.session.expire_all()
+        stored = {letter.unique_id: (letter.unread_reply_count, letter.last_reply_at)
+                  for letter in Letter.query.filter(Letter.unread_reply_count > 0)}
+        assert stored == expected
+        assert Letter.query.filter(Letter.is_processed == False, Letter.last_reply_at.isnot(None)).count() == 0
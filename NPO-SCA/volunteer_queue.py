@@ -0,0 +1,63 @@
+"""
+PROJECT: ECHOE Mental Health Digital Platform
+AUTHOR: Alex Dong (Co-Founder and Lead IT Developer)
+LICENSE: GNU General Public License v3.0
+
+Copyright (c) 2026 Alex Dong. All Rights Reserved.
+This file is part of the ECHOE project. Unauthorized removal of
+author credits is a violation of the GPL license.
+"""
+
+from sqlalchemy import func, or_, select, update
+
+from models import db, Letter, UserReply
+
+# Letters still waiting for the background AI check are hidden from volunteers
+MODERATION_CLEARED = Letter.moderation_status.is_(None) | (Letter.moderation_status != 'pending')
+
+
+def unprocessed_page(page=1, per_page=24):
+    """One page of the volunteer queue (oldest first): a COUNT and a SELECT, whatever the backlog."""
+    # Exclude anything flagged (including potential NULLs)
+    query = Letter.query.filter(
+        (Letter.is_processed == False) & ((Letter.is_flagged == False) | (Letter.is_flagged.is_(None)))
+    ).filter(MODERATION_CLEARED).order_by(Letter.created_at, Letter.id)
+    return query.paginate(page=page, per_page=per_page, error_out=False)
+
+
+def letters_with_unread_replies() -> list[dict]:
+    """Processed letters with unread user replies, most recent activity first.
+
+    Reads the denormalized Letter.unread_reply_count / last_reply_at columns,
+    a range scan of the ix_letter_unread_replies partial index rather than a
+    join through response to user_reply. Each item is
+    {'letter', 'unread_count', 'last_activity'}.
+    """
+    letters = (Letter.query
+               .filter(Letter.unread_reply_count > 0, Letter.is_processed == True)
+               .order_by(Letter.last_reply_at.desc())
+               .all())
+    return [{'letter': letter, 'unread_count': letter.unread_reply_count,
+             'last_activity': letter.last_reply_at or letter.created_at}
+            for letter in letters]
+
+
+def reconcile_reply_counters(letter_id=None) -> int:
+    """Recompute unread_reply_count / last_reply_at from user_reply in one UPDATE.
+
+    Only rows that disagree are written; returns how many were. Pass `letter_id`
+    to fix a single letter (e.g. after its replies were deleted). The caller commits.
+    """
+    unread = (select(func.count(UserReply.id))
+              .where(UserReply.letter_id == Letter.id, UserReply.is_read == False)
+              .scalar_subquery())
+    last_reply = select(func.max(UserReply.created_at)).where(UserReply.letter_id == Letter.id).scalar_subquery()
+    stmt = (update(Letter)
+            .where(or_(Letter.unread_reply_count.is_distinct_from(unread),
+                       Letter.last_reply_at.is_distinct_from(last_reply)))
+            # Bookkeeping, not an edit: keep updated_at as it was
+            .values(unread_reply_count=unread, last_reply_at=last_reply, updated_at=Letter.updated_at)
+            .execution_options(synchronize_session=False))
+    if letter_id is not None:
+        stmt = stmt.where(Letter.id == letter_id)
+    return db.session.execute(stmt).rowcount
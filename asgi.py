@@ -0,0 +1,212 @@
+"""
+ASGI entrypoint (uvicorn), an alternative to the eventlet/gunicorn `wsgi.py`:
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+The AI-bound endpoints (/api/chat, /api/coach) and the social feeds
+(/api/instagram-feed, /api/youtube-latest) are native async handlers on the
+shared Gemini client's asyncio pool, so a slow upstream call parks a coroutine
+instead of holding a worker. Every other route is the unchanged Flask app,
+mounted through a2wsgi. Socket.IO needs the eventlet deployment (wsgi.py).
+"""
+
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+
+BASE_DIR = os.path.dirname(__file__)
+APP_DIR = os.path.join(BASE_DIR, "NPO-SCA")
+
+# Ensure `import app` resolves to `NPO-SCA/app.py`, without eventlet monkey-patching
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("ECHOE_ASGI", "1")
+
+import httpx  # noqa: E402
+from a2wsgi import WSGIMiddleware  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Mount, Route  # noqa: E402
+
+import app as flask_module  # noqa: E402
+from gemini_client import gemini, GeminiError  # noqa: E402
+from rate_limit import rate_limiter  # noqa: E402
+
+flask_app = flask_module.app
+logger = flask_app.logger
+_feeds = {"client": None}
+
+
+async def _json_body(request) -> dict:
+    try:
+        body = await request.json()
+    except Exception:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _client_ip(request) -> str:
+    """Same key as app._client_ip: the hop added by our proxy, else the peer address."""
+    return rate_limiter.client_ip(request.headers.get("x-forwarded-for"),
+                                  request.client.host if request.client else "")
+
+
+async def _stream_chat(gemini_payload: dict, call_type: str):
+    """Async twin of app._stream_chat: SSE `delta` frames, then `done`."""
+    sent = False
+    try:
+        async for chunk in gemini.astream_generate_content(gemini_payload, call_type=call_type):
+            sent = True
+            yield flask_module._sse({"delta": chunk})
+        if not sent:
+            logger.warning("Gemini stream finished without any text")
+            yield flask_module._sse({"delta": flask_module.CHAT_UNEXPECTED_RESPONSE, "fallback": True})
+    except GeminiError as ge:
+        logger.error(f"Gemini API stream error: {ge}")
+        if not sent:
+            yield flask_module._sse({"delta": random.choice(flask_module.CHAT_ERROR_FALLBACK_RESPONSES),
+                                     "fallback": True})
+    except Exception as e:
+        logger.error(f"api_chat stream error: {str(e)}")
+        if not sent:
+            yield flask_module._sse({"delta": flask_module.CHAT_TECHNICAL_DIFFICULTIES, "fallback": True})
+    yield flask_module._sse({}, event="done")
+
+
+async def api_chat(request):
+    try:
+        payload = await _json_body(request)
+        message = (payload.get("message") or "").strip()
+        chat_type = (payload.get("type") or "supportive").strip()
+
+        if not message:
+            return JSONResponse({"message": "Please type a message to start chatting."})
+        allowed, retry_after = rate_limiter.hit("chat", _client_ip(request))
+        if not allowed:
+            return JSONResponse({"message": flask_module.CHAT_RATE_LIMITED}, status_code=429,
+                                headers={"Retry-After": str(int(retry_after) + 1)})
+        if not gemini.available:
+            return JSONResponse({"message": random.choice(flask_module.CHAT_FALLBACK_RESPONSES)})
+
+        gemini_payload = flask_module._chat_payload(message, chat_type)
+        call_type = flask_module._chat_call_type(chat_type)
+
+        wants_stream = bool(payload.get("stream")) or "text/event-stream" in (request.headers.get("accept") or "")
+        if wants_stream:
+            return StreamingResponse(_stream_chat(gemini_payload, call_type), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        try:
+            data = await gemini.agenerate_content(gemini_payload, call_type=call_type)
+        except GeminiError as ge:
+            logger.error(f"Gemini API error: {ge}")
+            return JSONResponse({"message": random.choice(flask_module.CHAT_ERROR_FALLBACK_RESPONSES)})
+
+        ai_response = flask_module.candidate_text(data).strip()
+        if ai_response:
+            return JSONResponse({"message": ai_response})
+        logger.warning(f"Gemini API returned unexpected response structure: {str(data)[:500]}")
+        return JSONResponse({"message": flask_module.CHAT_UNEXPECTED_RESPONSE})
+    except Exception as e:
+        logger.error(f"api_chat error: {str(e)}")
+        return JSONResponse({"message": flask_module.CHAT_TECHNICAL_DIFFICULTIES})
+
+
+async def api_coach(request):
+    content, mode = "", "reply"
+    try:
+        content, mode, letter_ctx, cache_key = flask_module._coach_request(await _json_body(request))
+        cached = flask_module.coach_cache.get(cache_key)
+        if cached is not None:
+            return JSONResponse(cached)
+
+        tips, question = flask_module._heuristic_coach_suggestions(content, mode)
+        ai_failed = False
+        if gemini.available and content and rate_limiter.limited("coach", _client_ip(request)):
+            ai_failed = True
+        elif gemini.available and content:
+            try:
+                data = await gemini.agenerate_content(flask_module._coach_payload(mode, content, letter_ctx),
+                                                      call_type=f"coach_{mode}")
+                ai_tips = flask_module._coach_ai_tips(data)
+                if ai_tips:
+                    tips = ai_tips[:4]
+            except Exception as e:
+                ai_failed = True
+                logger.warning(f"Gemini coach call failed: {e}")
+
+        result = {"tips": tips[:4], "question": question}
+        if not ai_failed:
+            flask_module.coach_cache.set(cache_key, result)
+        return JSONResponse(result)
+    except Exception as e:
+        logger.error(f"api_coach error: {e}")
+        tips, question = flask_module._heuristic_coach_suggestions(content, mode)
+        return JSONResponse({"tips": tips[:4], "question": question})
+
+
+async def instagram_feed(request):
+    try:
+        access_token = flask_module._instagram_token()
+        if not access_token:
+            return JSONResponse({"items": [], "error": "INSTAGRAM_ACCESS_TOKEN not set"})
+
+        cache = flask_module._ig_cache
+        now = time.time()
+        if cache["data"] and now - cache["ts"] < 600:
+            return JSONResponse({"items": cache["data"]})
+
+        url = flask_module._instagram_first_url(access_token)
+        collected = []
+        seen_ids = set()
+        while url and len(collected) < flask_module.IG_MAX_ITEMS:
+            r = await _feeds["client"].get(url)
+            url = flask_module._instagram_collect_page(r.json(), collected, seen_ids)
+        return JSONResponse({"items": flask_module._instagram_store(collected, now)})
+    except Exception as e:
+        logger.error(f"Instagram feed error: {e}")
+        return JSONResponse({"items": []})
+
+
+async def youtube_latest(request):
+    try:
+        cache = flask_module._yt_cache
+        now = time.time()
+        if cache["item"] and now - cache["ts"] < 600:
+            return JSONResponse(cache["item"])
+
+        r = await _feeds["client"].get(flask_module._youtube_rss_url())
+        item = flask_module._youtube_parse_latest(r.text)
+        if item is None:
+            return JSONResponse({"error": "No entries"})
+
+        cache["item"] = item
+        cache["ts"] = now
+        return JSONResponse(item)
+    except Exception as e:
+        logger.error(f"YouTube latest error: {e}")
+        return JSONResponse({"error": "failed"})
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    _feeds["client"] = httpx.AsyncClient(timeout=10)
+    try:
+        yield
+    finally:
+        await _feeds["client"].aclose()
+        await gemini.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route("/api/chat", api_chat, methods=["POST"]),
+        Route("/api/coach", api_coach, methods=["POST"]),
+        Route("/api/instagram-feed", instagram_feed),
+        Route("/api/youtube-latest", youtube_latest),
+        # Everything else: the Flask app, run on a2wsgi's thread pool
+        Mount("/", app=WSGIMiddleware(flask_app, workers=flask_app.config.get("ASGI_WSGI_THREADS", 32))),
+    ],
+    lifespan=lifespan,
+)
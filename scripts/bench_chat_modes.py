@@ -0,0 +1,125 @@
+"""Concurrent /api/chat throughput: WSGI (gunicorn) vs ASGI (uvicorn) entrypoints.
+
+Starts scripts/stub_google.py in-process with a fixed Gemini latency, boots the
+app once per mode against it, and fires concurrent chat requests:
+
+    python scripts/bench_chat_modes.py --requests 400 --concurrency 100 --latency 300
+
+WSGI mode runs the production worker (`gunicorn -k eventlet -w 1`). Absolute
+numbers depend heavily on the host; compare the two modes on the same machine.
+"""
+
+import argparse
+import asyncio
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_google import StubConfig, make_server  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_app(mode, port, env, wsgi_worker):
+    if mode == 'wsgi':
+        cmd = ['gunicorn', '-k', *shlex.split(wsgi_worker), '-w', '1', '-b', f'127.0.0.1:{port}', 'wsgi:app']
+    else:
+        cmd = ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'{mode} server exited: {proc.stderr.read().decode()[-2000:]}')
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/health', timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+async def fire(port, total, concurrency):
+    latencies, fallbacks = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    sem = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=60) as client:
+        async def one(i):
+            nonlocal fallbacks
+            async with sem:
+                started = time.perf_counter()
+                # Distinct messages so single-flight coalescing doesn't flatter either mode
+                r = await client.post('/api/chat', json={'message': f'bench message {i}', 'type': 'supportive'})
+                latencies.append(time.perf_counter() - started)
+                if r.status_code != 200 or 'trouble' in r.text or 'difficulties' in r.text:
+                    fallbacks += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'p95_ms': 1000 * latencies[int(len(latencies) * 0.95) - 1],
+        'fallbacks': fallbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=300, help='stub Gemini latency (ms)')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--wsgi-worker', default='eventlet', help='gunicorn worker class (+ its flags)')
+    args = parser.parse_args()
+
+    stub = make_server(port=0, config=StubConfig(gemini_latency=f'fixed:{args.latency}'))
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub_base = f'http://127.0.0.1:{stub.server_address[1]}'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   ADMIN_PASSWORD=os.environ.get('ADMIN_PASSWORD', 'bench-admin'),
+                   GEMINI_API_KEY='stub',
+                   GEMINI_API_BASE=f'{stub_base}/v1beta',
+                   # Let the scheduler, not the benchmark, be the only limit under test
+                   AI_SCHEDULER_CONCURRENCY=str(args.concurrency),
+                   AI_SCHEDULER_CLASSES='{"chat": [0, %d, %d, 60]}' % (args.concurrency, args.requests),
+                   # Every request comes from one IP; keep the chat rate limit out of the way
+                   RATE_LIMITS='{"chat": [%d, 1]}' % (args.requests * 2),
+                   GEMINI_MAX_CONNECTIONS=str(args.concurrency))
+        print(f'{args.requests} chat requests, concurrency {args.concurrency}, '
+              f'upstream latency {args.latency:.0f} ms')
+        for mode in args.modes.split(','):
+            port = free_port()
+            proc = start_app(mode, port, env, args.wsgi_worker)
+            try:
+                asyncio.run(fire(port, min(20, args.requests), args.concurrency))  # warm-up
+                result = asyncio.run(fire(port, args.requests, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait(10)
+            print(f"  {mode}: {result['rps']:7.1f} req/s   p50 {result['p50_ms']:7.1f} ms   "
+                  f"p95 {result['p95_ms']:7.1f} ms   fallbacks {result['fallbacks']}")
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Per-request logging overhead: 'dev' (synchronous DEBUG) vs 'production' (queued) profile.
+
+Boots the app once per profile in a subprocess, with stdout replaced by a sink
+that stalls on every write (like a log pipe whose reader is falling behind),
+and times requests through the Flask test client:
+
+    python scripts/bench_logging.py --requests 300 --sink-latency 0.2
+
+'dev' matches how the app logged before the production profile existed;
+--legacy-lines also replays the per-request lines that were removed (user
+loader debug, request.form on login, the template folder listing in submit())
+on top of it, to show their cost.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+APP_DIR = os.path.join(ROOT, 'NPO-SCA')
+PATHS = [('GET', '/'), ('GET', '/submit'), ('POST', '/login')]
+
+
+class SlowSink:
+    """File-like object that sleeps `latency` seconds per write."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def child(args):
+    sink = SlowSink(args.sink_latency / 1000.0)
+    real_stdout, sys.stdout = sys.stdout, sink
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    import logging
+    import app as m
+
+    client = m.app.test_client()
+    logger = logging.getLogger('app')
+
+    def legacy_lines(path):
+        # What the removed hot-path logging did for each of these requests
+        logger.info(f"Loading user with ID: {None}")
+        if path == '/submit':
+            logger.info(f"Request language: {'en-CA'}")
+            logger.info(f"Template folder: {m.app.template_folder}")
+            logger.info(f"Available templates: {os.listdir(m.app.template_folder)}")
+        if path == '/login':
+            logger.info("Login route accessed")
+            logger.info(f"Request form data: {{'email': 'x@example.com', 'password': '...'}}")
+
+    def one(i):
+        method, path = PATHS[i % len(PATHS)]
+        if args.legacy_lines:
+            legacy_lines(path)
+        if method == 'GET':
+            client.get(path)
+        else:
+            client.post(path, data={'email': 'nobody@example.com', 'password': 'wrong'})
+
+    for i in range(min(30, args.requests)):
+        one(i)
+    writes_before = sink.writes
+    started = time.perf_counter()
+    for i in range(args.requests):
+        one(i)
+    elapsed = time.perf_counter() - started
+    sys.stdout = real_stdout
+    print(json.dumps({'ms_per_request': 1000 * elapsed / args.requests,
+                      'writes_per_request': (sink.writes - writes_before) / args.requests}))
+
+
+def run(profile, args, tmp, legacy=False):
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, f'bench-{profile}.db')}",
+               ADMIN_PASSWORD=os.environ.get('ADMIN_PASSWORD', 'bench-admin'),
+               ECHOE_BOOTSTRAP_DB='1', VERCEL='1', LOG_PROFILE=profile)
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', '--requests', str(args.requests),
+           '--sink-latency', str(args.sink_latency)] + (['--legacy-lines'] if legacy else [])
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--sink-latency', type=float, default=0.2, help='stall per stdout write (ms)')
+    parser.add_argument('--legacy-lines', action='store_true', help='(child) replay the removed log lines')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    print(f'{args.requests} requests over {", ".join(f"{m} {p}" for m, p in PATHS)}, '
+          f'{args.sink_latency} ms per stdout write')
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, profile, legacy in (('dev + removed lines', 'dev', True), ('dev', 'dev', False),
+                                       ('production', 'production', False)):
+            result = run(profile, args, tmp, legacy)
+            print(f"  {label:20s} {result['ms_per_request']:7.2f} ms/request   "
+                  f"{result['writes_per_request']:5.1f} log writes/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Micro-benchmark: Moderator.deterministic_match vs the per-keyword `in` loop it replaced.
+
+    python scripts/bench_moderation_match.py --repeat 200
+
+Times Moderator.deterministic_match on clean and flagged texts of several
+sizes (chat line to long letter) and checks both give the same answer. Texts are
+normalized up front, as Moderator.verdict does, so only the matching is timed.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NPO-SCA'))
+
+from moderation import Moderator, normalize_for_moderation  # noqa: E402
+
+WORDS = ("i had a really hard day at school today and my friends did not talk to me "
+         "je me sens seule ce soir me siento muy cansada hoy мне очень грустно сегодня "
+         "今天 我 很 难过 오늘은 정말 힘들었어 学校 で 疲れた").split()
+
+
+def loop_match(keywords, text, normalized=None):
+    """The original implementation, kept here as the baseline."""
+    lower = (text or '').lower()
+    simple, ascii_norm = normalized or normalize_for_moderation(text)
+    haystacks = [lower, simple, ascii_norm]
+    for kw in keywords:
+        for h in haystacks:
+            if kw in h:
+                return True, kw
+    return False, ''
+
+
+def make_text(size, rng, flagged=False):
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        words.append(rng.choice(WORDS))
+    if flagged:
+        words.insert(len(words) * 3 // 4, 's3lf h4rm')
+    return ' '.join(words)[:size]
+
+
+def timed(fn, texts, repeat):
+    normalized = [(text, normalize_for_moderation(text)) for text in texts]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text, norm in normalized:
+            fn(text, norm)
+    return (time.perf_counter() - started) / (repeat * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--sizes', default='80,500,2000,5000')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    moderator = Moderator()
+    keywords = moderator.keywords
+    print(f'{len(keywords)} keywords, {args.repeat} repeats')
+    print(f"{'size':>6} {'kind':>8} {'loop us':>10} {'matcher us':>13} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        for flagged in (False, True):
+            texts = [make_text(size, rng, flagged) for _ in range(20)]
+            for text in texts:
+                assert moderator.deterministic_match(text) == loop_match(keywords, text), text
+            old = timed(lambda t, n: loop_match(keywords, t, n), texts, args.repeat)
+            new = timed(moderator.deterministic_match, texts, args.repeat)
+            print(f"{size:>6} {'flagged' if flagged else 'clean':>8} {old:>10.1f} {new:>13.1f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
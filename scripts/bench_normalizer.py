@@ -0,0 +1,91 @@
+"""Benchmark + equivalence check for moderation.normalize_for_moderation.
+
+    python scripts/bench_normalizer.py --repeat 2000
+
+Runs the translate-table normalizer and the chained-replace version it replaced
+over realistic multilingual inputs (CJK, Cyrillic, leetspeak, accents, emoji)
+plus random fuzz, fails if any output differs, then times both per input kind.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NPO-SCA'))
+
+from moderation import normalize_for_moderation  # noqa: E402
+
+SAMPLES = {
+    'english': "I've had a really rough week at school... my friends stopped talking to me and I feel so alone.",
+    'leetspeak': "1 w4nt t0 k1ll mys3lf!!! s.u.i.c.i.d.e 5elf-h4rm   n00000 one c4res",
+    'cyrillic': "Мне очень грустно сегодня, я не знаю что делать. Всё плохо!!! сууука",
+    'cjk': "今天在学校很难过，没有人跟我说话。学校で疲れた、もう死にたい。오늘은 정말 힘들었어요…",
+    'accents': "Je me sens très seule ce soir, c'est vraiment dur. Ça va aller? ¿Qué hago ahora, mamá?",
+    'emoji': "feeling 😞😞😞 today… 🙃 nobody gets it 💔💔💔 𝓱𝓮𝓵𝓹 me",
+    'arabic': "أشعر بالوحدة الشديدة اليوم ولا أعرف ماذا أفعل",
+}
+FUZZ_ALPHABET = ("abcXYZ 0134578_-.!?\n\t" "éüçñ" "сукаЖ" "自杀殺す강간"
+                 "\u3000\u200b\ud800" "😞💔𝓱𝟙" "İßﬁ")
+
+
+def legacy_normalize(text):
+    """The implementation before the translate-table rewrite, kept as the reference."""
+    t = (text or '').lower()
+    t = (t
+         .replace('0', 'o')
+         .replace('1', 'i')
+         .replace('3', 'e')
+         .replace('4', 'a')
+         .replace('5', 's')
+         .replace('7', 't')
+         .replace('8', 'b'))
+    simple = re.sub(r"[^\w\u0080-\uffff]+", "", t)
+    simple = re.sub(r"(.)\1{2,}", r"\1\1", simple)
+    try:
+        ascii_norm = unicodedata.normalize('NFKD', simple).encode('ascii', 'ignore').decode('ascii')
+    except Exception:
+        ascii_norm = simple
+    return simple, ascii_norm
+
+
+def check_identical(fuzz, rng):
+    inputs = list(SAMPLES.values()) + [text * 40 for text in SAMPLES.values()] + ['', None]
+    inputs += [''.join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 200))) for _ in range(fuzz)]
+    for text in inputs:
+        if normalize_for_moderation(text) != legacy_normalize(text):
+            raise SystemExit(f'MISMATCH for {text!r}:\n  new {normalize_for_moderation(text)!r}\n'
+                             f'  old {legacy_normalize(text)!r}')
+    return len(inputs)
+
+
+def timed(fn, text, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--fuzz', type=int, default=5000, help='random strings for the equivalence check')
+    parser.add_argument('--letter-multiplier', type=int, default=40, help='sample repeats for letter-sized input')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    checked = check_identical(args.fuzz, random.Random(args.seed))
+    print(f'identical output on {checked} inputs')
+    print(f"{'input':>18} {'chars':>6} {'old us':>9} {'new us':>9} {'speedup':>8}")
+    for name, text in SAMPLES.items():
+        for label, sample in ((name, text), (f'{name} x{args.letter_multiplier}', text * args.letter_multiplier)):
+            old = timed(legacy_normalize, sample, args.repeat)
+            new = timed(normalize_for_moderation, sample, args.repeat)
+            print(f'{label:>18} {len(sample):>6} {old:>9.1f} {new:>9.1f} {old / new:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Local stand-in for the Google endpoints the app calls (Gemini + reCAPTCHA).
+
+Lets /submit, /api/chat and /api/coach be load-tested without real quota:
+
+    python scripts/stub_google.py --port 8089 --gemini-latency lognormal:400,0.5 --error-rate 0.02
+
+then start the app with
+
+    GEMINI_API_KEY=stub \
+    GEMINI_API_BASE=http://127.0.0.1:8089/v1beta \
+    RECAPTCHA_VERIFY_URL=http://127.0.0.1:8089/recaptcha/api/siteverify
+
+Latency specs (milliseconds): fixed:MS, uniform:LO,HI, normal:MEAN,SD,
+exp:MEAN, lognormal:MEDIAN,SIGMA. GET /stats returns request counters.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_CANDIDATES = [
+    "That sounds like a lot to carry. You don't have to figure it all out at once.",
+    "Thank you for sharing this. It makes sense that you feel this way.",
+    "You could try the Write a Letter page; a volunteer will reply within a few days.",
+]
+MODERATION_REPLY = '{"flagged": false, "reason": "stub"}'
+COACH_REPLY = ("- You might start with the moment that felt hardest.\n"
+               "- Perhaps name one feeling you noticed today.\n"
+               "- If you'd like, share what would help right now.")
+
+
+def parse_latency(spec):
+    """Return a callable giving one latency sample in seconds."""
+    kind, _, args = (spec or 'fixed:0').partition(':')
+    nums = [float(x) for x in args.split(',') if x.strip()] or [0.0]
+    if kind == 'fixed':
+        sample = lambda: nums[0]
+    elif kind == 'uniform':
+        sample = lambda: random.uniform(nums[0], nums[1])
+    elif kind == 'normal':
+        sample = lambda: random.gauss(nums[0], nums[1])
+    elif kind == 'exp':
+        sample = lambda: random.expovariate(1.0 / nums[0]) if nums[0] else 0.0
+    elif kind == 'lognormal':
+        sample = lambda: random.lognormvariate(math.log(nums[0]), nums[1])
+    else:
+        raise ValueError(f'unknown latency distribution: {spec}')
+    return lambda: max(0.0, sample()) / 1000.0
+
+
+class StubConfig:
+    def __init__(self, gemini_latency='fixed:0', recaptcha_latency='fixed:0', error_rate=0.0,
+                 recaptcha_error_rate=0.0, recaptcha_fail_rate=0.0, candidates=None, stream_chunks=4):
+        self.gemini_latency = parse_latency(gemini_latency)
+        self.recaptcha_latency = parse_latency(recaptcha_latency)
+        self.error_rate = error_rate
+        self.recaptcha_error_rate = recaptcha_error_rate
+        self.recaptcha_fail_rate = recaptcha_fail_rate
+        self.candidates = candidates or DEFAULT_CANDIDATES
+        self.stream_chunks = max(1, stream_chunks)
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def _usage(body, text):
+    prompt_chars = len(json.dumps(body.get('contents', ''))) + len(json.dumps(body.get('systemInstruction', '')))
+    return {'promptTokenCount': prompt_chars // 4, 'candidatesTokenCount': len(text) // 4,
+            'totalTokenCount': (prompt_chars + len(text)) // 4}
+
+
+def _reply_text(config, body):
+    # Moderation asks for JSON and the coach for bullets; everything else gets a canned candidate
+    if (body.get('generationConfig') or {}).get('responseMimeType') == 'application/json':
+        return MODERATION_REPLY
+    if 'bullet tips' in json.dumps(body.get('systemInstruction') or ''):
+        return COACH_REPLY
+    return random.choice(config.candidates)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+    config = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/stats':
+            return self._send_json(200, self.config.counts)
+        self._send_json(404, {'error': {'code': 404, 'message': 'not found'}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        raw = self._read_body()
+        if url.path.endswith('/recaptcha/api/siteverify'):
+            return self._siteverify(raw)
+        if url.path.endswith(':generateContent'):
+            return self._generate(raw)
+        if url.path.endswith(':streamGenerateContent'):
+            return self._stream(raw)
+        if url.path.endswith('/cachedContents'):
+            # Like the real API for the app's short system instructions
+            self.config.count('cachedContents')
+            return self._send_json(400, {'error': {'code': 400, 'message': 'Cached content is too small.'}})
+        self._send_json(404, {'error': {'code': 404, 'message': 'not found'}})
+
+    def _maybe_fail(self, name):
+        if random.random() < self.config.error_rate:
+            self.config.count(f'{name}_error')
+            status = random.choice((429, 500, 503))
+            self._send_json(status, {'error': {'code': status, 'message': 'stub injected error'}})
+            return True
+        return False
+
+    def _generate(self, raw):
+        self.config.count('generateContent')
+        time.sleep(self.config.gemini_latency())
+        if self._maybe_fail('generateContent'):
+            return
+        body = json.loads(raw or b'{}')
+        text = _reply_text(self.config, body)
+        self._send_json(200, {
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP'}],
+            'usageMetadata': _usage(body, text),
+        })
+
+    def _stream(self, raw):
+        self.config.count('streamGenerateContent')
+        if 'sse' not in parse_qs(urlparse(self.path).query).get('alt', []):
+            return self._send_json(400, {'error': {'code': 400, 'message': 'stub only streams alt=sse'}})
+        total = self.config.gemini_latency()
+        if self._maybe_fail('streamGenerateContent'):
+            return
+        body = json.loads(raw or b'{}')
+        text = _reply_text(self.config, body)
+        words = text.split(' ')
+        step = max(1, math.ceil(len(words) / self.config.stream_chunks))
+        pieces = [' '.join(words[i:i + step]) + ' ' for i in range(0, len(words), step)]
+        pieces[-1] = pieces[-1].rstrip()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for i, piece in enumerate(pieces):
+            time.sleep(total / len(pieces))
+            chunk = {'candidates': [{'content': {'role': 'model', 'parts': [{'text': piece}]}}]}
+            if i == len(pieces) - 1:
+                chunk['usageMetadata'] = _usage(body, text)
+            self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode('utf-8'))
+            self.wfile.flush()
+
+    def _siteverify(self, raw):
+        self.config.count('siteverify')
+        time.sleep(self.config.recaptcha_latency())
+        if random.random() < self.config.recaptcha_error_rate:
+            self.config.count('siteverify_error')
+            return self._send_json(500, {'error': 'stub injected error'})
+        form = parse_qs(raw.decode('utf-8'))
+        ok = bool(form.get('response')) and random.random() >= self.config.recaptcha_fail_rate
+        payload = {'success': ok, 'challenge_ts': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                   'hostname': 'localhost'}
+        if not ok:
+            payload['error-codes'] = ['invalid-input-response']
+        self._send_json(200, payload)
+
+
+class _StubServer(ThreadingHTTPServer):
+    # The default listen backlog (5) resets connections under load tests
+    request_queue_size = 1024
+
+
+def make_server(host='127.0.0.1', port=8089, config=None):
+    """Build (but don't start) the stub server; port 0 picks a free port."""
+    handler = type('BoundStubHandler', (StubHandler,), {'config': config or StubConfig()})
+    server = _StubServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--gemini-latency', default='fixed:0', help='e.g. lognormal:400,0.5')
+    parser.add_argument('--recaptcha-latency', default='fixed:0', help='e.g. uniform:80,200')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Gemini 429/5xx probability')
+    parser.add_argument('--recaptcha-error-rate', type=float, default=0.0, help='siteverify HTTP 500 probability')
+    parser.add_argument('--recaptcha-fail-rate', type=float, default=0.0, help='siteverify success=false probability')
+    parser.add_argument('--candidates', help='JSON file with a list of canned reply texts')
+    parser.add_argument('--stream-chunks', type=int, default=4)
+    args = parser.parse_args()
+
+    candidates = None
+    if args.candidates:
+        with open(args.candidates) as f:
+            candidates = json.load(f)
+    config = StubConfig(args.gemini_latency, args.recaptcha_latency, args.error_rate,
+                        args.recaptcha_error_rate, args.recaptcha_fail_rate, candidates, args.stream_chunks)
+    server = make_server(args.host, args.port, config)
+    print(f'Stub Google APIs on http://{args.host}:{server.server_address[1]}')
+    print(f'  GEMINI_API_BASE=http://{args.host}:{server.server_address[1]}/v1beta')
+    print(f'  RECAPTCHA_VERIFY_URL=http://{args.host}:{server.server_address[1]}/recaptcha/api/siteverify')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()